@@ -0,0 +1,28 @@
+"""add document list index
+
+Revision ID: 0c6e2b9d4f71
+Revises: f3a9c2d84e15
+Create Date: 2026-10-17 16:21:09.774130
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c6e2b9d4f71'
+down_revision: Union[str, None] = 'f3a9c2d84e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_documents_user_id_upload_time', 'documents', ['user_id', 'upload_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documents_user_id_upload_time', table_name='documents')
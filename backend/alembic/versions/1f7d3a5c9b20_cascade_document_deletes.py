@@ -0,0 +1,45 @@
+"""cascade document deletes
+
+Revision ID: 1f7d3a5c9b20
+Revises: 0c6e2b9d4f71
+Create Date: 2026-10-17 17:05:42.106583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f7d3a5c9b20'
+down_revision: Union[str, None] = '0c6e2b9d4f71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referenced table) of each foreign key, named as PostgreSQL
+# names unnamed constraints
+FOREIGN_KEYS = [
+    ('chat_sessions', 'document_id', 'documents'),
+    ('chat_messages', 'session_id', 'chat_sessions'),
+]
+
+
+def _recreate(ondelete: Union[str, None]) -> None:
+    # SQLite cannot alter constraints in place; its schema comes from the models
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    for table, column, referred in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _recreate('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _recreate(None)
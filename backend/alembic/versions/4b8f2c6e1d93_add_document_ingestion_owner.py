@@ -0,0 +1,28 @@
+"""add document ingestion owner
+
+Revision ID: 4b8f2c6e1d93
+Revises: 9e4d1b7c3a52
+Create Date: 2026-10-17 19:05:48.603142
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8f2c6e1d93'
+down_revision: Union[str, None] = '9e4d1b7c3a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('ingestion_owner', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('documents', 'ingestion_owner')
@@ -0,0 +1,33 @@
+"""add document ingestion status
+
+Revision ID: 7c1e5a9d2f40
+Revises: 498cd9da5855
+Create Date: 2026-10-17 09:12:05.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5a9d2f40'
+down_revision: Union[str, None] = '498cd9da5855'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows were indexed synchronously, so they start out ready
+    op.add_column('documents', sa.Column('status', sa.String(), server_default='ready', nullable=False))
+    op.add_column('documents', sa.Column('progress', sa.Integer(), server_default='100', nullable=False))
+    op.add_column('documents', sa.Column('error', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('documents', 'error')
+    op.drop_column('documents', 'progress')
+    op.drop_column('documents', 'status')
@@ -0,0 +1,28 @@
+"""add chat message session id index
+
+Revision ID: 9e4d1b7c3a52
+Revises: 1f7d3a5c9b20
+Create Date: 2026-10-17 18:42:15.218307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4d1b7c3a52'
+down_revision: Union[str, None] = '1f7d3a5c9b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_chat_messages_session_id_id', 'chat_messages', ['session_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_messages_session_id_id', table_name='chat_messages')
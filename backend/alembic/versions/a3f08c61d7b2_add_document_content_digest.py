@@ -0,0 +1,30 @@
+"""add document content digest
+
+Revision ID: a3f08c61d7b2
+Revises: 7c1e5a9d2f40
+Create Date: 2026-10-17 10:02:47.551390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f08c61d7b2'
+down_revision: Union[str, None] = '7c1e5a9d2f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('content_digest', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_documents_content_digest'), 'documents', ['content_digest'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_documents_content_digest'), table_name='documents')
+    op.drop_column('documents', 'content_digest')
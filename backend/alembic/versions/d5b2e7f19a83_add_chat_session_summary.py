@@ -0,0 +1,30 @@
+"""add chat session summary
+
+Revision ID: d5b2e7f19a83
+Revises: a3f08c61d7b2
+Create Date: 2026-10-17 11:26:13.904126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b2e7f19a83'
+down_revision: Union[str, None] = 'a3f08c61d7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chat_sessions', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('chat_sessions', sa.Column('summarized_until_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_sessions', 'summarized_until_id')
+    op.drop_column('chat_sessions', 'summary')
@@ -0,0 +1,82 @@
+"""move document content to text store
+
+Revision ID: e8c41f0b7a26
+Revises: d5b2e7f19a83
+Create Date: 2026-10-17 14:02:51.318407
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services import text_store
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c41f0b7a26'
+down_revision: Union[str, None] = 'd5b2e7f19a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 200
+
+documents = sa.table(
+    'documents',
+    sa.column('id', sa.Integer),
+    sa.column('filename', sa.String),
+    sa.column('content', sa.Text),
+    sa.column('content_ref', sa.String),
+)
+
+
+def _batches(bind, column):
+    """Rows with column set, BATCH_SIZE at a time in id order."""
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(documents.c.id, documents.c.filename, column)
+            .where(documents.c.id > last_id, column.isnot(None))
+            .order_by(documents.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('content_ref', sa.String(), nullable=True))
+
+    # Deduplicated rows share a filename and therefore one blob
+    bind = op.get_bind()
+    refs = {}
+    for rows in _batches(bind, documents.c.content):
+        for row in rows:
+            if row.filename not in refs:
+                refs[row.filename] = text_store.save_text(row.filename, row.content)
+            bind.execute(
+                documents.update()
+                .where(documents.c.id == row.id)
+                .values(content_ref=refs[row.filename])
+            )
+
+    op.drop_column('documents', 'content')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('documents', sa.Column('content', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    for rows in _batches(bind, documents.c.content_ref):
+        for row in rows:
+            bind.execute(
+                documents.update()
+                .where(documents.c.id == row.id)
+                .values(content=text_store.load_text(row.content_ref))
+            )
+
+    op.drop_column('documents', 'content_ref')
@@ -0,0 +1,36 @@
+"""add hot query indexes
+
+Revision ID: f3a9c2d84e15
+Revises: e8c41f0b7a26
+Create Date: 2026-10-17 15:10:37.552904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c2d84e15'
+down_revision: Union[str, None] = 'e8c41f0b7a26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_chat_messages_session_id_timestamp', 'chat_messages', ['session_id', 'timestamp'], unique=False)
+    op.create_index('ix_chat_sessions_user_id_started_at', 'chat_sessions', ['user_id', 'started_at'], unique=False)
+    op.create_index('ix_chat_sessions_document_id', 'chat_sessions', ['document_id'], unique=False)
+    op.create_index('ix_documents_user_id_filename', 'documents', ['user_id', 'filename'], unique=False)
+    op.create_index('ix_documents_filename', 'documents', ['filename'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documents_filename', table_name='documents')
+    op.drop_index('ix_documents_user_id_filename', table_name='documents')
+    op.drop_index('ix_chat_sessions_document_id', table_name='chat_sessions')
+    op.drop_index('ix_chat_sessions_user_id_started_at', table_name='chat_sessions')
+    op.drop_index('ix_chat_messages_session_id_timestamp', table_name='chat_messages')
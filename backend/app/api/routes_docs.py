@@ -1,56 +1,107 @@
 # app/api/routes_docs.py
-from fastapi import APIRouter, Depends, HTTPException, Query #type: ignore
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response #type: ignore
+from sqlalchemy import select #type:ignore
 from sqlalchemy.orm import Session #type:ignore
-from app.db.session import SessionLocal
+from app.db.session import get_db
 from app.db.models.document import Document #type:ignore
 from app.db.models.chat import ChatSession, ChatMessage
+from app.services.collection_search import registry as collection_registry
+from app.services.text_store import load_text
+from app.services.cleanup import schedule_document_cleanup
+from app.services.pagination import after, decode_cursor, limit_page, ordering, page_size, split_page
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Columns returned by the document endpoints; the extracted text lives in the
+# text store and is only fetched on request
+DOCUMENT_FIELDS = (
+    Document.id,
+    Document.filename,
+    Document.upload_time,
+    Document.source,
+    Document.user_id,
+    Document.status,
+    Document.progress,
+    Document.error,
+    Document.content_digest,
+)
 
 @router.get("/", status_code=200)
-def get_user_documents(user_id:str =  Query(...), filename:str = Query(...), db: Session = Depends(get_db)):
+def get_user_documents(
+    user_id:str =  Query(...),
+    filename:str = Query(...),
+    include_content: bool = Query(False),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
     """
     Fetch a single document comparing filename and user_id.
+    The extracted text is loaded from the text store only with include_content.
     """
-    document = db.query(Document).filter(Document.user_id == user_id, Document.filename == filename).first()
-    if not document:
+    row = (
+        db.query(*DOCUMENT_FIELDS, Document.content_ref)
+        .filter(Document.user_id == user_id, Document.filename == filename)
+        .first()
+    )
+    if not row:
         raise HTTPException(status_code=404, detail="No documents found for this User ID and Filename")
+    document = row._asdict()
+    content_ref = document.pop("content_ref")
+    if include_content:
+        document["content"] = load_text(content_ref)
     return document
 
 @router.get("/user/{user_id}", status_code=200)
-def get_user_documents(user_id: str, db: Session = Depends(get_db)):
+def get_user_documents(
+    user_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
     """
-    Fetch all documents for a specific user.
+    Fetch a user's documents, newest first (metadata only, no text).
+    All of them, or with limit/cursor one page of at most limit rows;
+    X-Next-Cursor is set when more follow.
     """
-    documents = db.query(Document).filter(Document.user_id == user_id).all()
-    if not documents:
+    size = page_size(limit, cursor)
+    query = db.query(*DOCUMENT_FIELDS).filter(Document.user_id == user_id)
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(after(Document.upload_time, Document.id, position, descending=True))
+    rows = limit_page(query.order_by(*ordering(Document.upload_time, Document.id, descending=True)), size).all()
+    if not rows and not cursor:
         raise HTTPException(status_code=404, detail="No documents found for this user")
-    return documents
+    rows, next_cursor = split_page(rows, size, lambda row: (row.upload_time, row.id))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [row._asdict() for row in rows]
 
 @router.delete("/", status_code=204)
 def remove_user_document(user_id:str = Query(...),id = Query(...), db:Session = Depends(get_db)):
     """
-        Remove a single document
+        Remove a single document with its chat sessions and messages.
+        Index, cached answers, extracted text and the S3 object are removed
+        in the background once no other document shares them.
     """
-    document = db.query(Document).filter(Document.user_id == user_id, Document.id == id).first()
+    document = (
+        db.query(Document.id, Document.filename, Document.source, Document.content_ref)
+        .filter(Document.user_id == user_id, Document.id == id)
+        .first()
+    )
     if not document:
         raise HTTPException(status_code=404, detail="Document not found for the given User ID and Filename")
     
-     # Delete associated chat messages and sessions
-    sessions = db.query(ChatSession).filter(ChatSession.document_id == document.id).all()
-    for session in sessions:
-        db.query(ChatMessage).filter(ChatMessage.session_id == session.id).delete()
-        db.delete(session)
-        
-    db.delete(document)
+    # Set-based deletes, a fixed number of statements however long the conversations
+    session_ids = select(ChatSession.id).where(ChatSession.document_id == document.id)
+    db.query(ChatMessage).filter(ChatMessage.session_id.in_(session_ids)).delete(synchronize_session=False)
+    db.query(ChatSession).filter(ChatSession.document_id == document.id).delete(synchronize_session=False)
+    db.query(Document).filter(Document.id == document.id).delete(synchronize_session=False)
     db.commit()
-    return {"detail": "Document and associated chat sessions/messages deleted successfully"}
-
 
+    collection_registry.remove_document(user_id, document.id)
+    schedule_document_cleanup(document.filename, document.source, document.content_ref)
+    return {"detail": "Document and associated chat sessions/messages deleted successfully"}
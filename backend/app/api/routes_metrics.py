@@ -0,0 +1,31 @@
+# app/api/routes_metrics.py
+from fastapi import APIRouter  # type: ignore
+from typing import Dict, Any
+
+from app.core.config import settings
+from app.db.pool import pool_stats
+from app.db.session import async_engine, engine
+from app.services.qa_engine import doc_qa_map, answer_cache, batched_embedding, embedding
+from app.services.ingestion import get_ingestion_backend
+from app.services import reranking
+from app.services.cleanup import cleanup_queue
+from app.services.pdf_export import export_cache
+
+router = APIRouter()
+
+@router.get("/")
+def get_metrics() -> Dict[str, Any]:
+    """
+    Report in-process cache and pipeline counters for this worker.
+    """
+    return {
+        "doc_cache": doc_qa_map.stats(),
+        "ingestion": {"pending": get_ingestion_backend().pending()},
+        "embedding": batched_embedding.stats(),
+        "embedding_cache": embedding.stats(),
+        "answer_cache": answer_cache.stats(),
+        "reranker": {"name": settings.reranker or "disabled", **reranking.stats.snapshot()},
+        "cleanup": cleanup_queue.stats(),
+        "pdf_export_cache": export_cache.stats(),
+        "db_pool": {"sync": pool_stats(engine), "async": pool_stats(async_engine)},
+    }
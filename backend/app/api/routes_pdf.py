@@ -1,31 +1,42 @@
 # app/api/routes_pdf.py
-from fastapi import APIRouter, HTTPException, Depends, Response  # type: ignore
-from sqlalchemy.orm import Session  # type: ignore
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Header, Response  # type: ignore
+from sqlalchemy import func, select  # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.orm import selectinload  # type: ignore
+from typing import Dict, Any, Optional
 
-from app.db.session import SessionLocal
+from app.db.session import get_async_db
 from app.db.models.chat import ChatSession, ChatMessage
-from app.services.pdf_generator import generate_conversation_pdf
+from app.services.pdf_export import etag_matches, export_cache, export_etag, render_conversation_pdf
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def _pdf_response(pdf_content: bytes, filename: str, headers: Dict[str, str]) -> Response:
+    return Response(
+        content=pdf_content,
+        media_type="application/pdf",
+        headers={
+            **headers,
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Type": "application/pdf"
+        }
+    )
 
 @router.get("/conversation/{session_id}")
 async def download_conversation_pdf(
     session_id: int,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Response:
     """
     Generate and download a PDF of the conversation history.
+
+    Exports are cached until the conversation changes. The response carries
+    an ETag; a request with a matching If-None-Match gets 304 Not Modified.
     
     Args:
         session_id: The chat session ID
+        if_none_match: ETag of an export the client already has
         db: Database session
         
     Returns:
@@ -36,7 +47,11 @@ async def download_conversation_pdf(
     """
     try:
         # Validate session exists
-        session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+        session = (await db.execute(
+            select(ChatSession)
+            .options(selectinload(ChatSession.document))
+            .where(ChatSession.id == session_id)
+        )).scalar_one_or_none()
         if not session:
             raise HTTPException(status_code=404, detail="Chat session not found")
         
@@ -44,14 +59,47 @@ async def download_conversation_pdf(
         document = session.document
         if not document:
             raise HTTPException(status_code=404, detail="Associated document not found")
+
+        # Version of the export: message count, the last message and the document details
+        message_count = (await db.execute(
+            select(func.count(ChatMessage.id)).where(ChatMessage.session_id == session_id)
+        )).scalar_one()
+        last = (await db.execute(
+            select(ChatMessage.id, ChatMessage.timestamp)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+            .limit(1)
+        )).first()
+        document_data = {
+            'filename': document.filename,
+            'upload_time': document.upload_time.isoformat(),
+            'file_url': document.source
+        }
+        etag = export_etag(
+            session_id,
+            message_count,
+            last.id if last else None,
+            last.timestamp if last else None,
+            document_data,
+        )
+
+        # Create filename
+        filename = f"conversation_{session_id}_{document.filename}.pdf"
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        pdf_content = export_cache.get(etag)
+        if pdf_content is not None:
+            return _pdf_response(pdf_content, filename, headers)
         
         # Get all messages for the session
-        messages = (
-            db.query(ChatMessage)
-            .filter(ChatMessage.session_id == session_id)
-            .order_by(ChatMessage.timestamp)
-            .all()
-        )
+        messages = (await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.timestamp, ChatMessage.id)
+        )).scalars().all()
         
         # Prepare data for PDF generation
         session_data = {
@@ -68,31 +116,16 @@ async def download_conversation_pdf(
             for msg in messages
         ]
         
-        document_data = {
-            'filename': document.filename,
-            'upload_time': document.upload_time.isoformat(),
-            'file_url': document.source
-        }
-        
-        # Generate PDF
-        pdf_content = generate_conversation_pdf(
+        # Generate PDF in the export pool
+        pdf_content = await render_conversation_pdf(
             session_data=session_data,
             messages=message_data,
             document_info=document_data
         )
-        
-        # Create filename
-        filename = f"conversation_{session_id}_{document.filename}.pdf"
+        export_cache.put(etag, pdf_content, len(pdf_content))
         
         # Return PDF as response
-        return Response(
-            content=pdf_content,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Content-Type": "application/pdf"
-            }
-        )
+        return _pdf_response(pdf_content, filename, headers)
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
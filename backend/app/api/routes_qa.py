@@ -1,13 +1,28 @@
 # app/api/routes_qa.py
-from fastapi import APIRouter, HTTPException, Depends  # type: ignore
+import asyncio
+import json
+import logging
+import time
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response  # type: ignore
+from fastapi.responses import StreamingResponse  # type: ignore
 from pydantic import BaseModel  # type: ignore
-from sqlalchemy.orm import Session  # type: ignore
+from sqlalchemy import select  # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.orm import selectinload  # type: ignore
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool  # type: ignore
 
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal, get_async_db
 from app.db.models.chat import ChatSession, ChatMessage
-from app.services.qa_engine import query_pdf
+from app.core.config import settings
+from app.services.qa_engine import aanswer_from_docs, aask_pdf, astream_answer
+from app.services.collection_search import search_collection
+from app.services.chat_history import build_history, condense_question
+from app.services.ingestion import STATUS_READY, STATUS_FAILED
+from app.services.pagination import after, decode_cursor, limit_page, ordering, page_size, split_page
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -15,6 +30,12 @@ class QuestionRequest(BaseModel):
     session_id: int
     question: str
 
+class CollectionQuestionRequest(BaseModel):
+    user_id: str
+    question: str
+    document_ids: Optional[List[int]] = None  # Restrict to these documents
+    k: int = 8
+
 class ChatMessageResponse(BaseModel):
     id: int
     session_id: int
@@ -25,18 +46,64 @@ class ChatMessageResponse(BaseModel):
     class Config:
         orm_mode = True
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _get_ready_session(db: AsyncSession, session_id: int):
+    """
+    Load a chat session and its document, failing unless the document is ready to query.
+    """
+    # Validate session exists
+    session = (await db.execute(
+        select(ChatSession)
+        .options(selectinload(ChatSession.document))
+        .where(ChatSession.id == session_id)
+    )).scalar_one_or_none()
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    
+    # Validate associated document exists
+    document = session.document
+    if not document:
+        raise HTTPException(status_code=404, detail="Associated document not found")
+    if document.status == STATUS_FAILED:
+        raise HTTPException(status_code=422, detail=f"Document processing failed: {document.error}")
+    if document.status != STATUS_READY:
+        raise HTTPException(status_code=409, detail="Document is still being processed")
+    return session, document
+
+async def _build_prompt(db: AsyncSession, session: ChatSession, question: str) -> Tuple[str, str]:
+    """
+    Returns:
+        (generation prompt with instructions and history, standalone retrieval query)
+    """
+    # Recent turns plus a rolling summary of older ones, within a token budget
+    history = await build_history(db, session)
+    retrieval_query = await condense_question(session, history, question)
+    
+    # Compose enhanced prompt with context and guidelines
+    system_prompt = (
+        "You are a helpful document assistant. Answer questions based strictly on the document content. "
+        "If a question is outside the document scope, politely respond: "
+        "'I can only assist with questions related to the document content.'"
+    )
+    
+    full_prompt = f"{system_prompt}\n\nConversation history:\n{history}\n\nUser: {question}\nAssistant:"
+    return full_prompt, retrieval_query
+
+async def _save_exchange(db: AsyncSession, session_id: int, question: str, answer: str) -> None:
+    now = datetime.utcnow()
+    db.add_all([
+        ChatMessage(session_id=session_id, role="user", content=question, timestamp=now),
+        ChatMessage(session_id=session_id, role="assistant", content=answer, timestamp=now)
+    ])
+    await db.commit()
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
         
 @router.post("/")
 async def ask_question(
     request: QuestionRequest, 
-    db: Session = Depends(get_db)
-) -> Dict[str, str]:
+    db: AsyncSession = Depends(get_async_db)
+) -> Dict[str, Any]:
     """
     Accepts a session_id and question, queries the vector index for the session's document,
     saves both user and assistant messages to the DB, and returns the answer.
@@ -46,69 +113,33 @@ async def ask_question(
         db: Database session
         
     Returns:
-        Dict containing the AI assistant's answer
+        Dict containing the AI assistant's answer and its citations: page,
+        page_end, section, character offsets and an excerpt of each chunk used
         
     Raises:
         HTTPException: If session not found, document not found, or query fails
     """
     try:
-        # Validate session exists
-        session = db.query(ChatSession).filter(ChatSession.id == request.session_id).first()
-        if not session:
-            raise HTTPException(status_code=404, detail="Chat session not found")
-        
-        # Validate associated document exists
-        document = session.document
-        if not document:
-            raise HTTPException(status_code=404, detail="Associated document not found")
-        
-        # Retrieve chat history for context
-        messages = (
-            db.query(ChatMessage)
-            .filter(ChatMessage.session_id == session.id)
-            .order_by(ChatMessage.timestamp)
-            .all()
-        )
+        session, document = await _get_ready_session(db, request.session_id)
+        full_prompt, retrieval_query = await _build_prompt(db, session, request.question)
         
-        # Build conversation history
-        history = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
-        
-        # Compose enhanced prompt with context and guidelines
-        system_prompt = (
-            "You are a helpful document assistant. Answer questions based strictly on the document content. "
-            "If a question is outside the document scope, politely respond: "
-            "'I can only assist with questions related to the document content.'"
+        # Retrieve with the standalone question; history and instructions only reach the LLM
+        # Cached answers are reused only for the same user: the index may be
+        # shared with other users' uploads and the prompt carries this user's history
+        answer, cited = await aask_pdf(
+            doc_id=document.filename,
+            question=full_prompt,
+            retrieval_query=retrieval_query,
+            scope=session.user_id,
         )
         
-        full_prompt = f"{system_prompt}\n\nConversation history:\n{history}\n\nUser: {request.question}\nAssistant:"
-        
-        # Query the document using the vector index
-        answer = query_pdf(doc_id=document.filename, question=full_prompt)
-        
         if not answer or not answer.strip():
             raise HTTPException(status_code=500, detail="Failed to generate response")
         
         # Save both user question and assistant response
-        now = datetime.utcnow()
-        new_messages = [
-            ChatMessage(
-                session_id=session.id, 
-                role="user", 
-                content=request.question, 
-                timestamp=now
-            ),
-            ChatMessage(
-                session_id=session.id, 
-                role="assistant", 
-                content=answer, 
-                timestamp=now
-            )
-        ]
+        await _save_exchange(db, session.id, request.question, answer)
         
-        db.add_all(new_messages)
-        db.commit()
-        
-        return {"answer": answer}
+        return {"answer": answer, "citations": cited}
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -120,38 +151,193 @@ async def ask_question(
             detail=f"Failed to process question: {str(e)}"
         )
 
+@router.post("/stream")
+async def ask_question_stream(
+    request: QuestionRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
+) -> StreamingResponse:
+    """
+    Streaming variant of /ask/: answer tokens are sent as Server-Sent Events.
+
+    Events:
+        token: {"text": str} for each chunk produced by the LLM
+        done: {"answer": str, "citations": list, "ttft_ms": float, "total_ms": float} once complete
+        error: {"detail": str} if generation fails mid-stream
+
+    The exchange is saved to the conversation only after the stream completes;
+    if the client disconnects first, generation is cancelled and nothing is saved.
+
+    Raises:
+        HTTPException: If session not found or document not ready (before streaming starts)
+    """
+    session, document = await _get_ready_session(db, request.session_id)
+    full_prompt, retrieval_query = await _build_prompt(db, session, request.question)
+    session_id = session.id
+    user_id = session.user_id
+    doc_id = document.filename
+
+    async def event_stream():
+        start = time.perf_counter()
+        ttft = None
+        parts: List[str] = []
+        cited: List[Dict[str, Any]] = []
+        try:
+            async for token in astream_answer(
+                doc_id=doc_id,
+                question=full_prompt,
+                retrieval_query=retrieval_query,
+                cited=cited,
+                scope=user_id,
+            ):
+                if await http_request.is_disconnected():
+                    logger.info("Client disconnected from /ask/stream for session %s", session_id)
+                    return
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(token)
+                yield _sse("token", {"text": token})
+
+            answer = "".join(parts)
+            if not answer.strip():
+                yield _sse("error", {"detail": "Failed to generate response"})
+                return
+
+            # The request-scoped session may already be closed; persist with our own
+            async with AsyncSessionLocal() as persist_db:
+                await _save_exchange(persist_db, session_id, request.question, answer)
+
+            total = time.perf_counter() - start
+            logger.info(
+                "Streamed answer for session %s: ttft=%.0fms total=%.0fms",
+                session_id, 1000 * (ttft or total), 1000 * total
+            )
+            yield _sse("done", {
+                "answer": answer,
+                "citations": cited,
+                "ttft_ms": round(1000 * (ttft or total), 1),
+                "total_ms": round(1000 * total, 1)
+            })
+        except asyncio.CancelledError:
+            logger.info("Stream cancelled for session %s", session_id)
+            raise
+        except LookupError as e:
+            yield _sse("error", {"detail": str(e)})
+        except Exception as e:
+            logger.exception("Streaming answer failed for session %s", session_id)
+            yield _sse("error", {"detail": f"Failed to process question: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/collection")
+async def ask_collection(request: CollectionQuestionRequest) -> Dict[str, Any]:
+    """
+    Answer a question from all of a user's ready documents (or the given subset).
+
+    The question is matched against every document's index and the best
+    chunks overall are used as context. Nothing is saved to a conversation.
+
+    Returns:
+        Dict with the answer and its sources: document_id, page (when the
+        index has page metadata), score (L2 distance, lower is closer) and an
+        excerpt of each chunk used
+
+    Raises:
+        HTTPException: If the user has no ready documents or the query fails
+    """
+    k = max(1, min(request.k, settings.collection_max_k))
+    try:
+        hits = await run_in_threadpool(
+            search_collection, request.user_id, request.question, k, request.document_ids
+        )
+        if not hits:
+            raise HTTPException(status_code=404, detail="No ready documents found for this user")
+
+        answer = await aanswer_from_docs([doc for doc, _ in hits], request.question)
+        if not answer or not answer.strip():
+            raise HTTPException(status_code=500, detail="Failed to generate response")
+
+        return {
+            "answer": answer,
+            "sources": [
+                {
+                    "document_id": doc.metadata["document_id"],
+                    "page": doc.metadata.get("page"),
+                    "score": round(score, 4),
+                    "excerpt": doc.page_content[:300],
+                }
+                for doc, score in hits
+            ],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process question: {str(e)}"
+        )
+
 @router.get("/conversations/{session_id}", response_model=List[ChatMessageResponse])
 async def get_conversation(
-    session_id: int, 
-    db: Session = Depends(get_db)
+    session_id: int,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    since: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
 ) -> List[ChatMessageResponse]:
     """
-    Retrieve all messages for a specific chat session, ordered by timestamp.
+    Retrieve messages for a specific chat session, ordered by timestamp.
+    All of them unless limit or cursor is given, then one page at a time.
     
     Args:
         session_id: The chat session ID
+        limit: Page size (at most PAGE_SIZE_MAX; PAGE_SIZE_DEFAULT when only cursor is given)
+        cursor: X-Next-Cursor header of the previous page
+        since: ID of the last message the client has; only later messages are returned
         db: Database session
         
     Returns:
-        List of chat messages for the session
+        List of chat messages for the session; the X-Next-Cursor response
+        header is set when more messages follow
         
     Raises:
-        HTTPException: If session not found
+        HTTPException: If session not found, or cursor/since is invalid
     """
     try:
         # Validate session exists
-        session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+        session = await db.get(ChatSession, session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Chat session not found")
-        
+
+        position = None
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        elif since is not None:
+            last_seen = await db.get(ChatMessage, since)
+            if not last_seen or last_seen.session_id != session_id:
+                raise HTTPException(status_code=400, detail="Unknown message for this session")
+            position = (last_seen.timestamp, last_seen.id)
+
         # Get messages ordered by timestamp
-        messages = (
-            db.query(ChatMessage)
-            .filter(ChatMessage.session_id == session_id)
-            .order_by(ChatMessage.timestamp)
-            .all()
-        )
-        
+        size = page_size(limit, cursor)
+        query = select(ChatMessage).where(ChatMessage.session_id == session_id)
+        if position:
+            query = query.where(after(ChatMessage.timestamp, ChatMessage.id, position))
+        rows = (await db.execute(
+            limit_page(query.order_by(*ordering(ChatMessage.timestamp, ChatMessage.id)), size)
+        )).scalars().all()
+
+        messages, next_cursor = split_page(rows, size, lambda m: (m.timestamp, m.id))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return messages
         
     except HTTPException:
@@ -1,40 +1,35 @@
 # app/api/routes_upload.py
 import os
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends  # type: ignore
+from fastapi.concurrency import run_in_threadpool  # type: ignore
 from uuid import uuid4
 from pathlib import Path
 from sqlalchemy.orm import Session  # type: ignore
 from typing import Dict, Any
 
 from app.core.config import settings
-from app.services.pdf_extractor import extract_text
-from app.services.qa_engine import build_index_from_pdf
-from app.db.session import SessionLocal
+from app.services.ingestion import STATUS_QUEUED, IngestionQueueFull, ingestion_owner, submit_ingestion, job_status
+from app.services.document_crud import add_deduplicated_document, find_user_document_by_digest
+from app.services.collection_search import registry as collection_registry
+from app.services.uploads import spool_upload
+from app.db.session import get_db
 from app.db.models.document import Document
 from app.db.models.users import User
 from app.db.models.chat import ChatSession
-from app.services.s3_client import upload_pdf
 
 router = APIRouter()
 UPLOAD_DIR = Path(settings.upload_dir)
 UPLOAD_DIR.mkdir(exist_ok=True)
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
         
 
-@router.post("/")
+@router.post("/", status_code=202)
 async def upload(
     file: UploadFile = File(...), 
     user_id: str = Form(...), 
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """
-    Uploads a PDF, extracts text, builds vector index, and returns session info.
+    Accepts a PDF, queues it for background ingestion, and returns session info.
     
     Args:
         file: The uploaded PDF file
@@ -42,10 +37,13 @@ async def upload(
         db: Database session
         
     Returns:
-        Dict containing session_id, created_at, and document info
+        Dict containing session_id, created_at, job_id and document info.
+        Poll /upload/jobs/{job_id} until the document status is 'ready'.
+        Uploading the same file again starts a new session on the user's
+        existing document.
         
     Raises:
-        HTTPException: If upload fails, user not found, or processing errors
+        HTTPException: If upload fails, user not found, or the ingestion queue is full
     """
     # Validate file type
     if not file.filename or not file.filename.lower().endswith('.pdf'):
@@ -61,57 +59,70 @@ async def upload(
     file_path = UPLOAD_DIR / filename
 
     try:
-        # Save uploaded PDF locally for processing
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Stream the PDF to disk, hashing it as it is written;
+        # the ingestion worker removes the file when done
+        _, content_digest = await spool_upload(file, file_path)
 
-        # Reset file pointer for S3 upload
-        await file.seek(0)
-        
-        # Upload to S3
-        upload_result = await upload_pdf(file)
-        s3_url = upload_result.get("url")
-        if not s3_url:
-            raise HTTPException(status_code=500, detail="Failed to upload file to S3")
-        
-        # Extract text and build vector index
-        text = extract_text(file_path)
-        if not text.strip():
-            raise HTTPException(status_code=400, detail="Could not extract text from PDF")
-            
-        build_index_from_pdf(text=text, doc_id=file_id)
-        
-        # Store document metadata
-        doc = Document(
-            filename=file_id,
-            content=text,
-            source=s3_url,
-            user_id=user_id
-        )
-        db.add(doc)
-        db.commit()
-        db.refresh(doc)
+        # The user uploaded these bytes before: open a new conversation on that document
+        doc = find_user_document_by_digest(db, user_id, content_digest)
+        reused = doc is not None
+        if not reused:
+            # Identical bytes were already indexed: share the existing index artifacts
+            # (same filename/index key, reference counted by Document rows)
+            doc = await run_in_threadpool(add_deduplicated_document, db, user_id, content_digest)
+        deduplicated = doc is not None and not reused
+        if doc is not None:
+            os.remove(file_path)
+        else:
+            # Content and source are filled in by the worker
+            doc = Document(
+                filename=file_id,
+                user_id=user_id,
+                content_digest=content_digest,
+                status=STATUS_QUEUED,
+                progress=0,
+                ingestion_owner=ingestion_owner()
+            )
+            db.add(doc)
+            db.commit()
+            db.refresh(doc)
         
         # Create chat session
         session = ChatSession(user_id=user_id, document_id=doc.id)
         db.add(session)
         db.commit()
         db.refresh(session)
+
+        if deduplicated:
+            # Already searchable: add it to the user's collection right away
+            collection_registry.add_document(user_id, doc.id, doc.filename)
+        elif not reused:
+            try:
+                submit_ingestion(doc.id, file_path)
+            except IngestionQueueFull as e:
+                db.delete(session)
+                db.delete(doc)
+                db.commit()
+                raise HTTPException(status_code=503, detail=str(e))
         
         return {
             "session_id": session.id,
             "created_at": session.started_at,
+            "job_id": doc.id,
             "document": {
                 "id": doc.id,
                 "filename": doc.filename,
                 "upload_time": doc.upload_time,
-                "file_url": doc.source
+                "file_url": doc.source,
+                "status": doc.status,
+                "progress": doc.progress
             }
         }
         
     except HTTPException:
-        # Re-raise HTTP exceptions as-is
+        # Nothing was queued, so the local file is ours to remove
+        if file_path.exists():
+            os.remove(file_path)
         raise
     except Exception as e:
         # Clean up local file on error
@@ -121,8 +132,13 @@ async def upload(
             status_code=500, 
             detail=f"Failed to process document: {str(e)}"
         )
-    finally:
-        # Clean up local file after processing
-        if file_path.exists():
-            os.remove(file_path)
-    
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """
+    Report ingestion status and progress for an uploaded document.
+    """
+    document = db.query(Document).filter(Document.id == job_id).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(document)
@@ -1,10 +1,12 @@
 # app/api/routes_users.py
-from fastapi import APIRouter, HTTPException, Depends  # type: ignore
+from fastapi import APIRouter, HTTPException, Depends, Query  # type: ignore
 from pydantic import BaseModel # type: ignore
-from sqlalchemy.orm import Session, joinedload # type: ignore
-from app.db.session import SessionLocal
+from typing import Optional
+from sqlalchemy.orm import Session, contains_eager # type: ignore
+from app.db.session import get_db
 from app.db.models.users import User
 from app.db.models.chat import ChatSession
+from app.services.pagination import after, decode_cursor, limit_page, ordering, page_size, split_page
 from sqlalchemy.exc import IntegrityError # type: ignore
 
 router = APIRouter()
@@ -15,13 +17,6 @@ class OAuthUserData(BaseModel):
     name: str = None
     email_verified: bool = False
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # @router.post("/", status_code=201)
 # def create_user(user: OAuthUserData, db: Session = Depends(get_db)):
 #     new_user = User(email=user.email, name=user.name)
@@ -35,8 +30,25 @@ def get_db():
 #         raise HTTPException(status_code=400, detail="Email already exists")
 
 @router.post("/auth/google")
-def google_login(user_data: OAuthUserData, db: Session = Depends(get_db)):
+def google_login(
+    user_data: OAuthUserData,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Sign a user in, creating them on first login, and return their chat
+    sessions newest first. All sessions unless limit or cursor is given;
+    then they are paged: pass the returned next_cursor as cursor to get
+    the next page.
+    """
     print(user_data)
+    position = None
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     user = db.query(User).filter(User.user_id == user_data.sub).first()
     if not user:
         user = User(
@@ -49,14 +61,18 @@ def google_login(user_data: OAuthUserData, db: Session = Depends(get_db)):
         db.commit()
         db.refresh(user)
 
-    # Fetch chat sessions + document metadata
-    sessions = (
+    # Fetch chat sessions + document metadata (sessions without a document are skipped)
+    size = page_size(limit, cursor)
+    query = (
         db.query(ChatSession)
+        .join(ChatSession.document)
         .filter(ChatSession.user_id == user.user_id)
-        .options(joinedload(ChatSession.document))  # Load document info
-        .order_by(ChatSession.started_at.desc())
-        .all()
+        .options(contains_eager(ChatSession.document))  # Load document info
     )
+    if position:
+        query = query.filter(after(ChatSession.started_at, ChatSession.id, position, descending=True))
+    rows = limit_page(query.order_by(*ordering(ChatSession.started_at, ChatSession.id, descending=True)), size).all()
+    sessions, next_cursor = split_page(rows, size, lambda session: (session.started_at, session.id))
     
     # Format response
     session_data = [
@@ -70,14 +86,15 @@ def google_login(user_data: OAuthUserData, db: Session = Depends(get_db)):
                 "file_url": session.document.source
             }
         }
-        for session in sessions if session.document
+        for session in sessions
     ]
     
     return {
         "user_id": user.user_id,
         "email": user.email,
         "name": user.name,
-        "sessions": session_data
+        "sessions": session_data,
+        "next_cursor": next_cursor
     }
     
     
@@ -8,8 +8,110 @@ class Settings(BaseSettings):
     upload_dir: str
     gemini_api_key: str
 
+    # Database connection pool (per engine; the sync and async engines each get one)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20  # Extra connections opened under burst load
+    db_pool_timeout: float = 10  # Seconds to wait for a connection before failing
+    db_pool_recycle: int = 1800  # Seconds before a connection is replaced
+    db_pool_pre_ping: bool = True  # Test connections on checkout, dropping stale ones
+    db_statement_timeout_ms: int = 30000  # PostgreSQL only; 0 = no limit
+
+    # Pagination of conversations, document lists and login session lists
+    page_size_default: int = 50  # Used when a cursor is given without a limit
+    page_size_max: int = 200
+
+    # Uploads
+    max_upload_bytes: int = 100 * 1024 * 1024
+    upload_chunk_size: int = 1024 * 1024
+    s3_multipart_chunk_size: int = 8 * 1024 * 1024
+    s3_max_concurrency: int = 4
+
+    # PDF text extraction
+    extract_workers: int = 0  # 0 = one process per CPU
+    extract_parallel_min_pages: int = 32
+
+    # Chunking
+    chunking: str = "structured"  # structured (PDF blocks, token sized) or character
+    chunk_max_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+
+    # Extracted text storage (gzip blobs referenced from Document.content_ref)
+    text_store: str = "local"  # local or s3
+    text_store_dir: str = "document_texts"
+    text_store_prefix: str = "texts/"  # S3 key prefix
+
+    # Background cleanup of deleted documents' index, text and S3 objects
+    cleanup_max_retries: int = 5
+    cleanup_retry_delay_seconds: float = 2  # Doubles after each failed attempt
+
+    # Conversation PDF export
+    pdf_export_workers: int = 2  # Render processes
+    pdf_export_max_concurrent: int = 4  # Renders queued or running at once; others wait
+    pdf_export_cache_max_bytes: int = 64 * 1024 * 1024
+    pdf_export_cache_max_entries: int = 256
+
+    # Vector store persistence
+    index_dir: str = "indexes"
+
+    # FAISS index type selection
+    index_type: str = "auto"  # auto, flat, hnsw or ivfpq
+    index_target: str = "balanced"  # recall, balanced or memory
+    index_flat_max_vectors: int = 20000  # Exact search up to this many vectors
+    index_hnsw_max_vectors: int = 1_000_000  # Above this, balanced switches to IVF-PQ
+    index_train_sample: int = 65536  # Vectors used to train IVF-PQ
+
+    # In-memory document cache limits
+    doc_cache_max_bytes: int = 512 * 1024 * 1024
+    doc_cache_max_entries: int = 256
+
+    # Background ingestion
+    ingestion_workers: int = 2
+    ingestion_max_pending: int = 32
+    ingestion_backend: str = ""  # Dotted path to an IngestionBackend subclass
+
+    # Embedding client
+    embedding_batch_size: int = 100
+    embedding_batch_max_tokens: int = 18000
+    embedding_concurrency: int = 4
+    embedding_requests_per_minute: float = 1500
+    embedding_max_retries: int = 5
+
+    # Embedding cache
+    embedding_cache_dir: str = "embedding_cache"
+    embedding_cost_per_million_tokens: float = 0.0  # Used to estimate savings only
+
+    # Conversation history sent with each question
+    history_max_turns: int = 6  # Recent question/answer pairs kept verbatim
+    history_token_budget: int = 2000
+    history_summary_max_tokens: int = 400
+    history_fold_batch: int = 4  # Messages folded into the summary per update
+
+    # Retrieval
+    retrieval_mode: str = "hybrid"  # hybrid (BM25 + vectors) or vector
+    retrieval_k: int = 4  # Chunks passed to the LLM
+    retrieval_fetch_k: int = 20  # Candidates from each ranking before fusion
+    retrieval_rrf_k: int = 60
+    lexical_only_max_terms: int = 6  # Identifier queries up to this many terms skip embedding
+
+    # Re-ranking between retrieval and generation
+    reranker: str = "lexical"  # lexical, cross-encoder, none, a dotted path, or empty to disable
+    rerank_candidates: int = 12  # Chunks fetched for the reranker to choose RETRIEVAL_K from
+    rerank_budget_ms: float = 50
+    rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+    # Cross-document search over a user's collection
+    collection_search_workers: int = 4  # Shards searched in parallel
+    collection_registry_ttl_seconds: float = 60  # Reload a user's document list after this
+    collection_max_k: int = 20
+
+    # Per-document answer cache for repeated questions
+    answer_cache_ttl_seconds: float = 24 * 60 * 60  # 0 = never expire
+    answer_cache_max_entries_per_doc: int = 256
+    answer_cache_max_docs: int = 1024
+    answer_cache_similarity_threshold: float = 0.95  # Cosine similarity; above 1 disables semantic matches
+
     class Config:
         env_file = ".env"
         extra = "allow"
-        
+
 settings = Settings()
\ No newline at end of file
@@ -1,16 +1,22 @@
 # app/models/chat.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text #type:ignore
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index #type:ignore
 from sqlalchemy.orm import relationship #type:ignore
 from datetime import datetime
 from app.db.base import Base
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ix_chat_sessions_user_id_started_at", "user_id", "started_at"),  # Login: a user's sessions, newest first
+        Index("ix_chat_sessions_document_id", "document_id"),  # Document deletion
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.user_id"))
-    document_id = Column(Integer, ForeignKey("documents.id"))
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"))
     started_at = Column(DateTime, default=datetime.utcnow)
+    summary = Column(Text, nullable=True)  # Rolling summary of turns older than the history window
+    summarized_until_id = Column(Integer, nullable=True)  # Last ChatMessage.id folded into summary
 
     user = relationship("User", backref="chat_sessions")
     document = relationship("Document", backref="chat_sessions")
@@ -18,9 +24,13 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_timestamp", "session_id", "timestamp"),  # A conversation in order
+        Index("ix_chat_messages_session_id_id", "session_id", "id"),  # History past the summary, in id order
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("chat_sessions.id"))
+    session_id = Column(Integer, ForeignKey("chat_sessions.id", ondelete="CASCADE"))
     role = Column(String, nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -1,16 +1,26 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey #type:ignore
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index #type:ignore
 from sqlalchemy.orm import relationship #type:ignore
 from datetime import datetime
 from app.db.base import Base #type:ignore
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_user_id_filename", "user_id", "filename"),  # A user's documents, by index key
+        Index("ix_documents_filename", "filename"),  # Rows sharing an index (reference counting)
+        Index("ix_documents_user_id_upload_time", "user_id", "upload_time"),  # Paged document list, newest first
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
     upload_time = Column(DateTime, default=datetime.utcnow)
-    content = Column(Text, nullable=True)  # Raw extracted text (optional)
+    content_ref = Column(String, nullable=True)  # Extracted text in the text store (see text_store.py)
     source = Column(String, nullable=True)  # Path or S3 key (optional)
     user_id = Column(String, ForeignKey("users.user_id"))
+    status = Column(String, nullable=False, default="ready", server_default="ready")  # Ingestion stage or ready/failed
+    progress = Column(Integer, nullable=False, default=100, server_default="100")  # 0-100
+    error = Column(Text, nullable=True)  # Failure reason when status is 'failed'
+    content_digest = Column(String(64), nullable=True, index=True)  # sha256 of the uploaded bytes
+    ingestion_owner = Column(String, nullable=True)  # Process ingesting it (see ingestion.recover_interrupted_jobs)
     
     user = relationship("User", backref="documents")
\ No newline at end of file
@@ -0,0 +1,108 @@
+# app/db/pool.py
+"""
+Connection pool settings and checkout metrics.
+
+Both engines use a QueuePool subclass that times every checkout, i.e. how
+long a request waited for a connection (including opening a new one and the
+pre-ping). Together with the pool's current usage this shows how close the
+pool is to exhaustion: saturation is checked-out connections over
+DB_POOL_SIZE + DB_MAX_OVERFLOW, and timeouts count requests that gave up
+after DB_POOL_TIMEOUT seconds.
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc  # type: ignore
+from sqlalchemy.engine import make_url  # type: ignore
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool  # type: ignore
+
+from app.core.config import settings
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self, pool) -> Dict[str, Any]:
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        with self._lock:
+            return {
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "saturation": pool.checkedout() / capacity if capacity else 0.0,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(1000 * self.total_wait / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait, 3),
+            }
+
+
+class _TimedCheckout:
+    stats: PoolStats
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start, timed_out=False)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    stats = PoolStats()
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """
+    create_engine / create_async_engine keyword arguments for url.
+    In-memory SQLite keeps SQLAlchemy's default single-connection pool.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+
+    options: Dict[str, Any] = {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    timeout_ms = settings.db_statement_timeout_ms
+    if backend in ("postgresql", "postgres") and timeout_ms > 0:
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    pool = engine.pool
+    if not isinstance(pool, _TimedCheckout):
+        return {"size": pool.size() if hasattr(pool, "size") else 1}
+    return pool.stats.snapshot(pool)
@@ -1,9 +1,81 @@
 from sqlalchemy import create_engine #type:ignore
+from sqlalchemy.engine import make_url #type:ignore
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine #type:ignore
 from sqlalchemy.orm import sessionmaker #type:ignore
 from app.core.config import settings
+from app.db.pool import engine_options
+import logging
 import os
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+# Pool size, overflow, timeouts and pre-ping come from the DB_* settings (see pool.py)
+engine = create_engine(settings.database_url, **engine_options(settings.database_url))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_db():
+    """One session per request; FastAPI reuses it for every dependency of that request."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Async drivers for the same database, used on request paths that must not block the event loop
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# libpq connection parameters asyncpg takes under another name, and the ones it keeps
+ASYNCPG_RENAMED_PARAMS = {"sslmode": "ssl"}
+ASYNCPG_PARAMS = {"ssl", "target_session_attrs", "prepared_statement_cache_size"}
+
+def async_database_url(url: str) -> str:
+    """
+    url with the async driver of its database. For asyncpg, libpq query
+    parameters are renamed where asyncpg has an equivalent and dropped
+    otherwise (e.g. channel_binding), since asyncpg rejects unknown ones;
+    connect_timeout is passed by async_connect_args instead.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    if backend in ("postgresql", "postgres") and parsed.query:
+        query = {}
+        for name, value in parsed.query.items():
+            name = ASYNCPG_RENAMED_PARAMS.get(name, name)
+            if name in ASYNCPG_PARAMS:
+                query[name] = value
+            elif name != "connect_timeout":
+                logger.warning("Ignoring connection parameter %r, which asyncpg does not support", name)
+        parsed = parsed.set(query=query)
+    return parsed.render_as_string(hide_password=False)
+
+def async_connect_args(url: str) -> Dict[str, Any]:
+    """asyncpg connect() arguments for libpq parameters that need a typed value."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() not in ("postgresql", "postgres"):
+        return {}
+    timeout = parsed.query.get("connect_timeout")
+    return {"timeout": float(timeout)} if timeout else {}
+
+def _async_engine_options(url: str) -> Dict[str, Any]:
+    options = engine_options(async_database_url(url), is_async=True)
+    connect_args = {**options.get("connect_args", {}), **async_connect_args(url)}
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+async_engine = create_async_engine(async_database_url(settings.database_url), **_async_engine_options(settings.database_url))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,5 +1,6 @@
 from fastapi import FastAPI  # type: ignore
-from app.api import routes_upload, routes_qa, routes_docs, routes_users, routes_pdf
+from app.api import routes_upload, routes_qa, routes_docs, routes_users, routes_pdf, routes_metrics
+from app.services.ingestion import recover_interrupted_jobs
 from fastapi.middleware.cors import CORSMiddleware  # type: ignore
 from dotenv import load_dotenv  # type: ignore
 import uvicorn
@@ -19,8 +20,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],  # Pagination cursor, PDF export version
 )
 
+# Ingestion jobs of the previous process were lost with it
+@app.on_event("startup")
+def recover_ingestion():
+    recover_interrupted_jobs()
+
 # Health check route
 @app.get("/")
 def read_root():
@@ -32,3 +39,4 @@ app.include_router(routes_qa.router, prefix="/ask", tags=["QA"])
 app.include_router(routes_docs.router, prefix="/docs", tags=["Documents"])
 app.include_router(routes_users.router, prefix="/users", tags=["Users"])
 app.include_router(routes_pdf.router, prefix="/pdf", tags=["PDF"])
+app.include_router(routes_metrics.router, prefix="/metrics", tags=["Metrics"])
@@ -0,0 +1,194 @@
+# app/services/answer_cache.py
+"""
+Per-document cache of answers to previously asked questions.
+
+Answers are kept per (document, scope). Deduplicated uploads share one index
+key across users, and answers are generated from prompts that include the
+asker's conversation history, so callers pass the user as scope and answers
+are never served across scopes.
+
+Questions are matched first by normalized text, which needs no embedding
+call, then by cosine similarity of their embeddings against a small
+per-document matrix. Entries expire after a TTL and are evicted in
+least-recently-used order, per document and across documents. A document's
+answers are dropped whenever its index is rebuilt.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np  # type: ignore
+
+from app.services.embedding_cache import normalize_text
+
+
+def question_key(question: str) -> str:
+    return normalize_text(question).lower().rstrip("?.! ")
+
+
+class _Entry:
+    __slots__ = ("key", "vector", "answer", "created_at")
+
+    def __init__(self, key: str, vector: Optional[np.ndarray], answer: Any, created_at: float):
+        self.key = key
+        self.vector = vector
+        self.answer = answer
+        self.created_at = created_at
+
+
+class _DocAnswers:
+    """Answers for one document, least recently used first."""
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Row order of the matrix; independent of LRU order, which changes on every hit
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> Tuple[List[str], np.ndarray]:
+        if self._matrix is None:
+            # Entries stored without an embedding only match exactly
+            self._keys = [k for k, e in self.entries.items() if e.vector is not None]
+            vectors = [self.entries[k].vector for k in self._keys]
+            self._matrix = np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        return self._keys, self._matrix
+
+    def add(self, entry: _Entry) -> None:
+        self.entries[entry.key] = entry
+        self.entries.move_to_end(entry.key)
+        self._matrix = None
+
+    def remove(self, key: str) -> None:
+        del self.entries[key]
+        self._matrix = None
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries_per_doc: int,
+        max_docs: int,
+        similarity_threshold: float,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_doc = max_entries_per_doc
+        self.max_docs = max_docs
+        self.similarity_threshold = similarity_threshold
+        self._docs: "OrderedDict[Tuple[str, Optional[str]], _DocAnswers]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def _touch_locked(self, scoped: Tuple[str, Optional[str]], answers: _DocAnswers, entry: _Entry) -> Any:
+        answers.entries.move_to_end(entry.key)
+        self._docs.move_to_end(scoped)
+        return entry.answer
+
+    def get_exact(self, doc_id: str, question: str, scope: Optional[str] = None) -> Optional[Any]:
+        """Answer cached for the same question text, without embedding it."""
+        key = question_key(question)
+        scoped = (doc_id, scope)
+        now = time.monotonic()
+        with self._lock:
+            answers = self._docs.get(scoped)
+            entry = answers.entries.get(key) if answers else None
+            if entry is None:
+                return None
+            if self._expired(entry, now):
+                answers.remove(key)
+                return None
+            self.exact_hits += 1
+            return self._touch_locked(scoped, answers, entry)
+
+    def get_similar(self, doc_id: str, vector: Sequence[float], scope: Optional[str] = None) -> Optional[Any]:
+        """Answer to the most similar cached question above the threshold, if any."""
+        query = _unit(vector)
+        scoped = (doc_id, scope)
+        now = time.monotonic()
+        with self._lock:
+            answers = self._docs.get(scoped)
+            if answers:
+                for key in [k for k, e in answers.entries.items() if self._expired(e, now)]:
+                    answers.remove(key)
+            if not answers or not answers.entries:
+                self.misses += 1
+                return None
+            keys, matrix = answers.matrix()
+            if not keys or matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+            entry = answers.entries[keys[best]]
+            self.semantic_hits += 1
+            return self._touch_locked(scoped, answers, entry)
+
+    def put(
+        self,
+        doc_id: str,
+        question: str,
+        vector: Optional[Sequence[float]],
+        answer: Any,
+        scope: Optional[str] = None,
+    ) -> None:
+        """
+        Cache answer (whatever the caller wants back, e.g. text and citations);
+        without a vector it can only be found by get_exact.
+        """
+        unit = _unit(vector) if vector is not None else None
+        entry = _Entry(question_key(question), unit, answer, time.monotonic())
+        scoped = (doc_id, scope)
+        with self._lock:
+            answers = self._docs.get(scoped)
+            if answers is None:
+                answers = self._docs[scoped] = _DocAnswers()
+            answers.add(entry)
+            self._docs.move_to_end(scoped)
+            while len(answers.entries) > self.max_entries_per_doc:
+                answers.remove(next(iter(answers.entries)))
+                self.evictions += 1
+            while len(self._docs) > self.max_docs:
+                _, dropped = self._docs.popitem(last=False)
+                self.evictions += len(dropped.entries)
+
+    def invalidate(self, doc_id: str) -> None:
+        """Drop the document's answers in every scope."""
+        with self._lock:
+            scoped = [key for key in self._docs if key[0] == doc_id]
+            for key in scoped:
+                del self._docs[key]
+            if scoped:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "documents": len({doc_id for doc_id, _ in self._docs}),
+                "scopes": len(self._docs),
+                "entries": sum(len(a.entries) for a in self._docs.values()),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,196 @@
+# app/services/chat_history.py
+"""
+Token-budgeted conversation history.
+
+The last HISTORY_MAX_TURNS turns are replayed verbatim. Older turns are
+folded into a rolling summary stored on ChatSession, updated a few messages
+at a time in id order, so the prompt stays bounded however long the session
+gets. Only messages newer than the summary are read, with a limit.
+
+condense_question turns a follow-up question into a standalone one for
+retrieval, so the retriever never embeds the history or instructions.
+"""
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select  # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+
+from app.core.config import settings
+from app.db.models.chat import ChatSession, ChatMessage
+from app.services.tokens import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Words that usually point back into the conversation ("what about its cost?")
+_REFERENCES = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|he|she|him|her|his|"
+    r"above|previous|earlier|same|former|latter|else|more|again|also|why|how so)\b",
+    re.IGNORECASE,
+)
+_CONDENSE_CACHE_SIZE = 1024
+# Bounds on summary updates per prompt; each folds at most HISTORY_TOKEN_BUDGET tokens
+_MAX_FOLDS_PER_CALL = 4
+_MAX_FOLD_MESSAGES = 50
+_condensed: "OrderedDict[Tuple[int, str, str], str]" = OrderedDict()
+_condensed_lock = threading.Lock()
+
+
+def _format(messages: List[ChatMessage]) -> List[str]:
+    return [f"{msg.role}: {msg.content}" for msg in messages]
+
+
+async def _fold_into_summary(summary: Optional[str], messages: List[ChatMessage]) -> str:
+    # Imported lazily: qa_engine builds the LLM client at import time
+    from app.services.qa_engine import llm
+
+    prompt = (
+        "Update the running summary of a conversation between a user and a document assistant. "
+        "Keep facts, names, numbers and open questions; drop pleasantries. "
+        f"Reply with the updated summary only, at most {settings.history_summary_max_tokens} tokens.\n\n"
+        f"Current summary:\n{summary or '(none)'}\n\n"
+        "New messages:\n" + "\n".join(_format(messages))
+    )
+    result = await llm.ainvoke(prompt)
+    return truncate_tokens(result.content.strip(), settings.history_summary_max_tokens)
+
+
+async def count_unsummarized(db: AsyncSession, session: ChatSession) -> int:
+    """Messages not yet folded into the summary."""
+    query = select(func.count()).select_from(ChatMessage).where(ChatMessage.session_id == session.id)
+    if session.summarized_until_id is not None:
+        query = query.where(ChatMessage.id > session.summarized_until_id)
+    return (await db.execute(query)).scalar_one()
+
+
+async def load_recent_messages(db: AsyncSession, session: ChatSession, limit: int) -> List[ChatMessage]:
+    """Newest messages after the summarized range, returned oldest first."""
+    query = select(ChatMessage).where(ChatMessage.session_id == session.id)
+    if session.summarized_until_id is not None:
+        query = query.where(ChatMessage.id > session.summarized_until_id)
+    rows = (await db.execute(query.order_by(ChatMessage.id.desc()).limit(limit))).scalars().all()
+    return list(reversed(rows))
+
+
+async def load_unsummarized(db: AsyncSession, session: ChatSession, limit: int) -> List[ChatMessage]:
+    """Oldest messages after the summarized range, oldest first."""
+    query = select(ChatMessage).where(ChatMessage.session_id == session.id)
+    if session.summarized_until_id is not None:
+        query = query.where(ChatMessage.id > session.summarized_until_id)
+    return list((await db.execute(query.order_by(ChatMessage.id).limit(limit))).scalars().all())
+
+
+def _within_budget(messages: List[ChatMessage], budget: int) -> List[ChatMessage]:
+    """Leading messages whose lines fit budget tokens (at least one)."""
+    taken = 0
+    for line in _format(messages):
+        budget -= count_tokens(line) + 1
+        if budget < 0 and taken:
+            break
+        taken += 1
+    return messages[:taken]
+
+
+async def build_history(db: AsyncSession, session: ChatSession) -> str:
+    """
+    Conversation history for the next prompt: rolling summary plus recent turns
+    within HISTORY_TOKEN_BUDGET tokens. May update and commit session.summary.
+
+    Messages are folded into the summary in id order, starting right after
+    summarized_until_id, so none is skipped. A long unsummarized backlog
+    (sessions from before summaries existed, or after failed folds) is
+    worked off a few batches per call.
+    """
+    window = 2 * settings.history_max_turns
+    fold_batch = settings.history_fold_batch
+
+    # Messages past the verbatim window are folded once enough have piled up,
+    # so the summary LLM call happens every few turns rather than every turn
+    pending = await count_unsummarized(db, session)
+    for _ in range(_MAX_FOLDS_PER_CALL):
+        if pending - window < fold_batch:
+            break
+        overflow = await load_unsummarized(db, session, min(pending - window, _MAX_FOLD_MESSAGES))
+        batch = _within_budget(overflow, settings.history_token_budget)
+        try:
+            session.summary = await _fold_into_summary(session.summary, batch)
+            session.summarized_until_id = batch[-1].id
+            await db.commit()
+        except Exception:
+            # A failed summary only costs context, never the answer
+            logger.exception("Failed to update summary for session %s", session.id)
+            await db.rollback()
+            await db.refresh(session)
+            break
+        pending -= len(batch)
+
+    messages = await load_recent_messages(db, session, window + fold_batch)
+
+    summary = session.summary
+    budget = settings.history_token_budget
+    if summary:
+        budget -= count_tokens(summary)
+
+    # Keep the newest lines that fit the budget
+    lines: List[str] = []
+    for line in reversed(_format(messages)):
+        cost = count_tokens(line) + 1
+        if cost > budget:
+            break
+        lines.append(line)
+        budget -= cost
+    lines.reverse()
+
+    parts = []
+    if summary:
+        parts.append(f"Summary of earlier conversation: {summary}")
+    parts.extend(lines)
+    return "\n".join(parts)
+
+
+def needs_condensing(history: str, question: str) -> bool:
+    """A question needs rewriting only if there is history it may refer to."""
+    return bool(history) and bool(_REFERENCES.search(question))
+
+
+async def condense_question(session: ChatSession, history: str, question: str) -> str:
+    """
+    Standalone form of question to use as the retrieval query.
+
+    Self-contained questions are returned unchanged without an LLM call.
+    Rewrites are cached per turn (session, history, question), so retries and
+    the streaming endpoint reuse them. Falls back to the raw question on error.
+    """
+    if not needs_condensing(history, question):
+        return question
+
+    key = (session.id, hashlib.sha256(history.encode("utf-8")).hexdigest(), question)
+    with _condensed_lock:
+        if key in _condensed:
+            _condensed.move_to_end(key)
+            return _condensed[key]
+
+    from app.services.qa_engine import llm
+
+    prompt = (
+        "Rewrite the follow-up question as a standalone question that can be understood "
+        "without the conversation. Resolve pronouns and references, keep the user's wording "
+        "otherwise, and reply with the question only.\n\n"
+        f"Conversation:\n{history}\n\nFollow-up question: {question}\nStandalone question:"
+    )
+    try:
+        result = await llm.ainvoke(prompt)
+        standalone = result.content.strip() or question
+    except Exception:
+        logger.exception("Failed to condense question for session %s", session.id)
+        return question
+
+    with _condensed_lock:
+        _condensed[key] = standalone
+        while len(_condensed) > _CONDENSE_CACHE_SIZE:
+            _condensed.popitem(last=False)
+    return standalone
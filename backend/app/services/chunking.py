@@ -0,0 +1,251 @@
+# app/services/chunking.py
+"""
+Incremental text chunking.
+
+StreamingCharacterSplitter produces exactly the chunks that
+CharacterTextSplitter(separator, chunk_size, chunk_overlap).split_text would
+produce for the concatenated input, but consumes the text piece by piece and
+yields each chunk as soon as it is complete. Only the text since the last
+separator and the current chunk window are held in memory.
+
+iter_structured_chunks instead packs PDF text blocks (see
+pdf_extractor.iter_page_blocks) into chunks of at most max_tokens tokens,
+starting a new chunk at each heading. Every chunk records the pages it spans,
+its section heading, and its character offsets in the document text built by
+page_text/"\n".join, of which its text is an exact slice.
+"""
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from langchain.docstore.document import Document  # type: ignore
+
+from app.services.tokens import count_tokens, split_token_spans
+
+
+class StreamingCharacterSplitter:
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 100, separator: str = "\n\n"):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separator = separator
+        self._buffer = ""
+        self._current: List[str] = []
+        self._total = 0
+
+    def feed(self, text: str) -> Iterator[str]:
+        """Add text; yield every chunk that can no longer change."""
+        self._buffer += text
+        parts = self._buffer.split(self.separator)
+        # The tail may still be extended (or turn into a separator) by later text
+        self._buffer = parts.pop()
+        for part in parts:
+            if part:
+                yield from self._merge(part)
+
+    def finish(self) -> Iterator[str]:
+        """Flush the remaining text once the input is exhausted."""
+        if self._buffer:
+            yield from self._merge(self._buffer)
+            self._buffer = ""
+        doc = self._join(self._current)
+        self._current, self._total = [], 0
+        if doc is not None:
+            yield doc
+
+    def _merge(self, split: str) -> Iterator[str]:
+        # Mirrors TextSplitter._merge_splits one split at a time
+        sep_len = len(self.separator)
+        length = len(split)
+        if self._total + length + (sep_len if self._current else 0) > self.chunk_size:
+            if self._current:
+                doc = self._join(self._current)
+                if doc is not None:
+                    yield doc
+                while self._total > self.chunk_overlap or (
+                    self._total + length + (sep_len if self._current else 0) > self.chunk_size
+                    and self._total > 0
+                ):
+                    self._total -= len(self._current[0]) + (sep_len if len(self._current) > 1 else 0)
+                    self._current = self._current[1:]
+        self._current.append(split)
+        self._total += length + (sep_len if len(self._current) > 1 else 0)
+
+    def _join(self, splits: List[str]):
+        text = self.separator.join(splits).strip()
+        return text or None
+
+
+def iter_chunks(
+    pages: Iterable[str],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 100,
+    page_separator: str = "\n",
+) -> Iterator[str]:
+    """Chunk pages as they arrive, as if they had been joined with page_separator."""
+    splitter = StreamingCharacterSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    first = True
+    for page in pages:
+        yield from splitter.feed(page if first else page_separator + page)
+        first = False
+    yield from splitter.finish()
+
+
+# Sentences, or lines, with their trailing punctuation/newline
+_SENTENCE = re.compile(r"[^\n.!?]*(?:[.!?]+\s*|\n|$)")
+
+
+def page_text(blocks: Iterable[Tuple[str, bool]]) -> str:
+    """Text of one page as it is joined into the text saved to the text store (see text_store)."""
+    return "\n".join(text for text, _ in blocks)
+
+
+class _Piece:
+    __slots__ = ("text", "page", "start", "tokens", "heading", "separator")
+
+    def __init__(self, text: str, page: int, start: int, tokens: int, heading: bool, separator: str):
+        self.text = text
+        self.page = page
+        self.start = start
+        self.tokens = tokens
+        self.heading = heading
+        # Text between the previous piece and this one in the document ("" inside a block)
+        self.separator = separator
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+
+def _split_block(text: str, max_tokens: int, first_max_tokens: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    (start, end) spans of text, cut at sentence or line ends, each within
+    max_tokens (the first within first_max_tokens, if given).
+    """
+    spans: List[Tuple[int, int]] = []
+
+    def limit() -> int:
+        return first_max_tokens if first_max_tokens and not spans else max_tokens
+
+    start = end = 0
+    for match in _SENTENCE.finditer(text):
+        if match.end() == match.start():
+            continue
+        if end > start and count_tokens(text[start:match.end()]) > limit():
+            spans.append((start, end))
+            start = end
+        end = match.end()
+        # A single sentence over the limit is cut at token boundaries
+        while count_tokens(text[start:end]) > limit():
+            _, cut = split_token_spans(text[start:end], limit())[0]
+            spans.append((start, start + cut))
+            start += cut
+    if end > start:
+        spans.append((start, end))
+    return spans
+
+
+def iter_structured_chunks(
+    pages: Iterable[Tuple[int, List[Tuple[str, bool]]]],
+    max_tokens: int = 256,
+    overlap_tokens: int = 32,
+) -> Iterator[Document]:
+    """
+    Chunk (page_number, [(block_text, is_heading), ...]) pages as they arrive.
+
+    Blocks are kept whole where they fit; larger ones are cut at sentence
+    ends. A heading closes the current chunk once it holds a quarter of
+    max_tokens, and a heading always stays with the text that follows it.
+    Chunks cut for size repeat up to overlap_tokens of trailing blocks;
+    chunks never overlap across a heading.
+    """
+    min_tokens = max_tokens // 4
+    current: List[_Piece] = []
+    current_tokens = 0
+    section: Optional[str] = None
+    chunk_section: Optional[str] = None
+
+    def joined(pieces: List[_Piece]) -> str:
+        return pieces[0].text + "".join(p.separator + p.text for p in pieces[1:])
+
+    def emit() -> Document:
+        first, last = current[0], current[-1]
+        text = joined(current)
+        return Document(
+            page_content=text,
+            metadata={
+                "page": first.page,
+                "page_end": last.page,
+                "section": chunk_section,
+                "start_offset": first.start,
+                "end_offset": last.end,
+            },
+        )
+
+    offset = 0
+    last_end = 0
+    first_page = True
+    for page_number, blocks in pages:
+        if not first_page:
+            offset += 1
+        first_page = False
+        for index, (text, heading) in enumerate(blocks):
+            if index:
+                offset += 1
+            block_start = offset
+            offset += len(text)
+            tokens = count_tokens(text)
+            # A heading keeps the text after it, so that text gets what is left of the chunk
+            budget = max_tokens
+            if current and all(p.heading for p in current):
+                budget = max(1, max_tokens - count_tokens(joined(current)) - 1)
+            if heading or tokens <= budget:
+                spans = [(0, len(text))]
+            else:
+                spans = _split_block(text, max_tokens, first_max_tokens=budget)
+            for start, end in spans:
+                piece_text = text[start:end]
+                piece = _Piece(
+                    piece_text,
+                    page_number,
+                    block_start + start,
+                    tokens if len(spans) == 1 else count_tokens(piece_text),
+                    heading,
+                    # Pages and blocks are joined with newlines; empty pages add more
+                    "\n" * (block_start + start - last_end),
+                )
+                last_end = piece.end
+                if piece.heading and current and current_tokens >= min_tokens:
+                    yield emit()
+                    current, current_tokens = [], 0
+                elif (
+                    current
+                    and not all(p.heading for p in current)
+                    # Separators add tokens too, so count the text the chunk would have
+                    and count_tokens(joined(current + [piece])) > max_tokens
+                ):
+                    yield emit()
+                    # Carry trailing pieces (never a heading) into the next chunk,
+                    # as long as the piece still fits after them
+                    carried: List[_Piece] = []
+                    carried_tokens = 0
+                    for prev in reversed(current):
+                        if (
+                            prev.heading
+                            or carried_tokens + prev.tokens > overlap_tokens
+                            or count_tokens(joined([prev] + carried + [piece])) > max_tokens
+                        ):
+                            break
+                        carried.insert(0, prev)
+                        carried_tokens += prev.tokens
+                    current, current_tokens = carried, carried_tokens
+                if piece.heading:
+                    section = piece.text
+                if not current:
+                    chunk_section = section
+                current.append(piece)
+                current_tokens += piece.tokens
+    if current:
+        yield emit()
@@ -0,0 +1,112 @@
+# app/services/cleanup.py
+"""
+Background removal of a deleted document's artifacts.
+
+Deleting a document only removes database rows; everything stored under its
+index key (Document.filename) is cleaned up here, off the request path: the
+on-disk index, the cached chain and answers, the extracted text blob and
+the uploaded PDF in S3. Deduplicated uploads share these artifacts, so they
+are only removed once no document row references the key any more.
+
+Failed jobs are retried with exponential backoff (CLEANUP_RETRY_DELAY_SECONDS,
+doubling, up to CLEANUP_MAX_RETRIES times); a job that still fails is logged
+and counted, and can be re-run with cleanup_document_artifacts.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import qa_engine, text_store
+from app.services.document_crud import count_index_references, lock_index_key
+from app.services.index_store import delete_vectorstore
+from app.services.s3_client import delete_pdf_object
+
+logger = logging.getLogger(__name__)
+
+
+def cleanup_document_artifacts(index_key: str, source: Optional[str], content_ref: Optional[str]) -> bool:
+    """
+    Remove the artifacts under index_key if no document references it.
+    Returns False when the artifacts are still in use and were kept.
+    """
+    db = SessionLocal()
+    try:
+        # Held until the artifacts are gone, so a deduplicated upload cannot
+        # start sharing them in between (see add_deduplicated_document)
+        with lock_index_key(db, index_key):
+            if count_index_references(db, index_key):
+                return False
+
+            qa_engine.doc_qa_map.pop(index_key)
+            qa_engine.answer_cache.invalidate(index_key)
+            delete_vectorstore(index_key)
+            text_store.delete_text(content_ref)
+            if source:
+                delete_pdf_object(source)
+            return True
+    finally:
+        db.close()
+
+
+class CleanupQueue:
+    """Single background worker running cleanup jobs with retries."""
+
+    def __init__(self, max_retries: int, retry_delay: float):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleanup")
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.retries = 0
+        self.failed = 0
+
+    def submit(self, job: Callable[..., Any], *args: Any) -> None:
+        self._submit(job, args, 0)
+
+    def _submit(self, job: Callable[..., Any], args: tuple, attempt: int) -> None:
+        with self._lock:
+            self.pending += 1
+        self._executor.submit(self._run, job, args, attempt)
+
+    def _run(self, job: Callable[..., Any], args: tuple, attempt: int) -> None:
+        try:
+            job(*args)
+        except Exception:
+            if attempt < self.max_retries:
+                delay = self.retry_delay * 2 ** attempt
+                logger.warning("Cleanup %s%r failed, retrying in %.1fs", job.__name__, args, delay, exc_info=True)
+                with self._lock:
+                    self.retries += 1
+                timer = threading.Timer(delay, self._submit, (job, args, attempt + 1))
+                timer.daemon = True
+                timer.start()
+            else:
+                logger.exception("Cleanup %s%r failed after %d attempts", job.__name__, args, attempt + 1)
+                with self._lock:
+                    self.failed += 1
+        else:
+            with self._lock:
+                self.completed += 1
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": self.pending,
+                "completed": self.completed,
+                "retries": self.retries,
+                "failed": self.failed,
+            }
+
+
+cleanup_queue = CleanupQueue(settings.cleanup_max_retries, settings.cleanup_retry_delay_seconds)
+
+
+def schedule_document_cleanup(index_key: str, source: Optional[str], content_ref: Optional[str]) -> None:
+    cleanup_queue.submit(cleanup_document_artifacts, index_key, source, content_ref)
@@ -0,0 +1,126 @@
+# app/services/collection_search.py
+"""
+Search across all of a user's documents.
+
+Every ready document's vector store is one shard of the user's collection.
+A question is embedded once, sent to each shard in parallel and the hits are
+merged by distance, so adding or removing a document never rebuilds
+anything: it only changes the shard list.
+
+The shard list is loaded from the database on first use, kept current by
+add_document/remove_document as documents finish ingestion or are deleted,
+and reloaded after COLLECTION_REGISTRY_TTL_SECONDS so other API workers
+converge on the same view.
+"""
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from langchain.docstore.document import Document  # type: ignore
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.models.document import Document as DocumentRow
+from app.services import qa_engine
+
+_search_executor = ThreadPoolExecutor(
+    max_workers=settings.collection_search_workers, thread_name_prefix="collection-search"
+)
+
+
+def _load_user_shards(user_id: str) -> Dict[int, str]:
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(DocumentRow.id, DocumentRow.filename)
+            .filter(DocumentRow.user_id == user_id, DocumentRow.status == "ready")
+            .all()
+        )
+        return {row.id: row.filename for row in rows}
+    finally:
+        db.close()
+
+
+class CollectionRegistry:
+    """user_id -> {document id: index key (Document.filename)}."""
+
+    def __init__(self, loader: Callable[[str], Dict[int, str]], ttl_seconds: float):
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._users: Dict[str, Tuple[float, Dict[int, str]]] = {}
+        self._lock = threading.Lock()
+
+    def shards(self, user_id: str) -> Dict[int, str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry and now - entry[0] < self.ttl_seconds:
+                return dict(entry[1])
+        shards = self._loader(user_id)
+        with self._lock:
+            self._users[user_id] = (now, shards)
+        return dict(shards)
+
+    def add_document(self, user_id: str, document_id: int, index_key: str) -> None:
+        with self._lock:
+            entry = self._users.get(user_id)
+            # Users not loaded yet pick the document up from the database
+            if entry:
+                entry[1][document_id] = index_key
+
+    def remove_document(self, user_id: str, document_id: int) -> None:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry:
+                entry[1].pop(document_id, None)
+
+
+registry = CollectionRegistry(_load_user_shards, settings.collection_registry_ttl_seconds)
+
+
+def _search_shard(index_key: str, vector: List[float], k: int) -> List[Tuple[Document, float]]:
+    qa_chain = qa_engine.load_index(index_key)
+    if not qa_chain:
+        return []
+    return qa_chain.retriever.vectorstore.similarity_search_with_score_by_vector(vector, k=k)
+
+
+def search_collection(
+    user_id: str,
+    query: str,
+    k: int = 8,
+    document_ids: Optional[Iterable[int]] = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Top k chunks for query across the user's ready documents, best first.
+
+    Each returned chunk carries "doc_id" (index key) and "document_id"
+    metadata for filtering and citations. Scores are L2 distances, comparable
+    across shards because every index uses the same embedding model.
+    """
+    shards = registry.shards(user_id)
+    if document_ids is not None:
+        wanted = set(document_ids)
+        shards = {doc: key for doc, key in shards.items() if doc in wanted}
+    if not shards:
+        return []
+
+    # Deduplicated uploads share one index; search it once, cite the first row
+    by_key: Dict[str, int] = {}
+    for document_id, index_key in sorted(shards.items()):
+        by_key.setdefault(index_key, document_id)
+
+    vector = qa_engine.embedding.embed_query(query)
+    futures = {
+        index_key: _search_executor.submit(_search_shard, index_key, vector, k)
+        for index_key in by_key
+    }
+
+    hits: List[Tuple[Document, float]] = []
+    for index_key, future in futures.items():
+        for doc, score in future.result():
+            metadata = {**doc.metadata, "doc_id": index_key, "document_id": by_key[index_key]}
+            hits.append((Document(page_content=doc.page_content, metadata=metadata), float(score)))
+    return heapq.nsmallest(k, hits, key=lambda hit: hit[1])
@@ -0,0 +1,142 @@
+# app/services/doc_cache.py
+"""
+Bounded LRU cache for per-document QA state.
+
+Entries are sized by an estimate supplied by the caller and evicted in
+least-recently-used order once either the byte budget or the entry limit
+is exceeded. Loads are serialised per key so concurrent requests for the
+same cold document only hit the disk once.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class DocumentCache:
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # key -> [lock, number of threads holding or waiting on it]
+        self._key_locks: Dict[str, List[Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._lookup_locked(key)
+            if value is None:
+                self.misses += 1
+            return value
+
+    def put(self, key: str, value: Any, size: int) -> None:
+        with self._lock:
+            self._put_locked(key, value, size)
+
+    def pop(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[str], Optional[Any]],
+        sizer: Callable[[Any], int],
+    ) -> Optional[Any]:
+        """
+        Return the cached value for key, loading it with loader on a miss.
+
+        Only one thread runs loader for a given key; others wait for it and
+        then read the result from the cache. A loader returning None is not
+        cached.
+        """
+        with self._lock:
+            value = self._lookup_locked(key)
+            if value is not None:
+                return value
+
+        key_lock = self._acquire_key_lock(key)
+        try:
+            with key_lock:
+                # Another thread may have loaded it while we waited
+                with self._lock:
+                    value = self._lookup_locked(key)
+                    if value is not None:
+                        return value
+                    self.misses += 1
+                value = loader(key)
+                if value is not None:
+                    self.put(key, value, sizer(value))
+                return value
+        finally:
+            self._release_key_lock(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _lookup_locked(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def _put_locked(self, key: str, value: Any, size: int) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while len(self._entries) > 1 and (
+            self._bytes > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _acquire_key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            holder = self._key_locks.get(key)
+            if holder is None:
+                holder = [threading.Lock(), 0]
+                self._key_locks[key] = holder
+            holder[1] += 1
+            return holder[0]
+
+    def _release_key_lock(self, key: str) -> None:
+        with self._lock:
+            holder = self._key_locks[key]
+            holder[1] -= 1
+            if holder[1] == 0:
+                del self._key_locks[key]
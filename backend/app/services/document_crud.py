@@ -1,6 +1,15 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import text #type:ignore
 from sqlalchemy.orm import Session #type:ignore
 from app.db.models.document import Document
 
+# Striped process-local locks for databases without advisory locks
+_INDEX_KEY_LOCKS = [threading.Lock() for _ in range(64)]
+
 def create_document(db: Session, doc_data: dict):
     doc = Document(**doc_data)
     db.add(doc)
@@ -13,3 +22,85 @@ def get_document_by_id(db: Session, doc_id: int):
 
 def get_all_documents(db: Session):
     return db.query(Document).all()
+
+def find_indexed_document_by_digest(db: Session, digest: str):
+    """Return a ready document whose upload had the same sha256, if any."""
+    return (
+        db.query(Document)
+        .filter(Document.content_digest == digest, Document.status == "ready")
+        .order_by(Document.id)
+        .first()
+    )
+
+def find_user_document_by_digest(db: Session, user_id: str, digest: str):
+    """The user's own earlier upload of the same bytes that has not failed, if any."""
+    return (
+        db.query(Document)
+        .filter(
+            Document.user_id == user_id,
+            Document.content_digest == digest,
+            Document.status != "failed",
+        )
+        .order_by(Document.id)
+        .first()
+    )
+
+@contextmanager
+def lock_index_key(db: Session, index_key: str) -> Iterator[None]:
+    """
+    Serialize changes to the references of index_key: a deduplicated upload
+    adding a row, and cleanup deciding the artifacts are unused. On
+    PostgreSQL this is a transaction-scoped advisory lock, held across
+    processes until db commits or rolls back; elsewhere a process-local lock
+    held for the block.
+    """
+    digest = hashlib.sha256(index_key.encode("utf-8")).digest()
+    if db.get_bind().dialect.name == "postgresql":
+        key = int.from_bytes(digest[:8], "big", signed=True)
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": key})
+        yield
+        return
+    with _INDEX_KEY_LOCKS[digest[0] % len(_INDEX_KEY_LOCKS)]:
+        yield
+
+def add_deduplicated_document(db: Session, user_id: str, digest: str) -> Optional[Document]:
+    """
+    Add a ready document for user_id that shares the index of an already
+    indexed upload with the same digest, or return None if there is none.
+
+    The source row is looked up again under lock_index_key, so a concurrent
+    delete either finishes first (and the upload is ingested afresh) or
+    sees the new row and keeps the artifacts.
+    """
+    while True:
+        existing = find_indexed_document_by_digest(db, digest)
+        if existing is None:
+            return None
+        index_key = existing.filename
+        with lock_index_key(db, index_key):
+            db.expire_all()
+            existing = find_indexed_document_by_digest(db, digest)
+            if existing is None or existing.filename != index_key:
+                db.rollback()
+                continue
+            doc = Document(
+                filename=existing.filename,
+                content_ref=existing.content_ref,
+                source=existing.source,
+                user_id=user_id,
+                content_digest=digest,
+                status="ready",
+                progress=100,
+            )
+            db.add(doc)
+            db.commit()
+        db.refresh(doc)
+        return doc
+
+def count_index_references(db: Session, index_key: str) -> int:
+    """
+    Number of documents sharing the index artifacts stored under index_key
+    (Document.filename). Artifacts may only be removed when this reaches zero.
+    Failed documents do not count: their job's artifacts are removed when it fails.
+    """
+    return db.query(Document).filter(Document.filename == index_key, Document.status != "failed").count()
@@ -0,0 +1,154 @@
+# app/services/embedding_cache.py
+"""
+Content-addressed cache of chunk embeddings.
+
+Vectors are keyed by sha256(model, normalized chunk text) and stored as
+float32 blobs in a local SQLite file, so re-uploads and revised versions of
+a document only send new chunks to the provider. Query embeddings are not
+cached: providers embed queries and documents differently.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np  # type: ignore
+from langchain_core.embeddings import Embeddings  # type: ignore
+
+from app.services.embedding_client import CHARS_PER_TOKEN
+
+# SQLite's default limit on bound parameters is 999
+_LOOKUP_CHUNK = 500
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(model: str, text: str) -> bytes:
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.digest()
+
+
+class EmbeddingStore:
+    """SQLite-backed map of cache key -> float32 vector."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key BLOB PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        found: Dict[bytes, np.ndarray] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_CHUNK):
+                batch = unique[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[bytes(key)] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[bytes, Sequence[float]]) -> None:
+        rows = []
+        for key, vector in items.items():
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((key, int(array.shape[0]), array.tobytes()))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        base: Embeddings,
+        store: EmbeddingStore,
+        model: str,
+        cost_per_million_tokens: float = 0.0,
+    ):
+        self.base = base
+        self.store = store
+        self.model = model
+        self.cost_per_million_tokens = cost_per_million_tokens
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys = [cache_key(self.model, t) for t in texts]
+        cached = self.store.get_many(keys)
+
+        # Each distinct missing chunk is sent to the provider once
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.store.put_many(fresh)
+            cached.update({k: np.asarray(v, dtype=np.float32) for k, v in fresh.items()})
+
+        hits = len(texts) - len(missing)
+        saved = sum(
+            max(1, len(t) // CHARS_PER_TOKEN)
+            for k, t in zip(keys, texts)
+            if k not in missing
+        )
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += len(missing)
+            self.saved_tokens += saved
+
+        return [cached[k].tolist() for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_tokens_estimate": self.saved_tokens,
+                "saved_cost_estimate": round(
+                    self.saved_tokens * self.cost_per_million_tokens / 1_000_000, 6
+                ),
+            }
@@ -0,0 +1,211 @@
+# app/services/embedding_client.py
+"""
+Batched, concurrent, rate-limited wrapper around a LangChain Embeddings object.
+
+Texts are packed into request-sized batches, sent through a small thread pool,
+throttled by a token bucket and retried with exponential backoff on transient
+provider errors (429s, 5xx, timeouts). The wrapped object can be any
+Embeddings implementation, so a local fake can stand in for the provider.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings  # type: ignore
+from tenacity import (  # type: ignore
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio used to size batches without a tokenizer call
+CHARS_PER_TOKEN = 4
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "TimeoutError",
+    "ConnectionError",
+}
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Walk the exception chain looking for a rate-limit or server-side failure."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if type(exc).__name__ in TRANSIENT_ERROR_NAMES:
+            return True
+        code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+        if isinstance(code, int) and code in TRANSIENT_STATUS_CODES:
+            return True
+        message = str(exc).lower()
+        if "429" in message or "rate limit" in message or "quota" in message:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate_per_second: float, capacity: Optional[float] = None):
+        self.rate = rate_per_second
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_second)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens from the bucket. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class BatchedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        base: Embeddings,
+        max_batch_size: int = 100,
+        max_batch_tokens: int = 18000,
+        concurrency: int = 4,
+        requests_per_minute: float = 1500,
+        max_retries: int = 5,
+        latency_window: int = 500,
+    ):
+        self.base = base
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self._bucket = TokenBucket(requests_per_minute / 60.0)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="embedding"
+        )
+        self._stats_lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self.batches = 0
+        self.texts = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttle_seconds = 0.0
+
+    def pack_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Greedily group text indices so each batch stays under both the item
+        and the estimated token limit. Order is preserved.
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = max(1, len(text) // CHARS_PER_TOKEN)
+            if current and (
+                len(current) >= self.max_batch_size
+                or current_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _call(self, fn, *args: Any) -> Any:
+        def before_sleep(retry_state) -> None:
+            with self._stats_lock:
+                self.retries += 1
+            logger.warning(
+                "Embedding request failed (attempt %s), retrying: %s",
+                retry_state.attempt_number,
+                retry_state.outcome.exception(),
+            )
+
+        retrying = Retrying(
+            stop=stop_after_attempt(self.max_retries),
+            wait=wait_exponential_jitter(initial=1, max=30),
+            retry=retry_if_exception(is_transient_error),
+            before_sleep=before_sleep,
+            reraise=True,
+        )
+        for attempt in retrying:
+            with attempt:
+                waited = self._bucket.acquire()
+                start = time.perf_counter()
+                result = fn(*args)
+                latency = time.perf_counter() - start
+                with self._stats_lock:
+                    self._latencies.append(latency)
+                    self.throttle_seconds += waited
+                return result
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        try:
+            vectors = self._call(self.base.embed_documents, batch)
+        except Exception:
+            with self._stats_lock:
+                self.failures += 1
+            raise
+        with self._stats_lock:
+            self.batches += 1
+            self.texts += len(batch)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = self.pack_batches(texts)
+        futures = [
+            self._executor.submit(self._embed_batch, [texts[i] for i in batch])
+            for batch in batches
+        ]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        for batch, future in zip(batches, futures):
+            for i, vector in zip(batch, future.result()):
+                results[i] = vector
+        return results  # type: ignore[return-value]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call(self.base.embed_query, text)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            stats: Dict[str, Any] = {
+                "batches": self.batches,
+                "texts": self.texts,
+                "retries": self.retries,
+                "failures": self.failures,
+                "throttle_seconds": round(self.throttle_seconds, 3),
+            }
+        if latencies:
+            stats["latency_ms"] = {
+                "avg": round(1000 * sum(latencies) / len(latencies), 1),
+                "p50": round(1000 * latencies[len(latencies) // 2], 1),
+                "p95": round(1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                "max": round(1000 * latencies[-1], 1),
+            }
+        return stats
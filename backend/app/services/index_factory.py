@@ -0,0 +1,168 @@
+# app/services/index_factory.py
+"""
+Choice and construction of FAISS index types.
+
+Small stores keep the exact flat L2 index LangChain builds by default. Larger
+ones switch to HNSW (fast, approximate, no training, more memory) or IVF-PQ
+(compressed codes, trained on a sample of the vectors). The choice depends
+on the vector count and INDEX_TARGET:
+
+    recall    flat for longer, then HNSW with wide search
+    balanced  flat, then HNSW, then IVF-PQ for very large stores
+    memory    flat, then IVF-PQ with small codes
+
+INDEX_TYPE forces one type instead. The parameters are stored in the index
+manifest and search-time knobs (efSearch, nprobe) are re-applied on load.
+"""
+import math
+from typing import Any, Dict, Optional
+
+import faiss  # type: ignore
+import numpy as np  # type: ignore
+
+from app.core.config import settings
+
+INDEX_FLAT = "flat"
+INDEX_HNSW = "hnsw"
+INDEX_IVFPQ = "ivfpq"
+
+TARGETS = ("recall", "balanced", "memory")
+
+# k-means wants ~39 training points per centroid (also >= 256 for 8-bit PQ)
+_MIN_POINTS_PER_LIST = 39
+_PQ_NBITS = 8
+_MIN_IVFPQ_VECTORS = 16 * _MIN_POINTS_PER_LIST
+
+_HNSW_PARAMS = {
+    "recall": {"M": 48, "ef_construction": 200, "ef_search": 128},
+    "balanced": {"M": 32, "ef_construction": 80, "ef_search": 64},
+    "memory": {"M": 16, "ef_construction": 64, "ef_search": 48},
+}
+
+# (code bytes per vector as a fraction of dimension, nprobe). Recall is
+# bounded mostly by the code size; nprobe matters much less.
+_IVFPQ_PARAMS = {
+    "recall": (1 / 2, 32),
+    "balanced": (1 / 4, 16),
+    "memory": (1 / 8, 8),
+}
+
+
+def _pq_subquantizers(dim: int, fraction: float) -> int:
+    """Largest divisor of dim not above dim * fraction (PQ needs m | dim)."""
+    wanted = max(1, int(dim * fraction))
+    for m in range(wanted, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _ivfpq_params(count: int, dim: int, target: str) -> Dict[str, Any]:
+    fraction, nprobe = _IVFPQ_PARAMS[target]
+    nlist = 2 ** round(math.log2(max(16, 4 * math.sqrt(count))))
+    trained_on = min(count, settings.index_train_sample)
+    nlist = max(16, min(nlist, trained_on // _MIN_POINTS_PER_LIST))
+    return {
+        "type": INDEX_IVFPQ,
+        "nlist": nlist,
+        "m": _pq_subquantizers(dim, fraction),
+        "nbits": _PQ_NBITS,
+        "nprobe": min(nprobe, nlist),
+    }
+
+
+def choose_index_params(count: int, dim: int, target: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Index type and parameters for count vectors of dimension dim.
+
+    Raises:
+        ValueError: If INDEX_TARGET or INDEX_TYPE is not recognised
+    """
+    target = target or settings.index_target
+    if target not in TARGETS:
+        raise ValueError(f"Unknown index target {target!r}, expected one of {TARGETS}")
+
+    kind = settings.index_type
+    if kind == "auto":
+        flat_max = settings.index_flat_max_vectors
+        if target == "recall":
+            flat_max *= 4
+        if count <= flat_max:
+            kind = INDEX_FLAT
+        elif target == "memory" or (
+            target == "balanced" and count > settings.index_hnsw_max_vectors
+        ):
+            kind = INDEX_IVFPQ
+        else:
+            kind = INDEX_HNSW
+
+    if kind == INDEX_IVFPQ and count < _MIN_IVFPQ_VECTORS:
+        # Too few vectors to train the quantizers; exact search is cheap anyway
+        kind = INDEX_FLAT
+
+    if kind == INDEX_FLAT:
+        return {"type": INDEX_FLAT}
+    if kind == INDEX_HNSW:
+        return {"type": INDEX_HNSW, **_HNSW_PARAMS[target]}
+    if kind == INDEX_IVFPQ:
+        return _ivfpq_params(count, dim, target)
+    raise ValueError(f"Unknown index type {kind!r}")
+
+
+def create_index(dim: int, params: Dict[str, Any], vectors: Optional[np.ndarray] = None):
+    """
+    Empty index for params, trained on a sample of vectors when the type needs it.
+    """
+    kind = params["type"]
+    if kind == INDEX_FLAT:
+        return faiss.IndexFlatL2(dim)
+    if kind == INDEX_HNSW:
+        index = faiss.IndexHNSWFlat(dim, params["M"])
+        index.hnsw.efConstruction = params["ef_construction"]
+        index.hnsw.efSearch = params["ef_search"]
+        return index
+    if kind == INDEX_IVFPQ:
+        if vectors is None:
+            raise ValueError("IVF-PQ indexes need vectors to train on")
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["m"], params["nbits"])
+        sample = vectors
+        if len(vectors) > settings.index_train_sample:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), settings.index_train_sample, replace=False)]
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+        index.nprobe = params["nprobe"]
+        return index
+    raise ValueError(f"Unknown index type {kind!r}")
+
+
+def describe_index(index) -> Dict[str, Any]:
+    """Parameters of an existing index, in the form choose_index_params returns."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return {
+            "type": INDEX_HNSW,
+            "M": index.hnsw.nb_neighbors(1),
+            "ef_construction": index.hnsw.efConstruction,
+            "ef_search": index.hnsw.efSearch,
+        }
+    if isinstance(index, faiss.IndexIVFPQ):
+        return {
+            "type": INDEX_IVFPQ,
+            "nlist": index.nlist,
+            "m": index.pq.M,
+            "nbits": index.pq.nbits,
+            "nprobe": index.nprobe,
+        }
+    if isinstance(index, faiss.IndexFlat):
+        return {"type": INDEX_FLAT}
+    return {"type": type(index).__name__}
+
+
+def apply_search_params(index, params: Dict[str, Any]) -> None:
+    """Re-apply search-time settings that FAISS does not keep across a save."""
+    kind = params.get("type")
+    if kind == INDEX_HNSW and "ef_search" in params:
+        faiss.downcast_index(index).hnsw.efSearch = params["ef_search"]
+    elif kind == INDEX_IVFPQ and "nprobe" in params:
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
@@ -0,0 +1,221 @@
+# app/services/index_store.py
+"""
+Versioned on-disk format for per-document vector stores.
+
+Each document gets a directory under INDEX_DIR:
+
+    INDEX_DIR/<doc_id>/
+        manifest.json   format version, dimension, chunk count, index params
+        index.faiss     raw FAISS index
+        ids.json        docstore id for every vector, in index order
+        chunks.jsonl    one {"id", "text", "metadata"} record per chunk
+        bm25.npz        BM25 postings over the chunks, in index order (optional)
+
+The FAISS index is memory-mapped when the index type supports it and the
+chunk texts are only read on the first search that needs them.
+"""
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+import faiss  # type: ignore
+from langchain_community.docstore.base import Docstore  # type: ignore
+from langchain_community.vectorstores import FAISS  # type: ignore
+from langchain_community.vectorstores.utils import DistanceStrategy  # type: ignore
+from langchain.docstore.document import Document  # type: ignore
+
+from app.core.config import settings
+from app.services.index_factory import apply_search_params, describe_index
+from app.services.lexical_index import BM25Index
+
+FORMAT_VERSION = 1
+
+INDEX_DIR = settings.index_dir
+os.makedirs(INDEX_DIR, exist_ok=True)
+
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+IDS_FILE = "ids.json"
+CHUNKS_FILE = "chunks.jsonl"
+BM25_FILE = "bm25.npz"
+
+
+class LazyChunkDocstore(Docstore):
+    """Read-only docstore that loads chunks.jsonl on first access."""
+
+    def __init__(self, chunks_path: str):
+        self._chunks_path = chunks_path
+        self._docs: Optional[Dict[str, Document]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Document]:
+        if self._docs is None:
+            with self._lock:
+                if self._docs is None:
+                    docs = {}
+                    with open(self._chunks_path, "r", encoding="utf-8") as f:
+                        for line in f:
+                            record = json.loads(line)
+                            docs[record["id"]] = Document(
+                                id=record["id"],
+                                page_content=record["text"],
+                                metadata=record.get("metadata") or {},
+                            )
+                    self._docs = docs
+        return self._docs
+
+    @property
+    def loaded(self) -> bool:
+        return self._docs is not None
+
+    def search(self, search: str) -> Union[str, Document]:
+        doc = self._load().get(search)
+        if doc is None:
+            return f"ID {search} not found."
+        return doc
+
+    def text_bytes(self) -> int:
+        """Approximate size of the chunk texts, without forcing a load."""
+        if self._docs is None:
+            return os.path.getsize(self._chunks_path)
+        return sum(len(d.page_content) for d in self._docs.values())
+
+
+def doc_index_path(doc_id: str) -> str:
+    return os.path.join(INDEX_DIR, doc_id)
+
+
+def has_vectorstore(doc_id: str) -> bool:
+    return os.path.exists(os.path.join(doc_index_path(doc_id), MANIFEST_FILE))
+
+
+def save_vectorstore(
+    vectorstore: FAISS,
+    doc_id: str,
+    index_params: Optional[Dict[str, Any]] = None,
+    lexical_index: Optional[BM25Index] = None,
+) -> str:
+    """
+    Persist index, docstore and id map for a document.
+
+    Files are written to a temporary directory first and swapped in with a
+    rename, so a concurrent reader never sees a half-written store.
+    index_params defaults to the parameters read off the index itself.
+    lexical_index, if given, is written alongside.
+
+    Returns:
+        Path of the document's index directory
+    """
+    target = doc_index_path(doc_id)
+    tmp = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    ids: List[str] = [
+        vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)
+    ]
+
+    faiss.write_index(vectorstore.index, os.path.join(tmp, INDEX_FILE))
+
+    with open(os.path.join(tmp, IDS_FILE), "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+
+    with open(os.path.join(tmp, CHUNKS_FILE), "w", encoding="utf-8") as f:
+        for _id in ids:
+            doc = vectorstore.docstore.search(_id)
+            record = {"id": _id, "text": doc.page_content, "metadata": doc.metadata}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    if lexical_index is not None:
+        lexical_index.save(os.path.join(tmp, BM25_FILE))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "doc_id": doc_id,
+        "dimension": vectorstore.index.d,
+        "count": vectorstore.index.ntotal,
+        "normalize_L2": vectorstore._normalize_L2,
+        "distance_strategy": str(vectorstore.distance_strategy.value),
+        "index_params": index_params or describe_index(vectorstore.index),
+        "lexical": lexical_index is not None,
+    }
+    with open(os.path.join(tmp, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(target):
+        old = f"{target}.old-{os.getpid()}-{threading.get_ident()}"
+        os.replace(target, old)
+        os.replace(tmp, target)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp, target)
+    return target
+
+
+def read_manifest(doc_id: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(doc_index_path(doc_id), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _read_index(path: str):
+    # Flat codes can be mmapped directly; other index types fall back to a normal read.
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            return faiss.read_index(path)
+
+
+def load_vectorstore(doc_id: str, embedding) -> Optional[FAISS]:
+    """
+    Load a persisted vector store, or None if the document has no store on disk.
+
+    Raises:
+        ValueError: If the store was written with an unsupported format version
+    """
+    manifest = read_manifest(doc_id)
+    if manifest is None:
+        return None
+    version = manifest.get("format_version")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format version {version} for {doc_id}")
+
+    path = doc_index_path(doc_id)
+    index = _read_index(os.path.join(path, INDEX_FILE))
+    apply_search_params(index, manifest.get("index_params") or {})
+    with open(os.path.join(path, IDS_FILE), "r", encoding="utf-8") as f:
+        ids = json.load(f)
+
+    return FAISS(
+        embedding_function=embedding,
+        index=index,
+        docstore=LazyChunkDocstore(os.path.join(path, CHUNKS_FILE)),
+        index_to_docstore_id=dict(enumerate(ids)),
+        normalize_L2=manifest.get("normalize_L2", False),
+        distance_strategy=DistanceStrategy(
+            manifest.get("distance_strategy", DistanceStrategy.EUCLIDEAN_DISTANCE.value)
+        ),
+    )
+
+
+def load_lexical_index(doc_id: str) -> Optional[BM25Index]:
+    """BM25 index saved with the document's vector store, if it has one."""
+    path = os.path.join(doc_index_path(doc_id), BM25_FILE)
+    if not os.path.exists(path):
+        return None
+    return BM25Index.load(path)
+
+
+def delete_vectorstore(doc_id: str) -> None:
+    shutil.rmtree(doc_index_path(doc_id), ignore_errors=True)
+    # Pre-manifest layout kept a single raw index file per document
+    legacy = os.path.join(INDEX_DIR, f"{doc_id}.faiss")
+    if os.path.exists(legacy):
+        os.remove(legacy)
@@ -0,0 +1,416 @@
+# app/services/ingestion.py
+"""
+Background ingestion of uploaded PDFs.
+
+Uploads are accepted immediately and processed by a bounded worker pool
+through the stages extract -> chunk -> embed -> index -> persist. The first
+three are streamed, so embedding starts before extraction finishes. Chunks
+follow the PDF's block and heading structure and carry page and offset
+metadata (CHUNKING=character restores the plain character splitter). Progress
+is written to the Document row so clients can poll /upload/jobs/{id}.
+A document deleted while its job is queued or running is noticed at the next
+progress update; the job stops and whatever it already stored is handed to
+the cleanup queue, as it is when a job fails.
+
+The pool is an in-process ThreadPoolExecutor by default. Another backend
+(e.g. a task queue) can be plugged in with INGESTION_BACKEND, a dotted path
+to an IngestionBackend subclass, or at runtime with set_ingestion_backend.
+Jobs in the default pool do not survive a restart, so recover_interrupted_jobs
+runs at startup: documents left mid-ingestion are queued again from their
+spooled upload, or marked failed when the upload is gone. Several processes
+may share UPLOAD_DIR: each writes its owner id on the documents it ingests
+and holds a lock file under UPLOAD_DIR/.owners while it runs, so recovery
+only takes over documents whose owner has exited, claiming each with a
+conditional update.
+"""
+import importlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.models.document import Document
+from app.services.chunking import iter_chunks, iter_structured_chunks, page_text
+from app.services.cleanup import schedule_document_cleanup
+from app.services.pdf_extractor import iter_page_blocks, iter_pages, page_count
+from app.services import qa_engine, text_store
+from app.services.collection_search import registry as collection_registry
+from app.services.s3_client import upload_pdf_file
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks
+    fcntl = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+# Stage name -> progress reported when the stage starts
+STAGES = {
+    "uploading": 5,
+    # Extraction, chunking and embedding overlap; progress climbs with pages read
+    "embedding": 15,
+    "indexing": 80,
+    "persisting": 90,
+}
+
+
+# "<host>:<token>", written on the documents this process ingests
+OWNER_LOCK_DIR = ".owners"
+_OWNER_ID = f"{socket.gethostname()}:{uuid.uuid4().hex}"
+_owner_lock_file = None
+_owner_lock = threading.Lock()
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the backend refuses more pending jobs."""
+
+
+class DocumentDeleted(Exception):
+    """Raised inside a job whose document row no longer exists."""
+
+
+class IngestionBackend:
+    """Runs ingestion jobs. Subclasses decide where and how."""
+
+    def submit(self, job: Callable[..., None], *args: Any) -> None:
+        raise NotImplementedError
+
+    def pending(self) -> int:
+        return 0
+
+
+class ThreadPoolBackend(IngestionBackend):
+    """In-process pool with a fixed worker count and a cap on queued jobs."""
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ingestion"
+        )
+        self._max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, job: Callable[..., None], *args: Any) -> None:
+        with self._lock:
+            if self._pending >= self._max_pending:
+                raise IngestionQueueFull("Too many documents are being processed")
+            self._pending += 1
+        future = self._executor.submit(job, *args)
+        future.add_done_callback(self._job_done)
+
+    def _job_done(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def pending(self) -> int:
+        return self._pending
+
+
+def _backend_from_settings() -> IngestionBackend:
+    if settings.ingestion_backend:
+        module_name, _, class_name = settings.ingestion_backend.rpartition(".")
+        backend_cls = getattr(importlib.import_module(module_name), class_name)
+        return backend_cls()
+    return ThreadPoolBackend(
+        max_workers=settings.ingestion_workers,
+        max_pending=settings.ingestion_max_pending,
+    )
+
+
+_backend: Optional[IngestionBackend] = None
+
+
+def get_ingestion_backend() -> IngestionBackend:
+    global _backend
+    if _backend is None:
+        _backend = _backend_from_settings()
+    return _backend
+
+
+def set_ingestion_backend(backend: IngestionBackend) -> None:
+    global _backend
+    _backend = backend
+
+
+def _owner_lock_path(token: str) -> Path:
+    return Path(settings.upload_dir) / OWNER_LOCK_DIR / f"{token}.lock"
+
+
+def ingestion_owner() -> str:
+    """
+    Owner id for documents this process ingests. The first call takes the
+    process's lock file, held until exit, which marks its jobs as running.
+    """
+    global _owner_lock_file
+    with _owner_lock:
+        if _owner_lock_file is None:
+            path = _owner_lock_path(_OWNER_ID.rpartition(":")[2])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            lock_file = open(path, "a")
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            _owner_lock_file = lock_file
+    return _OWNER_ID
+
+
+def _owner_alive(owner: str) -> bool:
+    """
+    Whether the process owning a job may still be running it. Owners on other
+    hosts are taken to be alive: their spooled files are not here, and their
+    host recovers them. Without fcntl the lock cannot be checked and every
+    other owner is taken to have exited (one process per UPLOAD_DIR).
+    """
+    host, _, token = owner.rpartition(":")
+    if owner == _OWNER_ID or host != socket.gethostname():
+        return True
+    path = _owner_lock_path(token)
+    if fcntl is None or not path.exists():
+        return False
+    with open(path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+    path.unlink(missing_ok=True)
+    return False
+
+
+def _claim_document(document_id: int, owner: Optional[str]) -> bool:
+    """
+    Take over an unfinished document from owner, requeued at progress 0.
+    False if another process changed it first.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Document).filter(
+            Document.id == document_id,
+            Document.status.notin_((STATUS_READY, STATUS_FAILED)),
+            Document.ingestion_owner.is_(None) if owner is None else Document.ingestion_owner == owner,
+        )
+        claimed = query.update(
+            {
+                Document.ingestion_owner: ingestion_owner(),
+                Document.status: STATUS_QUEUED,
+                Document.progress: 0,
+                Document.error: None,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        return claimed > 0
+    finally:
+        db.close()
+
+
+def submit_ingestion(document_id: int, file_path: Path) -> None:
+    """
+    Queue a document for background processing.
+
+    Raises:
+        IngestionQueueFull: If the backend is at capacity
+    """
+    get_ingestion_backend().submit(run_ingestion, document_id, str(file_path))
+
+
+def _update_document(document_id: int, **fields: Any) -> bool:
+    """Update the row; False if it no longer exists."""
+    db = SessionLocal()
+    try:
+        updated = db.query(Document).filter(Document.id == document_id).update(fields)
+        db.commit()
+        return updated > 0
+    finally:
+        db.close()
+
+
+def _update_live_document(document_id: int, **fields: Any) -> None:
+    """
+    Raises:
+        DocumentDeleted: If the document was deleted while the job ran
+    """
+    if not _update_document(document_id, **fields):
+        raise DocumentDeleted(document_id)
+
+
+def _enter_stage(document_id: int, stage: str) -> None:
+    _update_live_document(document_id, status=stage, progress=STAGES[stage])
+
+
+def run_ingestion(document_id: int, file_path: str) -> None:
+    """Process one uploaded PDF end to end. Runs on a worker."""
+    db = SessionLocal()
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            logger.warning("Ingestion job for missing document %s", document_id)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            return
+        doc_id = document.filename
+        user_id = document.user_id
+    finally:
+        db.close()
+
+    s3_url: Optional[str] = None
+    source_recorded = False
+    content_ref: Optional[str] = None
+    try:
+        _enter_stage(document_id, "uploading")
+        upload_result = upload_pdf_file(file_path)
+        s3_url = upload_result.get("url")
+        if not s3_url:
+            raise RuntimeError("Failed to upload file to S3")
+        # Recorded now so the object can be found if this process dies mid-job
+        _update_live_document(document_id, source=s3_url)
+        source_recorded = True
+
+        total_pages = page_count(file_path)
+        page_texts: List[str] = []
+
+        def track(page_iter: Iterator[Tuple[int, Any]], to_text: Callable[[Any], str]) -> Iterator[Any]:
+            reported = STAGES["embedding"]
+            span = STAGES["indexing"] - STAGES["embedding"]
+            for page_number, page in page_iter:
+                page_texts.append(to_text(page))
+                progress = STAGES["embedding"] + span * page_number // max(total_pages, 1)
+                if progress - reported >= 5:
+                    _update_live_document(document_id, status="embedding", progress=progress)
+                    reported = progress
+                yield page_number, page
+
+        if settings.chunking == "structured":
+            chunks: Iterator[Any] = iter_structured_chunks(
+                track(iter_page_blocks(file_path), page_text),
+                max_tokens=settings.chunk_max_tokens,
+                overlap_tokens=settings.chunk_overlap_tokens,
+            )
+        else:
+            chunks = iter_chunks(text for _, text in track(iter_pages(file_path), str))
+
+        _enter_stage(document_id, "embedding")
+        docs, vectors = qa_engine.embed_chunk_stream(chunks, metadata={"doc_id": doc_id})
+        if not docs:
+            raise ValueError("Could not extract text from PDF")
+        text = "\n".join(page_texts)
+
+        _enter_stage(document_id, "indexing")
+        vectorstore = qa_engine.build_vectorstore(docs, vectors)
+
+        _enter_stage(document_id, "persisting")
+        qa_engine.persist_vectorstore(vectorstore, doc_id)
+        content_ref = text_store.save_text(doc_id, text)
+
+        _update_live_document(
+            document_id,
+            content_ref=content_ref,
+            source=s3_url,
+            status=STATUS_READY,
+            progress=100,
+            error=None,
+        )
+        collection_registry.add_document(user_id, document_id, doc_id)
+    except DocumentDeleted:
+        # The delete request cleaned up what the row recorded; remove the rest
+        logger.info("Document %s was deleted during ingestion", document_id)
+        schedule_document_cleanup(doc_id, None if source_recorded else s3_url, content_ref)
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e)
+        logger.exception("Ingestion failed for document %s", document_id)
+        # Failed rows reference nothing; what the job stored is removed
+        _update_document(document_id, status=STATUS_FAILED, error=detail, source=None, content_ref=None)
+        schedule_document_cleanup(doc_id, s3_url, content_ref)
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def _spooled_uploads() -> Dict[str, Path]:
+    """Spooled upload files by the index key they were saved under (see routes_upload)."""
+    upload_dir = Path(settings.upload_dir)
+    if not upload_dir.is_dir():
+        return {}
+    return {path.name.split("_", 1)[0]: path for path in upload_dir.iterdir() if path.is_file()}
+
+
+def recover_interrupted_jobs() -> Dict[str, int]:
+    """
+    Requeue documents whose job was lost with the process that owned it, or
+    mark them failed when their spooled upload is missing; remove spooled
+    files no document is waiting for. Documents of processes still running
+    are left alone. Only for the in-process pool: other backends keep their
+    jobs across restarts.
+
+    Returns:
+        Counts of requeued and failed documents and removed files
+    """
+    counts = {"requeued": 0, "failed": 0, "removed_files": 0}
+    if not isinstance(get_ingestion_backend(), ThreadPoolBackend):
+        return counts
+
+    started = time.time()
+    spooled = _spooled_uploads()
+    db = SessionLocal()
+    try:
+        interrupted = (
+            db.query(Document.id, Document.filename, Document.source, Document.ingestion_owner)
+            .filter(Document.status.notin_((STATUS_READY, STATUS_FAILED)))
+            .order_by(Document.id)
+            .all()
+        )
+    finally:
+        db.close()
+
+    for document_id, index_key, source, owner in interrupted:
+        file_path = spooled.pop(index_key, None)
+        if owner is not None and _owner_alive(owner):
+            continue
+        if not _claim_document(document_id, owner):
+            # Another process recovered it first
+            continue
+        if file_path is not None:
+            try:
+                submit_ingestion(document_id, file_path)
+                counts["requeued"] += 1
+                continue
+            except IngestionQueueFull:
+                os.remove(file_path)
+        _update_document(
+            document_id,
+            status=STATUS_FAILED,
+            error="Processing was interrupted by a server restart; please upload the file again",
+            source=None,
+        )
+        schedule_document_cleanup(index_key, source, None)
+        counts["failed"] += 1
+
+    for path in spooled.values():
+        # Files written after startup belong to uploads in flight elsewhere
+        if path.stat().st_mtime < started:
+            path.unlink(missing_ok=True)
+            counts["removed_files"] += 1
+
+    if any(counts.values()):
+        logger.info("Recovered interrupted ingestion jobs: %s", counts)
+    return counts
+
+
+def job_status(document: Document) -> Dict[str, Any]:
+    return {
+        "job_id": document.id,
+        "document_id": document.id,
+        "status": document.status,
+        "progress": document.progress,
+        "error": document.error,
+        "file_url": document.source,
+    }
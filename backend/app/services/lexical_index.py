@@ -0,0 +1,149 @@
+# app/services/lexical_index.py
+"""
+BM25 index over a document's chunks.
+
+Postings are stored CSR-style in flat numpy arrays: the postings of term t
+are doc_ids[offsets[t]:offsets[t + 1]] with matching term frequencies in
+tfs. Chunk numbers are positions in the FAISS index, so a hit maps to a
+docstore id through index_to_docstore_id. The whole index is one .npz file
+in the document's index directory.
+
+Tokens keep identifiers whole ("ab-12", "4.2.1") and also index their parts,
+so exact part numbers and clause numbers match even when written loosely.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np  # type: ignore
+
+_TOKEN = re.compile(r"[0-9a-z]+(?:[-./:_][0-9a-z]+)*")
+_PARTS = re.compile(r"[0-9a-z]+")
+_MAX_TOKEN_LENGTH = 64
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or that the "
+    "this to was what when where which who why will with about me tell please".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens: List[str] = []
+    for match in _TOKEN.finditer(unicodedata.normalize("NFKC", text).lower()):
+        token = match.group()[:_MAX_TOKEN_LENGTH]
+        parts = _PARTS.findall(token)
+        if len(parts) > 1:
+            tokens.append(token)
+        tokens.extend(p for p in parts if p not in STOPWORDS)
+    return tokens
+
+
+def is_identifier(token: str) -> bool:
+    """Part numbers, clause numbers, codes: anything with a digit or inner punctuation."""
+    return any(c.isdigit() for c in token) or len(_PARTS.findall(token)) > 1
+
+
+class BM25Index:
+    def __init__(
+        self,
+        vocab: Sequence[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self._vocab: Dict[str, int] = {term: i for i, term in enumerate(vocab)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(doc_len)
+        self.avgdl = float(doc_len.mean()) if self.n_docs else 0.0
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        terms: List[int] = []
+        docs: List[int] = []
+        freqs: List[int] = []
+        doc_len = np.zeros(len(texts), dtype=np.uint32)
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[doc] = sum(counts.values())
+            for term, count in counts.items():
+                terms.append(vocab.setdefault(term, len(vocab)))
+                docs.append(doc)
+                freqs.append(count)
+
+        term_array = np.asarray(terms, dtype=np.int64)
+        order = np.argsort(term_array, kind="stable")
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(term_array, minlength=len(vocab)))
+        return cls(
+            vocab=list(vocab),
+            offsets=offsets,
+            doc_ids=np.asarray(docs, dtype=np.uint32)[order],
+            tfs=np.minimum(np.asarray(freqs, dtype=np.int64), 65535).astype(np.uint16)[order],
+            doc_len=doc_len,
+        )
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._vocab
+
+    def nbytes(self) -> int:
+        arrays = self.offsets.nbytes + self.doc_ids.nbytes + self.tfs.nbytes + self.doc_len.nbytes
+        return arrays + sum(len(t) + 64 for t in self._vocab)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top k (chunk number, score) pairs for query, best first."""
+        if not self.n_docs:
+            return []
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self._vocab.get(term)
+            if term_id is None:
+                continue
+            start, stop = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:stop]
+            tf = self.tfs[start:stop].astype(np.float32)
+            df = stop - start
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / self.avgdl)
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+        hits = np.flatnonzero(scores)
+        top = hits[np.argsort(-scores[hits], kind="stable")[:k]]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def save(self, path: str) -> None:
+        vocab_blob = np.frombuffer("\n".join(self._vocab).encode("utf-8"), dtype=np.uint8)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                vocab=vocab_blob,
+                offsets=self.offsets,
+                doc_ids=self.doc_ids,
+                tfs=self.tfs,
+                doc_len=self.doc_len,
+                params=np.asarray([self.k1, self.b], dtype=np.float64),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            blob = data["vocab"].tobytes().decode("utf-8")
+            k1, b = data["params"].tolist()
+            return cls(
+                vocab=blob.split("\n") if blob else [],
+                offsets=data["offsets"],
+                doc_ids=data["doc_ids"],
+                tfs=data["tfs"],
+                doc_len=data["doc_len"],
+                k1=k1,
+                b=b,
+            )
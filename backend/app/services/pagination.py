@@ -0,0 +1,84 @@
+# app/services/pagination.py
+"""
+Keyset pagination helpers.
+
+Lists are ordered by a timestamp column plus the primary key as tie-breaker
+and a page continues strictly after the (timestamp, id) of the last row of
+the previous page, so pages stay stable while rows are added and each page
+is an index range scan however deep the client pages. Cursors are opaque to
+clients: url-safe base64 of the last row's position.
+
+Paging is opt-in: a request with neither limit nor cursor gets the whole
+list, as before pagination was added, so existing clients lose nothing.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_  # type: ignore
+
+from app.core.config import settings
+
+Position = Tuple[datetime, int]
+
+
+def page_size(limit: Optional[int], cursor: Optional[str] = None) -> Optional[int]:
+    """
+    limit clamped to 1..PAGE_SIZE_MAX, PAGE_SIZE_DEFAULT when only a cursor
+    is given, None (the whole list) when neither is.
+    """
+    if limit is None:
+        return settings.page_size_default if cursor else None
+    return max(1, min(limit, settings.page_size_max))
+
+
+def limit_page(query, size: Optional[int]):
+    """query limited to one row past the page, for split_page; unchanged when unpaged."""
+    return query if size is None else query.limit(size + 1)
+
+
+def encode_cursor(position: Position) -> str:
+    timestamp, row_id = position
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Position:
+    """
+    Raises:
+        ValueError: If cursor was not produced by encode_cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+
+
+def after(timestamp_column, id_column, position: Position, descending: bool = False):
+    """Filter for rows strictly after position in (timestamp, id) order."""
+    key = tuple_(timestamp_column, id_column)
+    bound = tuple_(*position)
+    return key < bound if descending else key > bound
+
+
+def ordering(timestamp_column, id_column, descending: bool = False) -> List[Any]:
+    if descending:
+        return [timestamp_column.desc(), id_column.desc()]
+    return [timestamp_column, id_column]
+
+
+def split_page(
+    rows: Sequence[Any], limit: Optional[int], position: Callable[[Any], Position]
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Rows of one page and the cursor of the next, or None on the last page.
+    rows must come from limit_page(query, limit).
+    """
+    rows = list(rows)
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(position(rows[-1]))
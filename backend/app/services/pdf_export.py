@@ -0,0 +1,89 @@
+# app/services/pdf_export.py
+"""
+Conversation PDF export off the event loop, with a render cache.
+
+ReportLab layout is CPU-bound, so exports are rendered in a small process
+pool (PDF_EXPORT_WORKERS) and at most PDF_EXPORT_MAX_CONCURRENT renders are
+queued or running at once; further requests wait their turn.
+
+A rendered PDF is cached under its version: the session id plus the count,
+last id and last timestamp of its messages, and the document details the
+PDF prints (filename, upload time, source). The version doubles as the
+ETag, so a client holding the current export gets 304 Not Modified, and a
+new message or a changed document forces a fresh render.
+"""
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.doc_cache import DocumentCache
+from app.services.pdf_generator import generate_conversation_pdf
+
+export_cache = DocumentCache(
+    max_bytes=settings.pdf_export_cache_max_bytes,
+    max_entries=settings.pdf_export_cache_max_entries,
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_render_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process runs threads
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.pdf_export_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def export_etag(
+    session_id: int,
+    message_count: int,
+    last_id: Optional[int],
+    last_timestamp: Optional[datetime],
+    document_info: Dict[str, Any],
+) -> str:
+    """Quoted ETag for the export of a session and its document in their current state."""
+    version = "\0".join([
+        str(session_id),
+        str(message_count),
+        str(last_id),
+        last_timestamp.isoformat() if last_timestamp else "",
+        json.dumps(document_info, sort_keys=True, default=str),
+    ])
+    return '"' + hashlib.sha256(version.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak validators compare equal for GET (RFC 9110 section 13.1.2)
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+async def render_conversation_pdf(
+    session_data: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    document_info: Dict[str, Any],
+) -> bytes:
+    """generate_conversation_pdf in the export pool, within the concurrency limit."""
+    global _render_slots
+    if _render_slots is None:
+        _render_slots = asyncio.Semaphore(settings.pdf_export_max_concurrent)
+    async with _render_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_pool(), generate_conversation_pdf, session_data, messages, document_info
+        )
@@ -1,8 +1,131 @@
 #app/services/pdf_extractor.py
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
 import fitz # type: ignore
-import requests #type:ignore
 
-def extract_text(path):
-    doc = fitz.open(str(path))
-    text = "\n".join([page.get_text() for page in doc])
-    return text
+from app.core.config import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _extract_workers() -> int:
+    return settings.extract_workers or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process runs threads (uvicorn, ingestion workers)
+            _pool = ProcessPoolExecutor(
+                max_workers=_extract_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _extract_range(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Extract pages [start, stop) in a worker; each worker opens the file itself."""
+    with fitz.open(path) as doc:
+        return [(i + 1, doc[i].get_text()) for i in range(start, stop)]
+
+
+# A block is a heading when its text is this much larger than the page's body text
+_HEADING_SIZE_RATIO = 1.15
+_HEADING_MAX_CHARS = 120
+_BOLD_FLAG = 16
+
+
+def _page_blocks(page) -> List[Tuple[str, bool]]:
+    """(text, is_heading) for each text block on the page, in reading order."""
+    data = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT, sort=True)
+    blocks = []
+    size_chars: Dict[float, int] = {}
+    for block in data["blocks"]:
+        if block.get("type", 0) != 0:
+            continue
+        spans = [span for line in block["lines"] for span in line["spans"] if span["text"].strip()]
+        if not spans:
+            continue
+        for span in spans:
+            size = round(span["size"], 1)
+            size_chars[size] = size_chars.get(size, 0) + len(span["text"])
+        lines = ["".join(span["text"] for span in line["spans"]).strip() for line in block["lines"]]
+        blocks.append(("\n".join(line for line in lines if line), spans))
+
+    # Body text size: the size that covers the most characters on the page
+    body_size = max(size_chars, key=size_chars.get) if size_chars else 0.0
+    result = []
+    for text, spans in blocks:
+        larger = max(span["size"] for span in spans) >= body_size * _HEADING_SIZE_RATIO
+        bold = all(span["flags"] & _BOLD_FLAG for span in spans)
+        short = len(text) <= _HEADING_MAX_CHARS and text.count("\n") <= 1
+        result.append((text, short and (larger or bold)))
+    return result
+
+
+def _extract_blocks_range(path: str, start: int, stop: int) -> List[Tuple[int, List[Tuple[str, bool]]]]:
+    """Blocks of pages [start, stop) in a worker."""
+    with fitz.open(path) as doc:
+        return [(i + 1, _page_blocks(doc[i])) for i in range(start, stop)]
+
+
+def page_count(path) -> int:
+    with fitz.open(str(path)) as doc:
+        return doc.page_count
+
+
+def _iter_ranges(path: str, extract: Callable[[str, int, int], list]) -> Iterator:
+    """Run extract over page ranges, small documents inline, and yield its items in order."""
+    count = page_count(path)
+    workers = _extract_workers()
+    if workers <= 1 or count < settings.extract_parallel_min_pages:
+        yield from extract(path, 0, count)
+        return
+
+    step = max(1, settings.extract_parallel_min_pages // 4)
+    pool = _get_pool()
+    starts = iter(range(0, count, step))
+    window: Deque[Future] = deque()
+
+    def submit_next() -> None:
+        start = next(starts, None)
+        if start is not None:
+            window.append(pool.submit(extract, path, start, min(start + step, count)))
+
+    for _ in range(workers * 2):
+        submit_next()
+    try:
+        while window:
+            pages = window.popleft().result()
+            submit_next()
+            yield from pages
+    finally:
+        for future in window:
+            future.cancel()
+
+
+def iter_pages(path) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) in page order as pages become available.
+
+    Large documents are extracted by the process pool with a bounded window
+    of ranges in flight, so later pages are being extracted while earlier
+    ones are consumed without the whole document piling up in memory.
+    """
+    yield from _iter_ranges(str(path), _extract_range)
+
+
+def iter_page_blocks(path) -> Iterator[Tuple[int, List[Tuple[str, bool]]]]:
+    """
+    Yield (page_number, [(block_text, is_heading), ...]) in page order,
+    streamed through the process pool like iter_pages.
+    """
+    yield from _iter_ranges(str(path), _extract_blocks_range)
+
@@ -1,6 +1,7 @@
 # app/services/pdf_generator.py
 import io
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict, Any
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -10,37 +11,10 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.platypus.tableofcontents import TableOfContents
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
 
-def generate_conversation_pdf(
-    session_data: Dict[str, Any],
-    messages: List[Dict[str, Any]],
-    document_info: Dict[str, Any]
-) -> bytes:
-    """
-    Generate a PDF containing the conversation history with document information.
-    
-    Args:
-        session_data: Session information (id, created_at, etc.)
-        messages: List of chat messages
-        document_info: Information about the uploaded document
-        
-    Returns:
-        PDF content as bytes
-    """
-    buffer = io.BytesIO()
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=18
-    )
-    
-    # Get styles
+@lru_cache(maxsize=1)
+def _styles() -> Dict[str, ParagraphStyle]:
+    """Paragraph styles for the export, built once per process."""
     styles = getSampleStyleSheet()
-    
     # Custom styles
     title_style = ParagraphStyle(
         'CustomTitle',
@@ -50,7 +24,7 @@ def generate_conversation_pdf(
         textColor=HexColor('#6366f1'),
         alignment=TA_CENTER
     )
-    
+
     subtitle_style = ParagraphStyle(
         'CustomSubtitle',
         parent=styles['Heading2'],
@@ -58,7 +32,7 @@ def generate_conversation_pdf(
         spaceAfter=20,
         textColor=HexColor('#374151')
     )
-    
+
     user_message_style = ParagraphStyle(
         'UserMessage',
         parent=styles['Normal'],
@@ -72,7 +46,7 @@ def generate_conversation_pdf(
         borderWidth=1,
         borderPadding=12
     )
-    
+
     assistant_message_style = ParagraphStyle(
         'AssistantMessage',
         parent=styles['Normal'],
@@ -86,7 +60,7 @@ def generate_conversation_pdf(
         borderWidth=1,
         borderPadding=12
     )
-    
+
     info_style = ParagraphStyle(
         'InfoStyle',
         parent=styles['Normal'],
@@ -94,7 +68,7 @@ def generate_conversation_pdf(
         spaceAfter=4,
         textColor=HexColor('#6b7280')
     )
-    
+
     header_style = ParagraphStyle(
         'HeaderStyle',
         parent=styles['Normal'],
@@ -104,7 +78,53 @@ def generate_conversation_pdf(
         textColor=HexColor('#374151'),
         fontName='Helvetica-Bold'
     )
+
+    return {
+        'title': title_style,
+        'subtitle': subtitle_style,
+        'user_message': user_message_style,
+        'assistant_message': assistant_message_style,
+        'info': info_style,
+        'header': header_style,
+    }
+
+def generate_conversation_pdf(
+    session_data: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    document_info: Dict[str, Any]
+) -> bytes:
+    """
+    Generate a PDF containing the conversation history with document information.
+    
+    Args:
+        session_data: Session information (id, created_at, etc.)
+        messages: List of chat messages
+        document_info: Information about the uploaded document
+        
+    Returns:
+        PDF content as bytes
+    """
+    buffer = io.BytesIO()
+    
+    # Create PDF document
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18
+    )
     
+    # Styles are shared across exports
+    styles = _styles()
+    title_style = styles['title']
+    subtitle_style = styles['subtitle']
+    user_message_style = styles['user_message']
+    assistant_message_style = styles['assistant_message']
+    info_style = styles['info']
+    header_style = styles['header']
+
     # Build PDF content
     story = []
     
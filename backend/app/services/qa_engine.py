@@ -1,14 +1,28 @@
 #app/services/pdf_extractor.py
 import os
-from typing import Dict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np #type: ignore
 from dotenv import load_dotenv #type:ignore
-import faiss #type:ignore
 
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings #type: ignore
+from langchain_community.docstore.in_memory import InMemoryDocstore #type: ignore
 from langchain_community.vectorstores import FAISS #type: ignore
 from langchain.text_splitter import CharacterTextSplitter #type:ignore
 from langchain.docstore.document import Document #type:ignore
 from langchain.chains import RetrievalQA #type: ignore
+from langchain.chains.question_answering.stuff_prompt import PROMPT_SELECTOR #type: ignore
+from fastapi.concurrency import run_in_threadpool #type: ignore
+
+from app.core.config import settings
+from app.services.answer_cache import AnswerCache
+from app.services.doc_cache import DocumentCache
+from app.services.embedding_client import BatchedEmbeddings
+from app.services.embedding_cache import CachedEmbeddings, EmbeddingStore
+from app.services.index_factory import choose_index_params, create_index
+from app.services.index_store import save_vectorstore, load_vectorstore, load_lexical_index
+from app.services.lexical_index import BM25Index
+from app.services.retrieval import HybridRetriever
 
 load_dotenv()
 gemini_api_key = os.getenv("GEMINI_API_KEY")
@@ -29,47 +43,327 @@ llm = ChatGoogleGenerativeAI(
     temperature=0.1
 )
 
-embedding = GoogleGenerativeAIEmbeddings(
+provider_embedding = GoogleGenerativeAIEmbeddings(
     model=EMBEDDING_MODEL,
     google_api_key=gemini_api_key
 )
 
-doc_qa_map: Dict[str, RetrievalQA] = {}
+# Batching, concurrency, rate limiting and retry in front of the provider
+batched_embedding = BatchedEmbeddings(
+    provider_embedding,
+    max_batch_size=settings.embedding_batch_size,
+    max_batch_tokens=settings.embedding_batch_max_tokens,
+    concurrency=settings.embedding_concurrency,
+    requests_per_minute=settings.embedding_requests_per_minute,
+    max_retries=settings.embedding_max_retries,
+)
 
-INDEX_DIR = "indexes"
-os.makedirs(INDEX_DIR, exist_ok=True)
+# Only chunks that have never been embedded with this model reach the provider
+embedding = CachedEmbeddings(
+    batched_embedding,
+    store=EmbeddingStore(os.path.join(settings.embedding_cache_dir, "embeddings.sqlite3")),
+    model=EMBEDDING_MODEL,
+    cost_per_million_tokens=settings.embedding_cost_per_million_tokens,
+)
 
-def build_index_from_pdf(text: str, doc_id: str):
-    # Split text into chunks
+# Feeds chunk batches to the embedding client while extraction continues
+_stream_executor = ThreadPoolExecutor(
+    max_workers=settings.embedding_concurrency, thread_name_prefix="embed-stream"
+)
+
+# Per-document QA chains, bounded by estimated memory and entry count
+doc_qa_map = DocumentCache(
+    max_bytes=settings.doc_cache_max_bytes,
+    max_entries=settings.doc_cache_max_entries,
+)
+
+# Answers to earlier questions, per document; dropped when the index is rebuilt
+answer_cache = AnswerCache(
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+    max_entries_per_doc=settings.answer_cache_max_entries_per_doc,
+    max_docs=settings.answer_cache_max_docs,
+    similarity_threshold=settings.answer_cache_similarity_threshold,
+)
+
+def estimate_chain_bytes(qa_chain: RetrievalQA) -> int:
+    """Rough resident size of a chain: raw vectors, chunk text and BM25 postings."""
+    vectorstore = qa_chain.retriever.vectorstore
+    index = vectorstore.index
+    vector_bytes = index.ntotal * index.d * 4
+    docstore = vectorstore.docstore
+    if hasattr(docstore, "text_bytes"):
+        text_bytes = docstore.text_bytes()
+    else:
+        text_bytes = sum(len(d.page_content) for d in docstore._dict.values())
+    lexical = getattr(qa_chain.retriever, "lexical", None)
+    lexical_bytes = lexical.nbytes() if lexical is not None else 0
+    return vector_bytes + text_bytes + lexical_bytes
+
+def split_text(text: str, metadata: Optional[Dict[str, Any]] = None) -> List[Document]:
     text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    texts = text_splitter.split_text(text)
-    docs = [Document(page_content=t) for t in texts]
+    return [Document(page_content=t, metadata=dict(metadata or {})) for t in text_splitter.split_text(text)]
+
+def embed_chunks(docs: List[Document]) -> List[List[float]]:
+    return embedding.embed_documents([d.page_content for d in docs])
+
+def embed_chunk_stream(
+    chunks: Iterable[Union[str, Document]], metadata: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Document], List[List[float]]]:
+    """
+    Embed chunks (texts or Documents) as they are produced. Every
+    EMBEDDING_BATCH_SIZE chunks are sent off while the producer keeps
+    extracting; at most 2 * EMBEDDING_CONCURRENCY batches are in flight at
+    once. metadata is added to every chunk's own metadata.
+    """
+    docs: List[Document] = []
+    futures: List[Future] = []
+    max_in_flight = 2 * settings.embedding_concurrency
+    batch: List[str] = []
+
+    def submit(texts: List[str]) -> None:
+        in_flight = [f for f in futures if not f.done()]
+        if len(in_flight) >= max_in_flight:
+            wait(in_flight, return_when=FIRST_COMPLETED)
+        futures.append(_stream_executor.submit(embedding.embed_documents, texts))
+
+    for chunk in chunks:
+        if isinstance(chunk, Document):
+            doc = Document(page_content=chunk.page_content, metadata={**chunk.metadata, **(metadata or {})})
+        else:
+            doc = Document(page_content=chunk, metadata=dict(metadata or {}))
+        docs.append(doc)
+        batch.append(doc.page_content)
+        if len(batch) >= settings.embedding_batch_size:
+            submit(batch)
+            batch = []
+    if batch:
+        submit(batch)
+
+    vectors: List[List[float]] = []
+    for future in futures:
+        vectors.extend(future.result())
+    return docs, vectors
+
+def build_vectorstore(docs: List[Document], vectors: List[List[float]]) -> FAISS:
+    """
+    FAISS store over precomputed vectors, with the index type picked by
+    index_factory for the number of vectors (flat for typical documents).
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    params = choose_index_params(len(matrix), matrix.shape[1])
+    vectorstore = FAISS(
+        embedding_function=embedding,
+        index=create_index(matrix.shape[1], params, matrix),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    vectorstore.add_embeddings(
+        text_embeddings=list(zip([d.page_content for d in docs], vectors)),
+        metadatas=[d.metadata for d in docs],
+    )
+    return vectorstore
+
+def _make_chain(vectorstore: FAISS, lexical: Optional[BM25Index]) -> RetrievalQA:
+    retriever = HybridRetriever(
+        vectorstore=vectorstore,
+        lexical=lexical,
+        k=settings.retrieval_k,
+        fetch_k=settings.retrieval_fetch_k,
+    )
+    return RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
+
+def persist_vectorstore(vectorstore: FAISS, doc_id: str) -> None:
+    """Write the store and its BM25 index to disk and make it the cached chain for doc_id."""
+    texts = [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+        for i in range(vectorstore.index.ntotal)
+    ]
+    lexical = BM25Index.build(texts)
+    save_vectorstore(vectorstore, doc_id, lexical_index=lexical)
+    answer_cache.invalidate(doc_id)
+    qa_chain = _make_chain(vectorstore, lexical)
+    doc_qa_map.put(doc_id, qa_chain, estimate_chain_bytes(qa_chain))
+
+def build_index_from_pdf(text: str, doc_id: str):
+    # Split text into chunks, tagged with the document for cross-document search
+    docs = split_text(text, metadata={"doc_id": doc_id})
 
     # Embed and store in FAISS
-    vectorstore = FAISS.from_documents(docs, embedding)
-    faiss.write_index(vectorstore.index, f"{INDEX_DIR}/{doc_id}.faiss")
-    retriever = vectorstore.as_retriever()
-
-    # QA chain
-    qa_chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-    doc_qa_map[doc_id] = qa_chain
-    
+    vectorstore = build_vectorstore(docs, embed_chunks(docs))
+    persist_vectorstore(vectorstore, doc_id)
+
+def _load_chain_from_disk(doc_id: str):
+    vectorstore = load_vectorstore(doc_id, embedding)
+    if vectorstore is None:
+        return None
+    return _make_chain(vectorstore, load_lexical_index(doc_id))
+
 def load_index(doc_id: str):
-    if doc_id in doc_qa_map:
-        return doc_qa_map[doc_id]
-    index_path = f"{INDEX_DIR}/{doc_id}.faiss"
-    if os.path.exists(index_path):
-        index = faiss.read_index(index_path)
-        vectorstore = FAISS(index, embedding)
-        retriever = vectorstore.as_retriever()
-        qa_chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-        doc_qa_map[doc_id] = qa_chain
-        return qa_chain
-    return None
-
-def query_pdf(doc_id: str, question: str) -> str:
-    print("Currently indexed docs:", list(doc_qa_map.keys()))
+    return doc_qa_map.get_or_load(doc_id, _load_chain_from_disk, estimate_chain_bytes)
+
+def _generate(qa_chain: RetrievalQA, docs: List[Document], question: str) -> str:
+    combine = qa_chain.combine_documents_chain
+    return combine.invoke({"input_documents": docs, "question": question})[combine.output_key]
+
+async def _agenerate(qa_chain: RetrievalQA, docs: List[Document], question: str) -> str:
+    combine = qa_chain.combine_documents_chain
+    result = await combine.ainvoke({"input_documents": docs, "question": question})
+    return result[combine.output_key]
+
+def _stuff_messages(docs: List[Document], question: str):
+    context = "\n\n".join(d.page_content for d in docs)
+    prompt = PROMPT_SELECTOR.get_prompt(llm).format_prompt(context=context, question=question)
+    return prompt.to_messages()
+
+async def aanswer_from_docs(docs: List[Document], question: str) -> str:
+    """Answer question from already retrieved chunks, with the same prompt as RetrievalQA."""
+    result = await llm.ainvoke(_stuff_messages(docs, question))
+    return result.content
+
+def _retrieve(
+    doc_id: str, qa_chain: RetrievalQA, query: str, scope: Optional[str] = None
+) -> Tuple[Optional[str], List[Document], Optional[List[float]]]:
+    """
+    (cached answer, chunks, query embedding) for query. Identifier queries
+    answered from BM25 alone are never embedded, so their vector is None.
+    """
+    retriever = qa_chain.retriever
+    vector = None
+    if retriever.needs_embedding(query):
+        vector = embedding.embed_query(query)
+        cached = answer_cache.get_similar(doc_id, vector, scope)
+        if cached is not None:
+            return cached, [], vector
+    return None, retriever.retrieve(query, vector), vector
+
+async def _aretrieve(
+    doc_id: str, qa_chain: RetrievalQA, query: str, scope: Optional[str] = None
+) -> Tuple[Optional[str], List[Document], Optional[List[float]]]:
+    retriever = qa_chain.retriever
+    vector = None
+    if retriever.needs_embedding(query):
+        vector = await embedding.aembed_query(query)
+        cached = answer_cache.get_similar(doc_id, vector, scope)
+        if cached is not None:
+            return cached, [], vector
+    docs = await run_in_threadpool(retriever.retrieve, query, vector)
+    return None, docs, vector
+
+def citations(docs: List[Document]) -> List[Dict[str, Any]]:
+    """Page citations for the chunks an answer was generated from, in retrieval order."""
+    cited = []
+    seen = set()
+    for doc in docs:
+        meta = doc.metadata
+        if meta.get("page") is None:
+            # Chunks indexed before page metadata existed
+            continue
+        key = (meta.get("start_offset"), meta.get("end_offset"), meta["page"])
+        if key in seen:
+            continue
+        seen.add(key)
+        cited.append({
+            "page": meta["page"],
+            "page_end": meta.get("page_end", meta["page"]),
+            "section": meta.get("section"),
+            "start_offset": meta.get("start_offset"),
+            "end_offset": meta.get("end_offset"),
+            "excerpt": doc.page_content[:200],
+        })
+    return cited
+
+def ask_pdf(
+    doc_id: str, question: str, retrieval_query: Optional[str] = None, scope: Optional[str] = None
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Answer question from the document and cite the pages it came from.
+    Chunks are retrieved with retrieval_query (default: question) while
+    question, e.g. the full prompt with history, goes to the LLM only.
+
+    Answers are cached per document and scope by retrieval query: an
+    identical or semantically close query returns the earlier answer without
+    an LLM call. Pass the asking user as scope whenever question carries
+    their history; answers are only reused within the same scope. The query
+    embedding used for the cache lookup is reused for retrieval.
+    """
+    query = retrieval_query or question
+    cached = answer_cache.get_exact(doc_id, query, scope)
+    if cached is not None:
+        return cached
     qa_chain = load_index(doc_id)
     if not qa_chain:
-        return "Document not indexed yet."
-    return qa_chain.run(question)
+        return "Document not indexed yet.", []
+    cached, docs, vector = _retrieve(doc_id, qa_chain, query, scope)
+    if cached is not None:
+        return cached
+    result = _generate(qa_chain, docs, question), citations(docs)
+    if result[0].strip():
+        answer_cache.put(doc_id, query, vector, result, scope)
+    return result
+
+def query_pdf(
+    doc_id: str, question: str, retrieval_query: Optional[str] = None, scope: Optional[str] = None
+) -> str:
+    return ask_pdf(doc_id, question, retrieval_query, scope)[0]
+
+async def aask_pdf(
+    doc_id: str, question: str, retrieval_query: Optional[str] = None, scope: Optional[str] = None
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """ask_pdf for async callers: index loads run in a thread, retrieval and LLM calls are awaited."""
+    query = retrieval_query or question
+    cached = answer_cache.get_exact(doc_id, query, scope)
+    if cached is not None:
+        return cached
+    qa_chain = await run_in_threadpool(load_index, doc_id)
+    if not qa_chain:
+        return "Document not indexed yet.", []
+    cached, docs, vector = await _aretrieve(doc_id, qa_chain, query, scope)
+    if cached is not None:
+        return cached
+    result = await _agenerate(qa_chain, docs, question), citations(docs)
+    if result[0].strip():
+        answer_cache.put(doc_id, query, vector, result, scope)
+    return result
+
+async def astream_answer(
+    doc_id: str,
+    question: str,
+    retrieval_query: Optional[str] = None,
+    cited: Optional[List[Dict[str, Any]]] = None,
+    scope: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """
+    Retrieve context for retrieval_query (default: question) and stream the
+    answer to question as the LLM produces it. A cached answer is yielded
+    in one piece; a fully streamed answer is added to the cache. Citations
+    for the answer are appended to cited, if given, before the first token.
+    Cached answers are shared only within scope, as in ask_pdf.
+
+    Uses the same "stuff" prompt as RetrievalQA, so the streamed answer matches
+    what query_pdf would return.
+
+    Raises:
+        LookupError: If the document has no index
+    """
+    cited = cited if cited is not None else []
+    query = retrieval_query or question
+    cached = answer_cache.get_exact(doc_id, query, scope)
+    if cached is None:
+        qa_chain = await run_in_threadpool(load_index, doc_id)
+        if not qa_chain:
+            raise LookupError("Document not indexed yet.")
+        cached, docs, vector = await _aretrieve(doc_id, qa_chain, query, scope)
+    if cached is not None:
+        answer, sources = cached
+        cited.extend(sources)
+        yield answer
+        return
+    cited.extend(citations(docs))
+    parts: List[str] = []
+    async for chunk in llm.astream(_stuff_messages(docs, question)):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    answer = "".join(parts)
+    if answer.strip():
+        answer_cache.put(doc_id, query, vector, (answer, list(cited)), scope)
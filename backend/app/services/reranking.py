@@ -0,0 +1,185 @@
+# app/services/reranking.py
+"""
+Re-ranking of retrieved chunks before generation.
+
+The retriever over-fetches RERANK_CANDIDATES chunks and a Reranker orders
+them so only the best RETRIEVAL_K reach the LLM. Scoring runs on the CPU in
+small batches under a per-request budget (RERANK_BUDGET_MS): candidates are
+scored in retrieval order, and any left unscored when the budget runs out
+keep their retrieval order behind the scored ones.
+
+RERANKER selects the scorer: "lexical" (term overlap, no dependencies),
+"none" (keep retrieval order), "cross-encoder" (a small local
+sentence-transformers model, optional dependency) or a dotted path to a
+Reranker subclass. set_reranker installs a Reranker instance at runtime
+instead, e.g. one that needs constructor arguments.
+"""
+import importlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain.docstore.document import Document  # type: ignore
+
+from app.core.config import settings
+from app.services.embedding_client import CHARS_PER_TOKEN
+from app.services.lexical_index import STOPWORDS, is_identifier, tokenize
+
+
+def estimate_tokens(docs: Sequence[Document]) -> int:
+    return sum(max(1, len(d.page_content) // CHARS_PER_TOKEN) for d in docs)
+
+
+class Reranker(ABC):
+    """Scores chunks against a query; higher is more relevant."""
+
+    batch_size = 8
+
+    @abstractmethod
+    def score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        """One score per doc, in the order given."""
+
+
+class NoopReranker(Reranker):
+    """Keeps retrieval order."""
+
+    def score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        return [-float(i) for i in range(len(docs))]
+
+
+class LexicalOverlapReranker(Reranker):
+    """
+    Share of the query's terms (identifiers count double) and adjacent term
+    pairs found in the chunk.
+    """
+
+    batch_size = 64
+
+    def score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        terms = [t for t in tokenize(query) if t not in STOPWORDS]
+        if not terms:
+            return [0.0] * len(docs)
+        weights = {t: 2.0 if is_identifier(t) else 1.0 for t in terms}
+        total = sum(weights.values())
+        pairs = set(zip(terms, terms[1:]))
+        scores = []
+        for doc in docs:
+            tokens = tokenize(doc.page_content)
+            present = set(tokens)
+            score = sum(w for t, w in weights.items() if t in present) / total
+            if pairs:
+                score += 0.5 * len(pairs & set(zip(tokens, tokens[1:]))) / len(pairs)
+            scores.append(score)
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    """Small local cross-encoder; requires the sentence-transformers package."""
+
+    def __init__(self, model_name: Optional[str] = None):
+        try:
+            from sentence_transformers import CrossEncoder  # type: ignore
+        except ImportError as e:
+            raise ImportError(
+                "RERANKER=cross-encoder requires the sentence-transformers package"
+            ) from e
+        self._model = CrossEncoder(model_name or settings.rerank_model, device="cpu")
+
+    def score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        pairs = [(query, d.page_content) for d in docs]
+        return [float(s) for s in self._model.predict(pairs)]
+
+
+_BUILTIN = {
+    "none": NoopReranker,
+    "lexical": LexicalOverlapReranker,
+    "cross-encoder": CrossEncoderReranker,
+}
+
+
+class RerankStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.over_budget = 0
+        self.total_ms = 0.0
+        self.candidate_tokens = 0
+        self.kept_tokens = 0
+
+    def record(self, elapsed_ms: float, over_budget: bool, candidate_tokens: int, kept_tokens: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.over_budget += int(over_budget)
+            self.total_ms += elapsed_ms
+            self.candidate_tokens += candidate_tokens
+            self.kept_tokens += kept_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "over_budget": self.over_budget,
+                "avg_ms": round(self.total_ms / self.requests, 3) if self.requests else 0.0,
+                "candidate_tokens": self.candidate_tokens,
+                "prompt_tokens": self.kept_tokens,
+                # Share of over-fetched context kept out of the prompt
+                "prompt_token_reduction": (
+                    1 - self.kept_tokens / self.candidate_tokens if self.candidate_tokens else 0.0
+                ),
+            }
+
+
+stats = RerankStats()
+
+
+def rerank(
+    reranker: Reranker,
+    query: str,
+    docs: List[Document],
+    top_n: int,
+    budget_ms: Optional[float] = None,
+) -> List[Document]:
+    """Best top_n of docs for query, scoring as many as the budget allows."""
+    if len(docs) <= 1:
+        return docs[:top_n]
+    budget_ms = settings.rerank_budget_ms if budget_ms is None else budget_ms
+    start = time.perf_counter()
+    deadline = start + budget_ms / 1000
+    scores: List[float] = []
+    over_budget = False
+    for offset in range(0, len(docs), reranker.batch_size):
+        if offset and time.perf_counter() >= deadline:
+            over_budget = True
+            break
+        scores.extend(reranker.score(query, docs[offset:offset + reranker.batch_size]))
+
+    scored = sorted(range(len(scores)), key=lambda i: -scores[i])
+    order = scored + list(range(len(scores), len(docs)))
+    kept = [docs[i] for i in order[:top_n]]
+    stats.record(
+        1000 * (time.perf_counter() - start), over_budget, estimate_tokens(docs), estimate_tokens(kept)
+    )
+    return kept
+
+
+_reranker: Optional[Reranker] = None
+
+
+def get_reranker() -> Optional[Reranker]:
+    """Configured reranker, or None when RERANKER is empty."""
+    global _reranker
+    if _reranker is None and settings.reranker:
+        name = settings.reranker
+        if name in _BUILTIN:
+            _reranker = _BUILTIN[name]()
+        else:
+            module_name, _, class_name = name.rpartition(".")
+            _reranker = getattr(importlib.import_module(module_name), class_name)()
+    return _reranker
+
+
+def set_reranker(reranker: Optional[Reranker]) -> None:
+    """Use reranker for every request; None goes back to RERANKER."""
+    global _reranker
+    _reranker = reranker
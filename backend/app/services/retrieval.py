@@ -0,0 +1,114 @@
+# app/services/retrieval.py
+"""
+Hybrid lexical + vector retrieval for one document.
+
+HybridRetriever ranks chunks with both the FAISS index and the document's
+BM25 index and merges the two lists with reciprocal rank fusion. Queries
+dominated by identifiers the document actually contains ("part AB-12",
+"clause 4.2.1") are answered from BM25 alone, without embedding the query.
+Stores without a BM25 index fall back to plain vector search. The
+configured reranker, if any, picks the final chunks from an over-fetched
+candidate list.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import faiss  # type: ignore
+import numpy as np  # type: ignore
+from langchain_core.callbacks import CallbackManagerForRetrieverRun  # type: ignore
+from langchain_core.retrievers import BaseRetriever  # type: ignore
+from langchain_community.vectorstores import FAISS  # type: ignore
+from langchain.docstore.document import Document  # type: ignore
+
+from app.core.config import settings
+from app.services.lexical_index import BM25Index, STOPWORDS, is_identifier, tokenize
+from app.services.reranking import get_reranker, rerank
+
+
+def rrf_fuse(rankings: Sequence[Sequence[str]], k: int, rrf_k: int = 60) -> List[str]:
+    """Reciprocal rank fusion of ranked id lists; returns the top k ids."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, _id in enumerate(ranking):
+            scores[_id] = scores.get(_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(scores, key=lambda _id: -scores[_id])[:k]
+
+
+class HybridRetriever(BaseRetriever):
+    vectorstore: FAISS
+    lexical: Optional[BM25Index] = None
+    k: int = 4
+    fetch_k: int = 20
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def is_lexical_query(self, query: str) -> bool:
+        """
+        True when BM25 alone should answer: the query names an identifier
+        present in the document and has few other terms.
+        """
+        if self.lexical is None or settings.retrieval_mode != "hybrid":
+            return False
+        terms = [t for t in tokenize(query) if t not in STOPWORDS]
+        if not terms or len(terms) > settings.lexical_only_max_terms:
+            return False
+        return any(is_identifier(t) and t in self.lexical for t in terms)
+
+    def needs_embedding(self, query: str) -> bool:
+        return not self.is_lexical_query(query)
+
+    def _lexical_ids(self, query: str, k: int) -> List[str]:
+        mapping = self.vectorstore.index_to_docstore_id
+        return [mapping[i] for i, _ in self.lexical.search(query, k) if i in mapping]
+
+    def _vector_ids(self, vector: List[float], k: int) -> List[str]:
+        query = np.asarray([vector], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(query)
+        _, indices = self.vectorstore.index.search(query, k)
+        mapping = self.vectorstore.index_to_docstore_id
+        # FAISS pads with -1 when the index holds fewer than k vectors
+        return [mapping[int(i)] for i in indices[0] if int(i) in mapping]
+
+    def _documents(self, ids: List[str]) -> List[Document]:
+        docs = []
+        for _id in ids:
+            doc = self.vectorstore.docstore.search(_id)
+            if isinstance(doc, Document):
+                docs.append(doc)
+        return docs
+
+    def retrieve(self, query: str, vector: Optional[List[float]] = None, k: Optional[int] = None) -> List[Document]:
+        """
+        Top k chunks for query. vector is the query embedding when the
+        caller already has one; it is computed here only if needed.
+
+        With a reranker configured, RERANK_CANDIDATES chunks are fetched and
+        the reranker picks the k passed on to the LLM.
+        """
+        k = k or self.k
+        reranker = get_reranker()
+        if reranker is None:
+            return self._candidates(query, vector, k)
+        candidates = self._candidates(query, vector, max(k, settings.rerank_candidates))
+        return rerank(reranker, query, candidates, k)
+
+    def _candidates(self, query: str, vector: Optional[List[float]], k: int) -> List[Document]:
+        if self.is_lexical_query(query):
+            return self._documents(self._lexical_ids(query, k))
+        if vector is None:
+            vector = self.vectorstore.embedding_function.embed_query(query)
+        if self.lexical is None or settings.retrieval_mode == "vector":
+            return self._documents(self._vector_ids(vector, k))
+        fetch_k = max(self.fetch_k, k)
+        fused = rrf_fuse(
+            [self._vector_ids(vector, fetch_k), self._lexical_ids(query, fetch_k)],
+            k=k,
+            rrf_k=settings.retrieval_rrf_k,
+        )
+        return self._documents(fused)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.retrieve(query)
+
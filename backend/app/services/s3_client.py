@@ -1,10 +1,15 @@
 import boto3 #type: ignore
+from boto3.s3.transfer import TransferConfig #type: ignore
 from fastapi import APIRouter, File, UploadFile, HTTPException #type: ignore
+from fastapi.concurrency import run_in_threadpool #type: ignore
 from botocore.exceptions import BotoCoreError, ClientError #type: ignore
 import os
 import uuid
+from urllib.parse import urlparse
 from dotenv import load_dotenv #type: ignore
 
+from app.core.config import settings
+
 load_dotenv()  # if using .env file
 
 router = APIRouter()
@@ -18,6 +23,13 @@ s3_client = boto3.client(
 
 BUCKET_NAME = os.getenv("AWS_S3_BUCKET_NAME")
 
+# Files larger than one part go up as a multipart upload, one part in memory per thread
+transfer_config = TransferConfig(
+    multipart_threshold=settings.s3_multipart_chunk_size,
+    multipart_chunksize=settings.s3_multipart_chunk_size,
+    max_concurrency=settings.s3_max_concurrency,
+)
+
 @router.post("/upload_pdf")
 async def upload_pdf(file: UploadFile = File(...)):
     if not file.filename.endswith(".pdf"):
@@ -26,14 +38,15 @@ async def upload_pdf(file: UploadFile = File(...)):
     unique_filename = f"{uuid.uuid4()}.pdf"
 
     try:
-        contents = await file.read()
-        if not contents:
+        if file.size == 0:
             raise HTTPException(status_code=400, detail="Uploaded file is empty")
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=unique_filename,
-            Body=contents,
-            ContentType="application/pdf"
+        await run_in_threadpool(
+            s3_client.upload_fileobj,
+            file.file,
+            BUCKET_NAME,
+            unique_filename,
+            ExtraArgs={"ContentType": "application/pdf"},
+            Config=transfer_config
         )
     except (BotoCoreError, ClientError) as e:
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
@@ -42,3 +55,38 @@ async def upload_pdf(file: UploadFile = File(...)):
 
     file_url = f"https://{BUCKET_NAME}.s3.{os.getenv('AWS_REGION')}.amazonaws.com/{unique_filename}"
     return {"filename": unique_filename, "url": file_url}
+
+def upload_pdf_file(path) -> dict:
+    """
+    Upload a PDF already on local disk. Safe to call from worker threads.
+
+    Returns:
+        Dict with the S3 key and public URL
+
+    Raises:
+        HTTPException: If the S3 upload fails
+    """
+    unique_filename = f"{uuid.uuid4()}.pdf"
+    try:
+        s3_client.upload_file(
+            str(path),
+            BUCKET_NAME,
+            unique_filename,
+            ExtraArgs={"ContentType": "application/pdf"},
+            Config=transfer_config
+        )
+    except (BotoCoreError, ClientError) as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+
+    file_url = f"https://{BUCKET_NAME}.s3.{os.getenv('AWS_REGION')}.amazonaws.com/{unique_filename}"
+    return {"filename": unique_filename, "url": file_url}
+
+def delete_pdf_object(url_or_key: str) -> None:
+    """
+    Delete an uploaded PDF given its public URL (as stored in Document.source) or S3 key.
+
+    Raises:
+        BotoCoreError, ClientError: If the S3 request fails
+    """
+    key = urlparse(url_or_key).path.lstrip("/") if "://" in url_or_key else url_or_key
+    s3_client.delete_object(Bucket=BUCKET_NAME, Key=key)
@@ -0,0 +1,106 @@
+# app/services/text_store.py
+"""
+Compressed storage for extracted document text.
+
+The full text of a PDF is kept out of the documents table: it is gzipped and
+written to TEXT_STORE ("local": a file under TEXT_STORE_DIR, "s3": an object
+under TEXT_STORE_PREFIX in the upload bucket). Document.content_ref holds
+the reference returned by save_text, "<backend>:<key>", so texts stay
+readable after TEXT_STORE changes.
+
+Keys are the document's index key (Document.filename): deduplicated uploads
+share one text blob just as they share one index.
+"""
+import gzip
+import os
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+BACKENDS = ("local", "s3")
+_SUFFIX = ".txt.gz"
+_COMPRESS_LEVEL = 6
+
+
+def _split_ref(ref: str) -> Tuple[str, str]:
+    backend, _, key = ref.partition(":")
+    if backend not in BACKENDS or not key:
+        raise ValueError(f"Invalid text reference {ref!r}")
+    return backend, key
+
+
+def _local_path(key: str) -> str:
+    return os.path.join(settings.text_store_dir, os.path.basename(key))
+
+
+def _s3_key(key: str) -> str:
+    return f"{settings.text_store_prefix}{key}"
+
+
+def save_text(key: str, text: str, backend: Optional[str] = None) -> str:
+    """
+    Store text compressed under key and return its reference.
+
+    Raises:
+        ValueError: If the backend is not recognised
+    """
+    backend = backend or settings.text_store
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown text store {backend!r}, expected one of {BACKENDS}")
+    key = f"{key}{_SUFFIX}"
+    data = gzip.compress(text.encode("utf-8"), compresslevel=_COMPRESS_LEVEL)
+    if backend == "local":
+        os.makedirs(settings.text_store_dir, exist_ok=True)
+        path = _local_path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    else:
+        from app.services.s3_client import BUCKET_NAME, s3_client
+
+        s3_client.put_object(
+            Bucket=BUCKET_NAME,
+            Key=_s3_key(key),
+            Body=data,
+            ContentType="text/plain; charset=utf-8",
+            ContentEncoding="gzip",
+        )
+    return f"{backend}:{key}"
+
+
+def load_text(ref: Optional[str]) -> Optional[str]:
+    """Text stored under ref, or None if there is no reference or blob."""
+    if not ref:
+        return None
+    backend, key = _split_ref(ref)
+    if backend == "local":
+        try:
+            with open(_local_path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+    else:
+        from app.services.s3_client import BUCKET_NAME, s3_client
+
+        try:
+            data = s3_client.get_object(Bucket=BUCKET_NAME, Key=_s3_key(key))["Body"].read()
+        except s3_client.exceptions.NoSuchKey:
+            return None
+    return gzip.decompress(data).decode("utf-8")
+
+
+def delete_text(ref: Optional[str]) -> None:
+    """Remove the blob behind ref. Missing blobs are ignored."""
+    if not ref:
+        return
+    backend, key = _split_ref(ref)
+    if backend == "local":
+        try:
+            os.remove(_local_path(key))
+        except FileNotFoundError:
+            pass
+    else:
+        from app.services.s3_client import BUCKET_NAME, s3_client
+
+        s3_client.delete_object(Bucket=BUCKET_NAME, Key=_s3_key(key))
@@ -0,0 +1,71 @@
+# app/services/tokens.py
+"""
+Token counting with tiktoken's cl100k_base encoding.
+
+The encoding file is downloaded on first use. Where that is impossible
+(offline hosts) counts fall back to the length estimate the embedding client
+uses, so callers never fail on tokenization.
+"""
+import logging
+from typing import List, Tuple
+
+import tiktoken  # type: ignore
+
+from app.services.embedding_client import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            logger.warning("tiktoken encoding unavailable, estimating tokens from length")
+            _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def split_token_spans(text: str, max_tokens: int) -> List[Tuple[int, int]]:
+    """
+    (start, end) character spans that cover text in order, each of at most
+    max_tokens tokens, cut at token boundaries so every span is a slice of text.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        step = max_tokens * CHARS_PER_TOKEN
+        return [(i, min(i + step, len(text))) for i in range(0, len(text), step)]
+    _, offsets = encoding.decode_with_offsets(encoding.encode(text))
+    bounds = sorted(set(offsets) | {0, len(text)})
+    spans: List[Tuple[int, int]] = []
+    index = 0
+    while bounds[index] < len(text):
+        start = bounds[index]
+        end_index = min(index + max_tokens, len(bounds) - 1)
+        # A slice can tokenize differently from the same text in context
+        while end_index > index + 1 and count_tokens(text[start:bounds[end_index]]) > max_tokens:
+            end_index -= 1
+        spans.append((start, bounds[end_index]))
+        index = end_index
+    return spans
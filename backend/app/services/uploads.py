@@ -0,0 +1,46 @@
+# app/services/uploads.py
+import hashlib
+import os
+from pathlib import Path
+from typing import Tuple
+
+from fastapi import UploadFile, HTTPException  # type: ignore
+
+from app.core.config import settings
+
+
+async def spool_upload(file: UploadFile, dest: Path) -> Tuple[int, str]:
+    """
+    Stream an upload to dest in fixed-size chunks, computing its size and
+    sha256 on the way. Peak memory is one chunk regardless of file size.
+
+    Returns:
+        (size in bytes, hex sha256 digest)
+
+    Raises:
+        HTTPException: 413 if the file exceeds MAX_UPLOAD_BYTES, 400 if it is empty
+    """
+    max_bytes = settings.max_upload_bytes
+    # Reject early when the client told us the size up front
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes} byte upload limit")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest, "wb") as f:
+            while chunk := await file.read(settings.upload_chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes} byte upload limit")
+                digest.update(chunk)
+                f.write(chunk)
+    except Exception:
+        if os.path.exists(dest):
+            os.remove(dest)
+        raise
+
+    if not size:
+        os.remove(dest)
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+    return size, digest.hexdigest()
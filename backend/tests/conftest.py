@@ -0,0 +1,291 @@
+# tests/conftest.py
+"""
+Shared fixtures.
+
+The app reads its settings at import time, so the environment is pointed at
+a throwaway SQLite database and temporary storage before anything under
+app/ is imported. Embeddings and the LLM are local stand-ins (no network),
+S3 calls are stubbed, and every test starts from empty tables and caches.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+_TMP = Path(tempfile.mkdtemp(prefix="docqa-tests-"))
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_TMP / 'test.db'}",
+    "UPLOAD_DIR": str(_TMP / "uploads"),
+    "GEMINI_API_KEY": "test-key",
+    "INDEX_DIR": str(_TMP / "indexes"),
+    "TEXT_STORE_DIR": str(_TMP / "texts"),
+    "EMBEDDING_CACHE_DIR": str(_TMP / "embedding_cache"),
+})
+(_TMP / "uploads").mkdir()
+(_TMP / "embedding_cache").mkdir()
+
+import fitz  # type: ignore  # noqa: E402
+import numpy as np  # type: ignore  # noqa: E402
+import pytest  # type: ignore  # noqa: E402
+from fastapi.testclient import TestClient  # type: ignore  # noqa: E402
+from langchain_core.embeddings import Embeddings  # type: ignore  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # type: ignore  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk  # type: ignore  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # type: ignore  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.db.models import ChatMessage, ChatSession, Document, User  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import chat_history, cleanup, ingestion, pdf_export, qa_engine  # noqa: E402
+from app.services.collection_search import registry as collection_registry  # noqa: E402
+
+TERMINAL_STATUSES = (ingestion.STATUS_READY, ingestion.STATUS_FAILED)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Bag-of-words vectors via the hashing trick: texts sharing words are
+    close, so retrieval behaves meaningfully without a provider.
+    """
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest, "little") % self.size] += 1.0
+        norm = np.linalg.norm(vector)
+        if not norm:
+            vector[0] = 1.0
+            norm = 1.0
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model returning a fixed reply, optionally after a delay; streams
+    it word by word with the delay between words. Prompts are recorded.
+    """
+
+    reply: str = "stub answer"
+    delay: float = 0.0
+    prompts: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _record(self, messages) -> None:
+        self.prompts.append("\n".join(str(m.content) for m in messages))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._record(messages)
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._record(messages)
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._record(messages)
+        for i, word in enumerate(self.reply.split(" ")):
+            await asyncio.sleep(self.delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+
+# Chains capture the LLM when they are built, so one instance is swapped in
+# for the whole run and reconfigured per test
+llm = ScriptedChatModel()
+qa_engine.llm = llm
+hashing_embedding = HashingEmbeddings()
+qa_engine.batched_embedding.base = hashing_embedding
+
+s3_uploads: List[str] = []
+s3_deletes: List[str] = []
+
+
+def _fake_upload_pdf_file(file_path: str) -> Dict[str, Any]:
+    key = f"pdfs/{os.path.basename(file_path)}"
+    s3_uploads.append(key)
+    return {"url": f"https://test-bucket.s3.amazonaws.com/{key}", "key": key}
+
+
+ingestion.upload_pdf_file = _fake_upload_pdf_file
+cleanup.delete_pdf_object = s3_deletes.append
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Empty tables and caches, default LLM behaviour."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    for key in qa_engine.doc_qa_map.keys():
+        qa_engine.doc_qa_map.pop(key)
+    qa_engine.answer_cache._docs.clear()
+    for key in pdf_export.export_cache.keys():
+        pdf_export.export_cache.pop(key)
+    collection_registry._users.clear()
+    chat_history._condensed.clear()
+    llm.reply = "stub answer"
+    llm.delay = 0.0
+    llm.prompts.clear()
+    s3_uploads.clear()
+    s3_deletes.clear()
+    yield
+    drain_cleanup()
+
+
+def drain_cleanup() -> None:
+    """Wait for cleanup jobs submitted so far."""
+    cleanup.cleanup_queue._executor.submit(lambda: None).result()
+
+
+class HeldBackend(ingestion.IngestionBackend):
+    """Keeps submitted jobs until the test runs them."""
+
+    def __init__(self):
+        self.jobs: List[Tuple[Any, tuple]] = []
+
+    def submit(self, job, *args) -> None:
+        self.jobs.append((job, args))
+
+    def pending(self) -> int:
+        return len(self.jobs)
+
+    def run_all(self) -> None:
+        while self.jobs:
+            job, args = self.jobs.pop(0)
+            job(*args)
+
+
+@pytest.fixture
+def held_ingestion():
+    """Ingestion jobs are queued but only run on held_ingestion.run_all()."""
+    previous = ingestion.get_ingestion_backend()
+    backend = HeldBackend()
+    ingestion.set_ingestion_backend(backend)
+    yield backend
+    ingestion.set_ingestion_backend(previous)
+
+
+@pytest.fixture
+def scripted_llm() -> ScriptedChatModel:
+    return llm
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(app)
+
+
+def write_pdf(path: Path, pages: List[str]) -> Path:
+    pdf = fitz.open()
+    for text in pages:
+        page = pdf.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 540, 770), text, fontsize=10)
+    pdf.save(str(path))
+    pdf.close()
+    return path
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """make_pdf(pages, name=...) -> path of a PDF with one text page per item."""
+    counter = iter(range(1_000_000))
+
+    def make(pages: List[str], name: Optional[str] = None) -> Path:
+        return write_pdf(tmp_path / (name or f"doc{next(counter)}.pdf"), pages)
+
+    return make
+
+
+def spooled_files() -> List[str]:
+    """Files in UPLOAD_DIR, without the ingestion owner locks."""
+    return sorted(name for name in os.listdir(os.environ["UPLOAD_DIR"]) if name != ingestion.OWNER_LOCK_DIR)
+
+
+def login(client: TestClient, user_id: str) -> Dict[str, Any]:
+    response = client.post("/users/auth/google", json={"sub": user_id, "email": f"{user_id}@example.com"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def wait_for_job(client: TestClient, job_id: int, timeout: float = 30) -> Dict[str, Any]:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/upload/jobs/{job_id}").json()
+        if job["status"] in TERMINAL_STATUSES:
+            return job
+        assert time.monotonic() < deadline, f"job {job_id} stuck in {job['status']}"
+        time.sleep(0.02)
+
+
+def upload(client: TestClient, user_id: str, pdf: Path, wait: bool = True) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """POST /upload/ and, unless wait is False, poll until the job finishes."""
+    with open(pdf, "rb") as f:
+        response = client.post(
+            "/upload/", data={"user_id": user_id}, files={"file": (pdf.name, f, "application/pdf")}
+        )
+    assert response.status_code == 202, response.text
+    body = response.json()
+    job = wait_for_job(client, body["job_id"]) if wait else None
+    return body, job
+
+
+def seed_documents(
+    user_id: str, count: int, messages_per_session: int = 0, index_key: Optional[str] = None
+) -> List[Tuple[int, int]]:
+    """
+    Insert count ready documents for user_id (created if missing), one chat
+    session each with messages_per_session messages, oldest first.
+
+    Returns:
+        (document id, session id) per document
+    """
+    start = datetime(2024, 1, 1)
+    db = SessionLocal()
+    try:
+        if db.get(User, user_id) is None:
+            db.add(User(user_id=user_id, email=f"{user_id}@example.com"))
+        created = []
+        for i in range(count):
+            at = start + timedelta(minutes=i)
+            doc = Document(filename=index_key or f"{user_id}-doc-{i}", user_id=user_id, upload_time=at)
+            db.add(doc)
+            db.flush()
+            session = ChatSession(user_id=user_id, document_id=doc.id, started_at=at)
+            db.add(session)
+            db.flush()
+            db.add_all(
+                ChatMessage(
+                    session_id=session.id,
+                    role="user" if j % 2 == 0 else "assistant",
+                    content=f"message {j}",
+                    # Pairs share a timestamp, as a question and its quick answer can
+                    timestamp=at + timedelta(seconds=j // 2),
+                )
+                for j in range(messages_per_session)
+            )
+            created.append((doc.id, session.id))
+        db.commit()
+        return created
+    finally:
+        db.close()
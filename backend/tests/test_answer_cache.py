@@ -0,0 +1,68 @@
+"""Cached answers are reused for repeat questions, but never across users."""
+from app.services import qa_engine
+from app.services.answer_cache import AnswerCache
+
+from conftest import login, upload
+
+
+def _cache(**overrides):
+    options = dict(ttl_seconds=60, max_entries_per_doc=8, max_docs=8, similarity_threshold=0.95)
+    options.update(overrides)
+    return AnswerCache(**options)
+
+
+def test_exact_and_similar_hits_stay_in_scope():
+    cache = _cache()
+    cache.put("doc", "What is the warranty?", [1.0, 0.0], "two years", scope="alice")
+
+    assert cache.get_exact("doc", "  what is the WARRANTY? ", scope="alice") == "two years"
+    assert cache.get_similar("doc", [0.99, 0.01], scope="alice") == "two years"
+    assert cache.get_exact("doc", "What is the warranty?", scope="bob") is None
+    assert cache.get_similar("doc", [0.99, 0.01], scope="bob") is None
+
+
+def test_invalidate_drops_every_scope():
+    cache = _cache()
+    cache.put("doc", "q", None, "a", scope="alice")
+    cache.put("doc", "q", None, "b", scope="bob")
+    cache.put("other", "q", None, "c", scope="alice")
+
+    cache.invalidate("doc")
+
+    assert cache.get_exact("doc", "q", scope="alice") is None
+    assert cache.get_exact("doc", "q", scope="bob") is None
+    assert cache.get_exact("other", "q", scope="alice") == "c"
+    assert cache.stats()["documents"] == 1
+
+
+def test_repeat_question_is_answered_from_cache(client, make_pdf, scripted_llm):
+    login(client, "alice")
+    body, _ = upload(client, "alice", make_pdf(["The warranty lasts two years from delivery."]))
+    question = {"session_id": body["session_id"], "question": "How long is the warranty?"}
+
+    first = client.post("/ask/", json=question).json()
+    calls = len(scripted_llm.prompts)
+    second = client.post("/ask/", json=question).json()
+
+    assert second["answer"] == first["answer"]
+    assert len(scripted_llm.prompts) == calls
+
+
+def test_deduplicated_upload_does_not_share_answers_across_users(client, make_pdf, scripted_llm):
+    pdf = make_pdf(["The warranty lasts two years from delivery.", "Refunds take ten days."])
+    login(client, "alice")
+    login(client, "bob")
+    alice, _ = upload(client, "alice", pdf)
+    bob, _ = upload(client, "bob", pdf)
+    assert bob["document"]["filename"] == alice["document"]["filename"]
+
+    scripted_llm.reply = "Alice's answer"
+    client.post("/ask/", json={"session_id": alice["session_id"], "question": "Refund duration?"})
+    client.post("/ask/", json={"session_id": alice["session_id"], "question": "How long is the warranty?"})
+
+    scripted_llm.reply = "Bob's answer"
+    response = client.post("/ask/", json={"session_id": bob["session_id"], "question": "How long is the warranty?"})
+
+    assert response.json()["answer"] == "Bob's answer"
+    assert "Refund duration?" not in scripted_llm.prompts[-1]
+    assert qa_engine.answer_cache.stats()["scopes"] == 2
@@ -0,0 +1,63 @@
+"""/ask/stream sends the first token long before the answer is complete."""
+import json
+
+from conftest import login, upload
+
+
+def _events(response):
+    """(event, data) pairs of a Server-Sent Events body."""
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _session(client, make_pdf):
+    login(client, "alice")
+    body, _ = upload(client, "alice", make_pdf(["The warranty lasts two years from delivery."]))
+    return body["session_id"]
+
+
+def test_first_token_arrives_before_the_answer_is_done(client, make_pdf, scripted_llm):
+    session_id = _session(client, make_pdf)
+    scripted_llm.reply = "The warranty lasts two years"
+    scripted_llm.delay = 0.05
+
+    response = client.post("/ask/stream", json={"session_id": session_id, "question": "Warranty?"})
+    events = _events(response)
+
+    assert response.status_code == 200
+    assert [name for name, _ in events] == ["token"] * 5 + ["done"]
+    done = events[-1][1]
+    assert "".join(data["text"] for _, data in events[:-1]) == done["answer"] == scripted_llm.reply
+    # Five words each 50ms apart: the first lands about 200ms before the last
+    assert done["ttft_ms"] < done["total_ms"] - 150
+
+
+def test_streamed_exchange_is_saved_once_complete(client, make_pdf, scripted_llm):
+    session_id = _session(client, make_pdf)
+    scripted_llm.reply = "Two years"
+
+    client.post("/ask/stream", json={"session_id": session_id, "question": "Warranty?"})
+    messages = client.get(f"/ask/conversations/{session_id}").json()
+
+    assert [(m["role"], m["content"]) for m in messages] == [("user", "Warranty?"), ("assistant", "Two years")]
+
+
+def test_repeat_question_streams_the_cached_answer(client, make_pdf, scripted_llm):
+    session_id = _session(client, make_pdf)
+    question = {"session_id": session_id, "question": "Warranty?"}
+    first = _events(client.post("/ask/stream", json=question))[-1][1]
+    calls = len(scripted_llm.prompts)
+
+    second = _events(client.post("/ask/stream", json=question))[-1][1]
+
+    assert second["answer"] == first["answer"]
+    assert len(scripted_llm.prompts) == calls
+
+
+def test_unknown_session_fails_before_streaming(client):
+    response = client.post("/ask/stream", json={"session_id": 999, "question": "Warranty?"})
+
+    assert response.status_code == 404
@@ -0,0 +1,91 @@
+"""Rolling summaries fold every message exactly once, oldest first."""
+import asyncio
+import re
+
+from sqlalchemy import select  # type: ignore
+
+from app.core.config import settings
+from app.db.models.chat import ChatMessage, ChatSession
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services import chat_history
+
+from conftest import seed_documents
+
+
+def _build(session_id):
+    async def run():
+        async with AsyncSessionLocal() as db:
+            session = await db.get(ChatSession, session_id)
+            history = await chat_history.build_history(db, session)
+            ids = (await db.execute(
+                select(ChatMessage.id).where(ChatMessage.session_id == session_id).order_by(ChatMessage.id)
+            )).scalars().all()
+            result = history, session.summarized_until_id, list(ids)
+        # Pooled connections belong to this event loop
+        await async_engine.dispose()
+        return result
+
+    return asyncio.run(run())
+
+
+def _folded(prompts):
+    """Message numbers sent to the summarizer, in order."""
+    numbers = []
+    for prompt in prompts:
+        new_messages = prompt.split("New messages:", 1)[1]
+        numbers.extend(int(n) for n in re.findall(r"message (\d+)", new_messages))
+    return numbers
+
+
+def test_backlog_is_folded_from_the_oldest_message(scripted_llm):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=30)
+    scripted_llm.reply = "summary"
+    window = 2 * settings.history_max_turns
+
+    history, summarized_until, ids = _build(session_id)
+
+    assert _folded(scripted_llm.prompts) == list(range(30 - window))
+    assert summarized_until == ids[30 - window - 1]
+    assert history.startswith("Summary of earlier conversation: summary")
+    assert f"message {30 - window}" in history
+
+
+def test_large_backlog_is_worked_off_in_order(scripted_llm, monkeypatch):
+    monkeypatch.setattr(settings, "history_token_budget", 20)
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=60)
+    window = 2 * settings.history_max_turns
+
+    for _ in range(20):
+        _, summarized_until, ids = _build(session_id)
+        if ids.index(summarized_until) >= len(ids) - window - settings.history_fold_batch:
+            break
+
+    folded = _folded(scripted_llm.prompts)
+    assert folded == list(range(len(folded)))
+    assert len(folded) > 60 - window - settings.history_fold_batch
+
+
+def test_failed_fold_keeps_the_messages_for_later(scripted_llm, monkeypatch):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=20)
+
+    async def fail(summary, messages):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(chat_history, "_fold_into_summary", fail)
+    history, summarized_until, _ = _build(session_id)
+    assert summarized_until is None
+    assert "message 19" in history
+
+    monkeypatch.undo()
+    _build(session_id)
+    assert _folded(scripted_llm.prompts)[0] == 0
+
+
+def test_short_conversation_is_not_summarized(scripted_llm):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=6)
+
+    history, summarized_until, _ = _build(session_id)
+
+    assert scripted_llm.prompts == []
+    assert summarized_until is None
+    assert history.splitlines() == [f"{'user' if i % 2 == 0 else 'assistant'}: message {i}" for i in range(6)]
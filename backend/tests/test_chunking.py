@@ -0,0 +1,123 @@
+"""Chunkers: streaming output equals the batch splitter; structured chunks respect the token limit."""
+import random
+
+import pytest  # type: ignore
+from langchain.text_splitter import CharacterTextSplitter  # type: ignore
+
+from app.services import tokens
+from app.services.chunking import _split_block, iter_chunks, iter_structured_chunks, page_text
+
+
+class CharEncoding:
+    """One token per character: the densest text a tokenizer can see."""
+
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, ids):
+        return "".join(map(chr, ids))
+
+    def decode_with_offsets(self, ids):
+        return self.decode(ids), list(range(len(ids)))
+
+
+@pytest.fixture
+def dense_tokens(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", CharEncoding())
+
+
+def _random_pages(seed, count=12):
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "theta"]
+    pages = []
+    for _ in range(count):
+        paragraphs = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(1, 250)))
+            for _ in range(rng.randint(0, 6))
+        ]
+        separator = rng.choice(["\n\n", "\n", "\n\n\n", " \n\n"])
+        pages.append(separator.join(paragraphs))
+    return pages
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_streaming_chunks_equal_batch_splitter(seed):
+    pages = _random_pages(seed)
+    expected = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100).split_text("\n".join(pages))
+
+    assert list(iter_chunks(pages)) == expected
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_streaming_chunks_do_not_depend_on_piece_boundaries(seed):
+    text = "\n".join(_random_pages(seed))
+    rng = random.Random(seed)
+    pieces, i = [], 0
+    while i < len(text):
+        step = rng.randint(1, 700)
+        pieces.append(text[i:i + step])
+        i += step
+
+    assert list(iter_chunks(pieces, page_separator="")) == list(iter_chunks([text]))
+
+
+def _blocks(seed, count=10):
+    rng = random.Random(seed)
+    pages = []
+    for number in range(1, count + 1):
+        blocks = [(f"Section {number}", True)]
+        for _ in range(rng.randint(1, 5)):
+            sentences = [
+                " ".join(rng.choice(["pump", "valve", "seal", "rotor"]) for _ in range(rng.randint(3, 40))) + "."
+                for _ in range(rng.randint(1, 12))
+            ]
+            blocks.append((" ".join(sentences), False))
+        pages.append((number, blocks))
+    return pages
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_structured_chunks_are_exact_slices_within_the_limit(seed):
+    pages = _blocks(seed)
+    document = "\n".join(page_text(blocks) for _, blocks in pages)
+
+    chunks = list(iter_structured_chunks(pages, max_tokens=64, overlap_tokens=8))
+
+    assert chunks
+    for chunk in chunks:
+        meta = chunk.metadata
+        assert document[meta["start_offset"]:meta["end_offset"]] == chunk.page_content
+        assert tokens.count_tokens(chunk.page_content) <= 64
+        assert meta["page"] <= meta["page_end"]
+        assert meta["section"].startswith("Section ")
+
+
+def test_token_dense_block_is_cut_by_token_count(dense_tokens):
+    # No sentence or line breaks, and far denser than 4 characters per token
+    block = "x" * 3000
+
+    spans = _split_block(block, 256)
+
+    assert [b - a for a, b in spans] == [256] * 11 + [184]
+    chunks = list(iter_structured_chunks([(1, [(block, False)])], max_tokens=256, overlap_tokens=0))
+    assert max(tokens.count_tokens(c.page_content) for c in chunks) <= 256
+    assert "".join(c.page_content for c in chunks) == block
+
+
+def test_long_sentence_is_cut_inside_but_sentences_stay_whole(dense_tokens):
+    text = "Short one. " + "y" * 700 + ". Another short one."
+
+    spans = _split_block(text, 300)
+
+    assert "".join(text[a:b] for a, b in spans) == text
+    assert all(b - a <= 300 for a, b in spans)
+    assert text[spans[0][0]:spans[0][1]] == "Short one. "
+
+
+def test_token_spans_fall_back_to_length_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", None)
+    monkeypatch.setattr(tokens, "_encoding_failed", True)
+
+    spans = tokens.split_token_spans("z" * 2100, 100)
+
+    assert spans == [(0, 400), (400, 800), (800, 1200), (1200, 1600), (1600, 2000), (2000, 2100)]
@@ -0,0 +1,127 @@
+"""Collection search merges every ready document's hits by score and searches shared indexes once."""
+import pytest  # type: ignore
+
+from app.db.models import Document
+from app.db.session import SessionLocal
+from app.services import collection_search, qa_engine
+from app.services.collection_search import search_collection
+
+from conftest import seed_documents
+
+MANUAL = [
+    "The pump draws water through the intake filter.",
+    "Replace the intake filter cartridge every six months.",
+    "The pump motor is rated for continuous duty.",
+]
+WARRANTY = [
+    "The warranty covers manufacturing defects for two years.",
+    "Filter cartridges are consumables and not covered by the warranty.",
+    "Claims need the original receipt and serial number.",
+]
+
+
+def _index(index_key, texts):
+    docs = [qa_engine.Document(page_content=text, metadata={"chunk": i}) for i, text in enumerate(texts)]
+    qa_engine.persist_vectorstore(qa_engine.build_vectorstore(docs, qa_engine.embed_chunks(docs)), index_key)
+
+
+@pytest.fixture
+def library():
+    """alice's manual and warranty documents, by document id."""
+    _index("manual-key", MANUAL)
+    _index("warranty-key", WARRANTY)
+    [(manual, _)] = seed_documents("alice", 1, index_key="manual-key")
+    [(warranty, _)] = seed_documents("alice", 1, index_key="warranty-key")
+    return {"manual": manual, "warranty": warranty}
+
+
+@pytest.fixture
+def searched(monkeypatch):
+    """Index keys of every shard search."""
+    keys = []
+    search_shard = collection_search._search_shard
+
+    def record(index_key, vector, k):
+        keys.append(index_key)
+        return search_shard(index_key, vector, k)
+
+    monkeypatch.setattr(collection_search, "_search_shard", record)
+    return keys
+
+
+def _set_status(document_id, status):
+    db = SessionLocal()
+    try:
+        db.query(Document).filter(Document.id == document_id).update({Document.status: status})
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_hits_from_all_documents_are_merged_by_score(library):
+    hits = search_collection("alice", "is the filter cartridge covered by the warranty", k=6)
+
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores)
+    assert len(hits) == 6
+    assert {doc.metadata["document_id"] for doc, _ in hits} == set(library.values())
+    assert hits[0][0].page_content == WARRANTY[1]
+    # The merged list is every chunk of both documents, ranked by distance alone
+    every = sorted(
+        (
+            hit
+            for key in ("manual-key", "warranty-key")
+            for hit in qa_engine.load_index(key).retriever.vectorstore.similarity_search_with_score(
+                "is the filter cartridge covered by the warranty", k=3
+            )
+        ),
+        key=lambda hit: hit[1],
+    )
+    assert [doc.page_content for doc, _ in hits] == [doc.page_content for doc, _ in every]
+
+
+def test_document_ids_restrict_the_search(library, searched):
+    hits = search_collection("alice", "filter cartridge", k=6, document_ids=[library["manual"]])
+
+    assert {doc.metadata["document_id"] for doc, _ in hits} == {library["manual"]}
+    assert {doc.page_content for doc, _ in hits} == set(MANUAL)
+    assert searched == ["manual-key"]
+    assert search_collection("alice", "filter cartridge", document_ids=[]) == []
+
+
+def test_shared_index_is_searched_once(library, searched):
+    (first, _), (second, _) = seed_documents("alice", 2, index_key="manual-key")
+
+    hits = search_collection("alice", "pump intake filter", k=10)
+
+    assert sorted(searched) == ["manual-key", "warranty-key"]
+    manual_hits = [doc for doc, _ in hits if doc.metadata["doc_id"] == "manual-key"]
+    assert len(manual_hits) == len(MANUAL)
+    # Cited as the first of the three uploads sharing the index
+    assert {doc.metadata["document_id"] for doc in manual_hits} == {min(library["manual"], first, second)}
+
+
+def test_ask_collection_answers_with_ranked_sources(client, library, scripted_llm):
+    question = "is the filter cartridge covered by the warranty"
+    response = client.post("/ask/collection", json={"user_id": "alice", "question": question, "k": 3})
+
+    assert response.status_code == 200
+    sources = response.json()["sources"]
+    assert len(sources) == 3
+    assert [s["score"] for s in sources] == sorted(s["score"] for s in sources)
+    assert sources[0]["document_id"] == library["warranty"]
+    assert WARRANTY[1] in scripted_llm.prompts[-1]
+
+
+def test_ask_collection_without_ready_documents_is_404(client, library):
+    ask = lambda user_id, **extra: client.post(
+        "/ask/collection", json={"user_id": user_id, "question": "filter", **extra}
+    )
+
+    assert ask("bob").status_code == 404
+    assert ask("alice", document_ids=[10_000]).status_code == 404
+
+    _set_status(library["manual"], "processing")
+    _set_status(library["warranty"], "failed")
+    collection_search.registry._users.clear()
+    assert ask("alice").status_code == 404
@@ -0,0 +1,45 @@
+"""Concurrent questions overlap their LLM calls instead of queueing behind each other."""
+import asyncio
+import time
+
+import httpx  # type: ignore
+
+from app.db.session import async_engine
+from app.main import app
+
+from conftest import login, upload
+
+WORDS = ["warranty", "refund", "shipping", "battery", "firmware", "invoice", "sensor", "calibration"]
+
+
+def _ask_all(session_ids):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.post("/ask/", json={"session_id": session_id, "question": f"What about the {word}?"})
+                for session_id, word in zip(session_ids, WORDS)
+            ))
+            elapsed = time.perf_counter() - start
+        # Pooled connections belong to this event loop
+        await async_engine.dispose()
+        return responses, elapsed
+
+    return asyncio.run(run())
+
+
+def test_concurrent_questions_share_the_wait(client, make_pdf, scripted_llm):
+    login(client, "alice")
+    pdf = make_pdf([f"The {word} section explains the {word} policy." for word in WORDS])
+    session_ids = [upload(client, "alice", pdf)[0]["session_id"]]
+    # Re-uploads reuse the document with a fresh session each
+    session_ids += [upload(client, "alice", pdf)[0]["session_id"] for _ in WORDS[1:]]
+    scripted_llm.delay = 0.3
+
+    responses, elapsed = _ask_all(session_ids)
+
+    assert [r.status_code for r in responses] == [200] * len(WORDS)
+    assert len(scripted_llm.prompts) == len(WORDS)
+    # Served one at a time this would take len(WORDS) * delay = 2.4s
+    assert elapsed < len(WORDS) * scripted_llm.delay / 2
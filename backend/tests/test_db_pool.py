@@ -0,0 +1,88 @@
+"""Connection pools take their limits from settings and report saturation and timeouts."""
+import threading
+import time
+
+import pytest  # type: ignore
+from sqlalchemy import create_engine, exc, text  # type: ignore
+
+from app.core.config import settings
+from app.db import pool
+from app.db.pool import PoolStats, TimedQueuePool, engine_options, pool_stats
+
+
+@pytest.fixture
+def small_pool(tmp_path, monkeypatch):
+    """A file SQLite engine with 2 connections, 1 overflow and a 0.3s checkout timeout."""
+    monkeypatch.setattr(settings, "db_pool_size", 2)
+    monkeypatch.setattr(settings, "db_max_overflow", 1)
+    monkeypatch.setattr(settings, "db_pool_timeout", 0.3)
+    # Fresh counters rather than the ones shared with the app's engine
+    monkeypatch.setattr(TimedQueuePool, "stats", PoolStats())
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **engine_options(url))
+    yield engine
+    engine.dispose()
+
+
+def _hold(engine, seconds, errors):
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            time.sleep(seconds)
+    except exc.TimeoutError as e:
+        errors.append(e)
+
+
+def test_options_come_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_size", 3)
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 5000)
+
+    sync = engine_options("postgresql://app@db/qa")
+    asynchronous = engine_options("postgresql+asyncpg://app@db/qa", is_async=True)
+
+    assert sync["poolclass"] is TimedQueuePool and sync["pool_size"] == 3
+    assert sync["connect_args"] == {"options": "-c statement_timeout=5000"}
+    assert asynchronous["poolclass"] is pool.TimedAsyncQueuePool
+    assert asynchronous["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+    assert engine_options("sqlite://") == {}
+
+
+def test_saturated_pool_times_out_excess_requests(small_pool):
+    errors = []
+    threads = [threading.Thread(target=_hold, args=(small_pool, 0.6, errors)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    during = pool_stats(small_pool)
+    for thread in threads:
+        thread.join()
+    after = pool_stats(small_pool)
+
+    assert during["checked_out"] == 3
+    assert during["saturation"] == 1.0
+    # Three connections are held for 0.6s, so the other three give up after 0.3s
+    assert len(errors) == 3
+    assert after["timeouts"] == 3
+    assert after["checkouts"] == 3
+    assert after["checked_out"] == 0
+
+
+def test_waits_are_recorded_when_a_connection_frees_up(small_pool):
+    errors = []
+    threads = [threading.Thread(target=_hold, args=(small_pool, 0.15, errors)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = pool_stats(small_pool)
+
+    assert not errors
+    assert stats["checkouts"] == 4
+    assert stats["max_wait_ms"] >= 100
+
+
+def test_metrics_report_both_pools(client):
+    db_pool = client.get("/metrics/").json()["db_pool"]
+
+    assert {"saturation", "timeouts", "avg_wait_ms"} <= set(db_pool["sync"])
+    assert {"saturation", "timeouts", "avg_wait_ms"} <= set(db_pool["async"])
@@ -0,0 +1,89 @@
+"""The document cache evicts least-recently-used entries by size and count and loads a cold key once."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.doc_cache import DocumentCache
+
+
+def test_evicts_least_recently_used_past_the_byte_limit():
+    cache = DocumentCache(max_bytes=100, max_entries=10)
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    assert cache.get("a") == "A"
+
+    cache.put("c", "C", 40)
+
+    assert cache.keys() == ["a", "c"]
+    assert cache.stats()["bytes"] == 80
+    # An entry larger than the budget replaces everything else but is kept
+    cache.put("big", "BIG", 500)
+    assert cache.keys() == ["big"]
+    assert cache.stats()["evictions"] == 3
+
+
+def test_evicts_least_recently_used_past_the_entry_limit():
+    cache = DocumentCache(max_bytes=10_000, max_entries=2)
+    cache.put("a", "A", 1)
+    cache.put("b", "B", 1)
+    cache.get("a")
+
+    cache.put("c", "C", 1)
+
+    assert "b" not in cache
+    assert cache.keys() == ["a", "c"]
+    # Replacing a key resizes it instead of adding an entry
+    cache.put("a", "A2", 5)
+    assert len(cache) == 2 and cache.stats()["bytes"] == 6
+    assert cache.pop("a") == "A2" and cache.pop("a") is None
+    assert cache.stats()["bytes"] == 1
+
+
+def test_counters_track_hits_misses_and_evictions():
+    cache = DocumentCache(max_bytes=10_000, max_entries=1)
+    assert cache.stats()["hit_rate"] == 0.0
+
+    cache.get("a")
+    cache.get_or_load("a", lambda key: key.upper(), len)
+    cache.get("a")
+    cache.get_or_load("a", lambda key: "unused", len)
+    cache.put("b", "B", 1)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1)
+    assert stats["hit_rate"] == 0.5
+    assert (stats["entries"], stats["bytes"]) == (1, 1)
+
+
+def test_missing_documents_are_not_cached():
+    cache = DocumentCache(max_bytes=100, max_entries=10)
+    loads = []
+
+    for _ in range(2):
+        assert cache.get_or_load("gone", lambda key: loads.append(key), len) is None
+
+    assert loads == ["gone", "gone"]
+    assert len(cache) == 0
+
+
+def test_concurrent_requests_load_a_document_once():
+    cache = DocumentCache(max_bytes=10_000, max_entries=10)
+    loads = []
+    start = threading.Barrier(8)
+
+    def loader(key):
+        loads.append(key)
+        time.sleep(0.05)
+        return f"state of {key}"
+
+    def request(key):
+        start.wait()
+        return cache.get_or_load(key, loader, len)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(request, ["doc"] * 6 + ["other"] * 2))
+
+    assert results == ["state of doc"] * 6 + ["state of other"] * 2
+    assert sorted(loads) == ["doc", "other"]
+    assert cache.stats()["misses"] == 2
+    assert cache._key_locks == {}
@@ -0,0 +1,106 @@
+"""Deleting a document takes a fixed number of statements and cleans up shared artifacts last."""
+import time
+from datetime import datetime
+
+import pytest  # type: ignore
+from sqlalchemy import event, func  # type: ignore
+
+from app.db.models import ChatMessage, ChatSession, Document
+from app.db.session import SessionLocal, engine
+
+from conftest import drain_cleanup, s3_deletes, seed_documents
+
+
+def _add_conversations(user_id, doc_id, sessions, messages):
+    """Extra chat sessions on doc_id with messages each."""
+    db = SessionLocal()
+    try:
+        for _ in range(sessions):
+            session = ChatSession(user_id=user_id, document_id=doc_id, started_at=datetime(2024, 2, 1))
+            db.add(session)
+            db.flush()
+            db.add_all(
+                ChatMessage(session_id=session.id, role="user", content=f"m{j}", timestamp=datetime(2024, 2, 1))
+                for j in range(messages)
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _counts():
+    db = SessionLocal()
+    try:
+        return tuple(db.query(func.count(model.id)).scalar() for model in (Document, ChatSession, ChatMessage))
+    finally:
+        db.close()
+
+
+def _deletes(client, user_id, doc_id):
+    """DELETE statements sent while removing doc_id."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("DELETE"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.delete("/docs/", params={"user_id": user_id, "id": doc_id})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 204
+    return statements
+
+
+@pytest.mark.parametrize("sessions, messages", [(0, 0), (3, 10), (40, 50)])
+def test_statement_count_does_not_grow_with_the_conversation(client, sessions, messages):
+    [(doc_id, _)] = seed_documents("alice", 1, messages_per_session=2)
+    _add_conversations("alice", doc_id, sessions, messages)
+
+    assert len(_deletes(client, "alice", doc_id)) == 3
+    assert _counts() == (0, 0, 0)
+
+
+def test_other_documents_are_untouched(client):
+    (doc_id, _), (kept_id, kept_session) = seed_documents("alice", 2, messages_per_session=4)
+    [(other_id, _)] = seed_documents("bob", 1, messages_per_session=6)
+
+    _deletes(client, "alice", doc_id)
+
+    assert _counts() == (2, 2, 10)
+    assert client.get(f"/ask/conversations/{kept_session}").status_code == 200
+    assert client.delete("/docs/", params={"user_id": "alice", "id": other_id}).status_code == 404
+
+
+def test_shared_artifacts_are_removed_with_the_last_reference(client):
+    (first, _), (second, _) = seed_documents("alice", 2, index_key="shared-key")
+    db = SessionLocal()
+    try:
+        db.query(Document).update({Document.source: "https://test-bucket.s3.amazonaws.com/pdfs/shared.pdf"})
+        db.commit()
+    finally:
+        db.close()
+
+    _deletes(client, "alice", first)
+    drain_cleanup()
+    assert s3_deletes == []
+
+    _deletes(client, "alice", second)
+    drain_cleanup()
+    assert s3_deletes == ["https://test-bucket.s3.amazonaws.com/pdfs/shared.pdf"]
+
+
+@pytest.mark.benchmark
+def test_delete_benchmark(client):
+    """Request time to delete a document with 50 sessions of 100 messages."""
+    [(doc_id, _)] = seed_documents("alice", 1)
+    _add_conversations("alice", doc_id, 50, 100)
+
+    started = time.perf_counter()
+    statements = _deletes(client, "alice", doc_id)
+    elapsed = time.perf_counter() - started
+
+    assert len(statements) == 3
+    assert _counts() == (0, 0, 0)
+    print(f"\ndelete with 50 sessions, 5000 messages: {elapsed * 1000:.1f} ms, {len(statements)} DELETE statements")
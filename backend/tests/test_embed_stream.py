@@ -0,0 +1,48 @@
+"""Chunks are embedded in batches while the producer is still extracting."""
+import time
+
+from app.core.config import settings
+from app.services import qa_engine
+from app.services.chunking import StreamingCharacterSplitter
+
+from conftest import hashing_embedding
+
+
+def _pages(count):
+    return [f"Page {i} covers topic{i} with detail{i} and note{i}.\n\n" * 30 for i in range(count)]
+
+
+def test_batches_are_embedded_before_extraction_ends(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_batch_size", 4)
+    calls_at_end = []
+
+    def produce():
+        for i in range(20):
+            time.sleep(0.01)
+            yield f"streamed chunk {i} unique{i}"
+        calls_at_end.append(hashing_embedding.calls)
+
+    calls_before = hashing_embedding.calls
+    docs, vectors = qa_engine.embed_chunk_stream(produce(), metadata={"doc_id": "d"})
+
+    assert calls_at_end[0] > calls_before
+    assert [d.page_content for d in docs] == [f"streamed chunk {i} unique{i}" for i in range(20)]
+    assert all(d.metadata == {"doc_id": "d"} for d in docs)
+    assert vectors == qa_engine.embed_chunks(docs)
+
+
+def test_streamed_pages_embed_like_the_whole_text(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_batch_size", 3)
+    pages = _pages(12)
+    splitter = StreamingCharacterSplitter(chunk_size=1000, chunk_overlap=100)
+
+    def chunks():
+        for i, page in enumerate(pages):
+            yield from splitter.feed(page if i == 0 else "\n" + page)
+        yield from splitter.finish()
+
+    docs, vectors = qa_engine.embed_chunk_stream(chunks())
+    expected = qa_engine.split_text("\n".join(pages))
+
+    assert [d.page_content for d in docs] == [d.page_content for d in expected]
+    assert vectors == qa_engine.embed_chunks(expected)
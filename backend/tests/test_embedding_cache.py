@@ -0,0 +1,91 @@
+"""Chunk embeddings are served from the cache per model, and each distinct miss reaches the provider once."""
+import pytest  # type: ignore
+
+from app.services.embedding_cache import CachedEmbeddings, EmbeddingStore, cache_key
+
+from conftest import HashingEmbeddings
+
+
+class RecordingEmbeddings(HashingEmbeddings):
+    """Remembers every text sent to the provider."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def embed_documents(self, texts):
+        self.sent.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EmbeddingStore(str(tmp_path / "embeddings.sqlite3"))
+
+
+def test_repeat_texts_are_served_from_the_store(store):
+    base = RecordingEmbeddings()
+    cached = CachedEmbeddings(base, store, model="model-a")
+
+    first = cached.embed_documents(["alpha", "beta"])
+    second = cached.embed_documents(["beta", "gamma", "alpha"])
+
+    assert base.sent == ["alpha", "beta", "gamma"]
+    assert second[0] == first[1] and second[2] == first[0]
+    assert second[1] == base.embed_query("gamma")
+    assert store.count() == 3
+    # Whitespace differences share an entry
+    cached.embed_documents(["  alpha\n"])
+    assert base.sent == ["alpha", "beta", "gamma"]
+
+
+def test_repeated_texts_in_one_call_are_embedded_once(store):
+    base = RecordingEmbeddings()
+    cached = CachedEmbeddings(base, store, model="model-a")
+
+    vectors = cached.embed_documents(["same", "other", "same", "same"])
+
+    assert base.sent == ["same", "other"]
+    assert base.calls == 1
+    assert vectors[0] == vectors[2] == vectors[3]
+    assert cached.embed_documents([]) == [] and base.calls == 1
+
+
+def test_models_do_not_share_entries(store):
+    base = RecordingEmbeddings()
+    model_a = CachedEmbeddings(base, store, model="model-a")
+    model_b = CachedEmbeddings(base, store, model="model-b")
+
+    model_a.embed_documents(["alpha"])
+    model_b.embed_documents(["alpha"])
+    model_a.embed_documents(["alpha"])
+
+    assert base.sent == ["alpha", "alpha"]
+    assert store.count() == 2
+    assert cache_key("model-a", "alpha") != cache_key("model-b", "alpha")
+
+
+def test_stats_count_hits_misses_and_saved_tokens(store):
+    cached = CachedEmbeddings(RecordingEmbeddings(), store, model="model-a", cost_per_million_tokens=1_000_000)
+    assert cached.stats()["hit_rate"] == 0.0
+
+    cached.embed_documents(["x" * 40, "y" * 80])
+    cached.embed_documents(["x" * 40, "y" * 80, "z" * 40])
+
+    stats = cached.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 3)
+    assert stats["hit_rate"] == pytest.approx(0.4)
+    assert stats["saved_tokens_estimate"] == 120 // 4
+    assert stats["saved_cost_estimate"] == pytest.approx(30)
+    assert stats["model"] == "model-a"
+
+
+def test_entries_outlive_the_process(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    vector = CachedEmbeddings(RecordingEmbeddings(), EmbeddingStore(path), model="model-a").embed_documents(["alpha"])
+
+    base = RecordingEmbeddings()
+    reopened = CachedEmbeddings(base, EmbeddingStore(path), model="model-a")
+
+    assert reopened.embed_documents(["alpha"]) == vector
+    assert base.sent == []
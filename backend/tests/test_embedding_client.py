@@ -0,0 +1,143 @@
+"""Batched embedding keeps input order, respects batch limits and retries 429s."""
+import threading
+import time
+
+import pytest  # type: ignore
+from langchain_core.embeddings import Embeddings  # type: ignore
+from tenacity import wait_none  # type: ignore
+
+from app.services import embedding_client
+from app.services.embedding_client import BatchedEmbeddings, TokenBucket, is_transient_error
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+class FlakyEmbeddings(Embeddings):
+    """Embeds a text as [index in its batch, len(text)]; fails the first calls with a 429."""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.batches = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise RateLimited("429 Resource has been exhausted")
+            self.batches.append(list(texts))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return [[float(len(t)), float(t.count("x"))] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(embedding_client, "wait_exponential_jitter", lambda **_: wait_none())
+
+
+def _texts(count):
+    return ["x" * (i % 7 + 1) + " " * i for i in range(count)]
+
+
+def test_vectors_come_back_in_input_order():
+    base = FlakyEmbeddings(delay=0.01)
+    embedder = BatchedEmbeddings(base, max_batch_size=3, concurrency=4)
+    texts = _texts(20)
+
+    vectors = embedder.embed_documents(texts)
+
+    assert vectors == [[float(len(t)), float(t.count("x"))] for t in texts]
+    assert embedder.stats()["batches"] == 7
+    assert embedder.stats()["texts"] == 20
+
+
+def test_batches_respect_item_and_token_limits():
+    embedder = BatchedEmbeddings(FlakyEmbeddings(), max_batch_size=4, max_batch_tokens=10)
+    texts = ["a" * 16, "b" * 16, "c" * 16, "d" * 40, "e" * 4, "f" * 4, "g" * 4, "h" * 4, "i" * 4]
+
+    batches = embedder.pack_batches(texts)
+
+    assert batches == [[0, 1], [2], [3], [4, 5, 6, 7], [8]]
+
+
+def test_an_oversized_text_gets_its_own_batch():
+    embedder = BatchedEmbeddings(FlakyEmbeddings(), max_batch_tokens=5)
+
+    assert embedder.pack_batches(["a" * 100, "b", "c" * 100]) == [[0], [1], [2]]
+
+
+def test_concurrency_is_bounded():
+    base = FlakyEmbeddings(delay=0.05)
+    embedder = BatchedEmbeddings(base, max_batch_size=1, concurrency=2)
+
+    embedder.embed_documents(_texts(8))
+
+    assert base.peak == 2
+
+
+def test_rate_limited_batches_are_retried():
+    base = FlakyEmbeddings(failures=2)
+    embedder = BatchedEmbeddings(base, max_batch_size=5, concurrency=1, max_retries=3)
+    texts = _texts(5)
+
+    vectors = embedder.embed_documents(texts)
+
+    assert vectors == [[float(len(t)), float(t.count("x"))] for t in texts]
+    assert embedder.stats()["retries"] == 2
+    assert embedder.stats()["failures"] == 0
+
+
+def test_retries_give_up_after_max_retries():
+    embedder = BatchedEmbeddings(FlakyEmbeddings(failures=5), concurrency=1, max_retries=3)
+
+    with pytest.raises(RateLimited):
+        embedder.embed_documents(["text"])
+
+    assert embedder.stats()["retries"] == 2
+    assert embedder.stats()["failures"] == 1
+
+
+def test_permanent_errors_are_not_retried():
+    class Broken(FlakyEmbeddings):
+        def embed_documents(self, texts):
+            raise ValueError("bad input")
+
+    embedder = BatchedEmbeddings(Broken(), max_retries=5)
+
+    with pytest.raises(ValueError):
+        embedder.embed_documents(["text"])
+
+    assert embedder.stats()["retries"] == 0
+
+
+def test_transient_errors_are_found_in_the_chain():
+    try:
+        try:
+            raise RateLimited("quota")
+        except RateLimited as exc:
+            raise RuntimeError("embedding failed") from exc
+    except RuntimeError as exc:
+        assert is_transient_error(exc)
+    assert not is_transient_error(ValueError("bad input"))
+
+
+def test_token_bucket_throttles_past_capacity():
+    bucket = TokenBucket(rate_per_second=20, capacity=2)
+
+    start = time.monotonic()
+    waited = sum(bucket.acquire() for _ in range(4))
+
+    assert waited > 0
+    assert time.monotonic() - start >= 0.09
@@ -0,0 +1,128 @@
+"""BM25 ranks chunks sensibly, fusion merges the two rankings, and identifier queries skip the embedding."""
+import pytest  # type: ignore
+from langchain_core.embeddings import Embeddings  # type: ignore
+
+from app.core.config import settings
+from app.services import qa_engine, reranking
+from app.services.lexical_index import BM25Index, is_identifier, tokenize
+from app.services.retrieval import HybridRetriever, rrf_fuse
+
+from conftest import hashing_embedding
+
+CHUNKS = [
+    "Replace the filter cartridge every six months.",
+    "Part AB-12 is the replacement filter cartridge for the intake.",
+    "Clause 4.2.1 limits the warranty to manufacturing defects.",
+    "The pump runs quietly and draws little power.",
+]
+
+
+class SpyEmbeddings(Embeddings):
+    """Counts query embeddings; vectors come from the test embedding."""
+
+    def __init__(self):
+        self.queries = []
+
+    def embed_documents(self, texts):
+        return hashing_embedding.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return hashing_embedding.embed_query(text)
+
+
+@pytest.fixture
+def retriever(monkeypatch):
+    # Raw retrieval order, no reranking
+    monkeypatch.setattr(settings, "reranker", "")
+    monkeypatch.setattr(reranking, "_reranker", None)
+    docs = [qa_engine.Document(page_content=text, metadata={"n": i}) for i, text in enumerate(CHUNKS)]
+    vectorstore = qa_engine.build_vectorstore(docs, qa_engine.embed_chunks(docs))
+    vectorstore.embedding_function = SpyEmbeddings()
+    return HybridRetriever(vectorstore=vectorstore, lexical=BM25Index.build(CHUNKS), k=2)
+
+
+def test_tokens_keep_identifiers_whole_and_index_their_parts():
+    tokens = tokenize("What is part AB-12 under Clause 4.2.1?")
+
+    assert tokens == ["part", "ab-12", "ab", "12", "under", "clause", "4.2.1", "4", "2", "1"]
+    assert tokenize("ＡＢ－１２") == tokenize("ab-12")
+    assert all(map(is_identifier, ["ab-12", "4.2.1", "x200", "foo_bar"]))
+    assert not any(map(is_identifier, ["filter", "clause"]))
+
+
+def test_bm25_prefers_frequent_rare_terms_in_short_chunks():
+    index = BM25Index.build([
+        "filter cable cable cable",
+        "filter filter cable cable",
+        "filter cable",
+        "cable cable cable cable",
+        "gasket cable cable cable",
+    ])
+
+    # Higher term frequency at equal length, then shorter chunks at equal frequency
+    assert [i for i, _ in index.search("filter", k=10)] == [1, 2, 0]
+    # The rare term outweighs the common one
+    assert index.search("gasket cable", k=1)[0][0] == 4
+    assert [i for i, _ in index.search("filter", k=2)] == [1, 2]
+    assert index.search("nothing", k=5) == []
+    assert BM25Index.build([]).search("filter", k=5) == []
+
+
+def test_bm25_survives_a_save_and_load(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    path = str(tmp_path / "lexical.npz")
+    index.save(path)
+
+    loaded = BM25Index.load(path)
+
+    assert loaded.search("filter cartridge ab-12", k=4) == index.search("filter cartridge ab-12", k=4)
+    assert "4.2.1" in loaded and "gasket" not in loaded
+
+
+def test_rrf_rewards_ids_ranked_well_in_both_lists():
+    fused = rrf_fuse([["a", "b", "c"], ["c", "a", "d"]], k=10, rrf_k=60)
+
+    assert fused == ["a", "c", "b", "d"]
+    assert rrf_fuse([["a", "b", "c"], ["c", "a", "d"]], k=2) == ["a", "c"]
+
+
+def test_rrf_ties_keep_first_seen_order():
+    assert rrf_fuse([["a", "b"], ["b", "a"]], k=2) == ["a", "b"]
+    assert rrf_fuse([["x"], ["y"], ["z"]], k=3) == ["x", "y", "z"]
+    assert rrf_fuse([], k=3) == []
+
+
+def test_identifier_query_is_answered_without_embedding(retriever):
+    spy = retriever.vectorstore.embedding_function
+
+    assert retriever.is_lexical_query("part AB-12")
+    assert not retriever.needs_embedding("clause 4.2.1")
+    docs = retriever.retrieve("part AB-12")
+
+    assert docs[0].metadata["n"] == 1
+    assert spy.queries == []
+
+
+def test_other_queries_are_embedded_and_fused(retriever, monkeypatch):
+    spy = retriever.vectorstore.embedding_function
+    monkeypatch.setattr(settings, "lexical_only_max_terms", 3)
+
+    # Identifier the document lacks, too many other terms, plain words
+    for query in ("part ZZ-99", "does part AB-12 fit the intake pump housing", "how quiet is the pump"):
+        assert not retriever.is_lexical_query(query)
+        retriever.retrieve(query)
+
+    assert spy.queries == [
+        "part ZZ-99", "does part AB-12 fit the intake pump housing", "how quiet is the pump"
+    ]
+    assert retriever.retrieve("how quiet is the pump")[0].metadata["n"] == 3
+
+
+def test_vector_mode_never_takes_the_lexical_path(retriever, monkeypatch):
+    monkeypatch.setattr(settings, "retrieval_mode", "vector")
+
+    assert not retriever.is_lexical_query("part AB-12")
+    retriever.retrieve("part AB-12")
+
+    assert retriever.vectorstore.embedding_function.queries == ["part AB-12"]
@@ -0,0 +1,142 @@
+"""Approximate indexes keep most of exact search's recall; the index type follows the store size."""
+import time
+
+import faiss  # type: ignore
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+
+from app.core.config import settings
+from app.services.index_factory import (
+    INDEX_FLAT,
+    INDEX_HNSW,
+    INDEX_IVFPQ,
+    apply_search_params,
+    choose_index_params,
+    create_index,
+    describe_index,
+)
+
+DIM = 64
+K = 10
+
+
+def _vectors(count, seed=0, clusters=50):
+    """Clustered vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIM)).astype(np.float32)
+    points = centers[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, DIM))
+    return points.astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def data():
+    vectors = _vectors(8000)
+    queries = _vectors(100, seed=1)
+    exact = faiss.IndexFlatL2(DIM)
+    exact.add(vectors)
+    _, truth = exact.search(queries, K)
+    return vectors, queries, truth
+
+
+def _build(params, vectors):
+    index = create_index(DIM, params, vectors)
+    index.add(vectors)
+    return index
+
+
+def recall_at_k(index, queries, truth):
+    """Share of the exact top K found by index."""
+    _, found = index.search(queries, K)
+    return np.mean([len(set(f) & set(t)) / K for f, t in zip(found, truth)])
+
+
+def test_hnsw_recall_follows_the_target(data, monkeypatch):
+    vectors, queries, truth = data
+    monkeypatch.setattr(settings, "index_type", INDEX_HNSW)
+
+    recalls = {
+        target: recall_at_k(_build(choose_index_params(len(vectors), DIM, target), vectors), queries, truth)
+        for target in ("memory", "balanced", "recall")
+    }
+
+    assert recalls["memory"] < recalls["balanced"] < recalls["recall"]
+    assert recalls["recall"] >= 0.95
+    assert recalls["balanced"] >= 0.85
+    assert recalls["memory"] >= 0.7
+
+
+def test_ivfpq_recall_grows_with_code_size(data, monkeypatch):
+    vectors, queries, truth = data
+    monkeypatch.setattr(settings, "index_type", INDEX_IVFPQ)
+
+    recalls = {
+        target: recall_at_k(_build(choose_index_params(len(vectors), DIM, target), vectors), queries, truth)
+        for target in ("memory", "balanced", "recall")
+    }
+
+    assert recalls["memory"] < recalls["balanced"] < recalls["recall"]
+    assert recalls["recall"] >= 0.8
+
+
+def test_flat_is_exact(data):
+    vectors, queries, truth = data
+
+    assert recall_at_k(_build({"type": INDEX_FLAT}, vectors), queries, truth) == 1.0
+
+
+def test_index_type_follows_the_vector_count(monkeypatch):
+    monkeypatch.setattr(settings, "index_type", "auto")
+    monkeypatch.setattr(settings, "index_flat_max_vectors", 1000)
+    monkeypatch.setattr(settings, "index_hnsw_max_vectors", 100_000)
+
+    assert choose_index_params(1000, DIM, "balanced")["type"] == INDEX_FLAT
+    assert choose_index_params(1001, DIM, "balanced")["type"] == INDEX_HNSW
+    assert choose_index_params(100_001, DIM, "balanced")["type"] == INDEX_IVFPQ
+    assert choose_index_params(4000, DIM, "recall")["type"] == INDEX_FLAT
+    assert choose_index_params(10_000_000, DIM, "recall")["type"] == INDEX_HNSW
+    assert choose_index_params(5000, DIM, "memory")["type"] == INDEX_IVFPQ
+    # Too few vectors to train IVF-PQ
+    assert choose_index_params(500, DIM, "memory")["type"] == INDEX_FLAT
+    with pytest.raises(ValueError):
+        choose_index_params(10, DIM, "fast")
+
+
+def test_ivfpq_parameters_fit_the_data(monkeypatch):
+    monkeypatch.setattr(settings, "index_type", INDEX_IVFPQ)
+
+    params = choose_index_params(8000, 768, "balanced")
+
+    assert 768 % params["m"] == 0 and params["m"] <= 768 // 4
+    assert 8000 // params["nlist"] >= 39
+    assert params["nprobe"] <= params["nlist"]
+
+
+def test_search_params_are_described_and_reapplied(data, monkeypatch):
+    vectors, _, _ = data
+    monkeypatch.setattr(settings, "index_type", INDEX_IVFPQ)
+    params = choose_index_params(len(vectors), DIM, "balanced")
+    index = _build(params, vectors)
+
+    loaded = faiss.deserialize_index(faiss.serialize_index(index))
+    apply_search_params(loaded, params)
+
+    assert describe_index(loaded) == params
+
+
+@pytest.mark.benchmark
+def test_index_benchmark(data, monkeypatch):
+    """Build and search times per index type; only recall is checked."""
+    vectors, queries, truth = data
+    rows = []
+    for kind in (INDEX_FLAT, INDEX_HNSW, INDEX_IVFPQ):
+        monkeypatch.setattr(settings, "index_type", kind)
+        params = choose_index_params(len(vectors), DIM, "balanced")
+        started = time.perf_counter()
+        index = _build(params, vectors)
+        built = time.perf_counter() - started
+        started = time.perf_counter()
+        recall = recall_at_k(index, queries, truth)
+        searched = time.perf_counter() - started
+        rows.append(f"{kind} build {built * 1000:.0f} ms, {len(queries)} searches {searched * 1000:.1f} ms, recall@{K} {recall:.3f}")
+        assert recall > 0.5
+    print(f"\n{len(vectors)} vectors of dimension {DIM}:\n" + "\n".join(rows))
@@ -0,0 +1,122 @@
+"""Persisted vector stores answer exactly like the in-memory store they came from."""
+import json
+import os
+
+import faiss  # type: ignore
+import pytest  # type: ignore
+
+from app.services import index_store, qa_engine
+from app.services.index_factory import INDEX_HNSW, create_index
+from app.services.lexical_index import BM25Index
+
+TOPICS = ["invoice", "warranty", "shipping", "battery", "firmware", "refund", "sensor", "calibration"]
+QUERIES = [
+    "how long is the warranty",
+    "battery replacement steps",
+    "firmware update failed",
+    "refund for a late shipping invoice",
+    "sensor calibration interval",
+]
+
+
+def _chunks(count=120):
+    return [
+        f"Section {i}: the {TOPICS[i % len(TOPICS)]} policy covers {TOPICS[(i * 3) % len(TOPICS)]} "
+        f"and {TOPICS[(i * 5 + 1) % len(TOPICS)]} for model {i}."
+        for i in range(count)
+    ]
+
+
+def _store(texts):
+    docs = [qa_engine.Document(page_content=t, metadata={"doc_id": "doc", "chunk": i}) for i, t in enumerate(texts)]
+    return qa_engine.build_vectorstore(docs, qa_engine.embed_chunks(docs))
+
+
+def _top_k(vectorstore, query, k=5):
+    hits = vectorstore.similarity_search_with_score(query, k=k)
+    return [(doc.page_content, doc.metadata, round(float(score), 5)) for doc, score in hits]
+
+
+def test_reload_returns_same_top_k():
+    vectorstore = _store(_chunks())
+    index_store.save_vectorstore(vectorstore, "reload-doc")
+
+    loaded = index_store.load_vectorstore("reload-doc", qa_engine.embedding)
+
+    assert loaded.index.ntotal == vectorstore.index.ntotal
+    for query in QUERIES:
+        assert _top_k(loaded, query) == _top_k(vectorstore, query)
+
+
+def test_chunks_are_read_on_first_search():
+    index_store.save_vectorstore(_store(_chunks(20)), "lazy-doc")
+
+    loaded = index_store.load_vectorstore("lazy-doc", qa_engine.embedding)
+    assert not loaded.docstore.loaded
+
+    loaded.similarity_search(QUERIES[0], k=2)
+    assert loaded.docstore.loaded
+
+
+def test_hnsw_search_params_survive_reload():
+    texts = _chunks(60)
+    docs = [qa_engine.Document(page_content=t, metadata={}) for t in texts]
+    vectors = qa_engine.embed_chunks(docs)
+    params = {"type": INDEX_HNSW, "M": 16, "ef_construction": 40, "ef_search": 77}
+    vectorstore = qa_engine.FAISS(
+        embedding_function=qa_engine.embedding,
+        index=create_index(len(vectors[0]), params),
+        docstore=qa_engine.InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    vectorstore.add_embeddings(list(zip(texts, vectors)))
+    index_store.save_vectorstore(vectorstore, "hnsw-doc", index_params=params)
+
+    loaded = index_store.load_vectorstore("hnsw-doc", qa_engine.embedding)
+
+    assert index_store.read_manifest("hnsw-doc")["index_params"] == params
+    assert faiss.downcast_index(loaded.index).hnsw.efSearch == 77
+    for query in QUERIES:
+        assert _top_k(loaded, query) == _top_k(vectorstore, query)
+
+
+def test_lexical_index_round_trip():
+    texts = _chunks(30)
+    index_store.save_vectorstore(_store(texts), "bm25-doc", lexical_index=BM25Index.build(texts))
+
+    lexical = index_store.load_lexical_index("bm25-doc")
+
+    assert lexical is not None
+    assert index_store.read_manifest("bm25-doc")["lexical"] is True
+
+
+def test_unknown_format_version_is_rejected():
+    index_store.save_vectorstore(_store(_chunks(10)), "old-doc")
+    path = os.path.join(index_store.doc_index_path("old-doc"), index_store.MANIFEST_FILE)
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest["format_version"] = index_store.FORMAT_VERSION + 1
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ValueError):
+        index_store.load_vectorstore("old-doc", qa_engine.embedding)
+
+
+def test_evicted_chain_is_reloaded_from_disk():
+    vectorstore = _store(_chunks(40))
+    qa_engine.persist_vectorstore(vectorstore, "cached-doc")
+    before = qa_engine.load_index("cached-doc").retriever.retrieve(QUERIES[1])
+
+    qa_engine.doc_qa_map.pop("cached-doc")
+    after = qa_engine.load_index("cached-doc").retriever.retrieve(QUERIES[1])
+
+    assert [d.page_content for d in after] == [d.page_content for d in before]
+
+
+def test_delete_removes_the_store():
+    index_store.save_vectorstore(_store(_chunks(10)), "gone-doc")
+    index_store.delete_vectorstore("gone-doc")
+
+    assert not index_store.has_vectorstore("gone-doc")
+    assert index_store.load_vectorstore("gone-doc", qa_engine.embedding) is None
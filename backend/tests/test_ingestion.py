@@ -0,0 +1,119 @@
+"""Background ingestion, including documents deleted while their job is queued or running."""
+import os
+
+from app.core.config import settings
+from app.services import index_store, ingestion, qa_engine, text_store
+from app.services.collection_search import registry as collection_registry
+
+from conftest import drain_cleanup, login, s3_deletes, s3_uploads, spooled_files, upload
+
+
+def test_upload_is_indexed_and_joins_the_collection(client, make_pdf):
+    login(client, "alice")
+    collection_registry.shards("alice")
+
+    body, job = upload(client, "alice", make_pdf(["Invoices are due in thirty days.", "Late fees apply."]))
+
+    assert job["status"] == ingestion.STATUS_READY
+    assert job["progress"] == 100
+    key = body["document"]["filename"]
+    assert index_store.has_vectorstore(key)
+    assert collection_registry.shards("alice") == {body["job_id"]: key}
+    assert spooled_files() == []
+
+
+def test_delete_while_queued_removes_the_spooled_file(client, make_pdf, held_ingestion):
+    login(client, "alice")
+    body, _ = upload(client, "alice", make_pdf(["Queued text."]), wait=False)
+
+    assert client.delete("/docs/", params={"user_id": "alice", "id": body["job_id"]}).status_code == 204
+    held_ingestion.run_all()
+    drain_cleanup()
+
+    assert spooled_files() == []
+    assert not index_store.has_vectorstore(body["document"]["filename"])
+    assert s3_uploads == []
+
+
+def test_delete_during_ingestion_cleans_up_what_the_job_stored(client, make_pdf, held_ingestion, monkeypatch):
+    login(client, "alice")
+    collection_registry.shards("alice")
+    body, _ = upload(client, "alice", make_pdf(["Text indexed while the document is deleted."]), wait=False)
+    key = body["document"]["filename"]
+    persist = qa_engine.persist_vectorstore
+
+    def persist_then_delete(vectorstore, doc_id):
+        persist(vectorstore, doc_id)
+        client.delete("/docs/", params={"user_id": "alice", "id": body["job_id"]})
+        drain_cleanup()
+
+    monkeypatch.setattr(qa_engine, "persist_vectorstore", persist_then_delete)
+    held_ingestion.run_all()
+    drain_cleanup()
+
+    assert not index_store.has_vectorstore(key)
+    assert key not in qa_engine.doc_qa_map
+    assert s3_deletes == [f"https://test-bucket.s3.amazonaws.com/{s3_uploads[0]}"]
+    assert not os.path.exists(os.path.join(settings.text_store_dir, f"{key}.txt.gz"))
+    assert collection_registry.shards("alice") == {}
+
+
+def test_delete_mid_extraction_stops_the_job(client, make_pdf, held_ingestion, monkeypatch):
+    login(client, "alice")
+    body, _ = upload(client, "alice", make_pdf([f"Page {i} text." for i in range(30)]), wait=False)
+    calls = []
+    build = qa_engine.build_vectorstore
+    monkeypatch.setattr(qa_engine, "build_vectorstore", lambda *a: calls.append(a) or build(*a))
+    enter_stage = ingestion._enter_stage
+
+    def delete_before_embedding(document_id, stage):
+        if stage == "embedding":
+            client.delete("/docs/", params={"user_id": "alice", "id": document_id})
+        enter_stage(document_id, stage)
+
+    monkeypatch.setattr(ingestion, "_enter_stage", delete_before_embedding)
+    held_ingestion.run_all()
+    drain_cleanup()
+
+    assert calls == []
+    assert len(s3_deletes) == 1
+    assert not index_store.has_vectorstore(body["document"]["filename"])
+
+
+def test_failed_job_removes_what_it_stored(client, make_pdf, held_ingestion, monkeypatch):
+    login(client, "alice")
+    body, _ = upload(client, "alice", make_pdf(["Text indexed before the job fails."]), wait=False)
+    key = body["document"]["filename"]
+
+    def broken_save(doc_id, text):
+        raise OSError("text store unavailable")
+
+    monkeypatch.setattr(text_store, "save_text", broken_save)
+    held_ingestion.run_all()
+    drain_cleanup()
+    job = client.get(f"/upload/jobs/{body['job_id']}").json()
+
+    assert job["status"] == ingestion.STATUS_FAILED
+    assert "text store unavailable" in job["error"]
+    assert job["file_url"] is None
+    assert not index_store.has_vectorstore(key)
+    assert key not in qa_engine.doc_qa_map
+    assert s3_deletes == [f"https://test-bucket.s3.amazonaws.com/{s3_uploads[0]}"]
+    assert spooled_files() == []
+
+
+def test_source_is_recorded_once_uploaded(client, make_pdf, held_ingestion, monkeypatch):
+    login(client, "alice")
+    body, _ = upload(client, "alice", make_pdf(["Text."]), wait=False)
+    sources = []
+    enter_stage = ingestion._enter_stage
+
+    def record_source(document_id, stage):
+        if stage == "embedding":
+            sources.append(client.get(f"/upload/jobs/{document_id}").json()["file_url"])
+        enter_stage(document_id, stage)
+
+    monkeypatch.setattr(ingestion, "_enter_stage", record_source)
+    held_ingestion.run_all()
+
+    assert sources == [f"https://test-bucket.s3.amazonaws.com/{s3_uploads[0]}"]
@@ -0,0 +1,106 @@
+"""Keyset pagination: unpaged by default, stable and complete when paged."""
+import pytest  # type: ignore
+
+from app.services.pagination import decode_cursor, encode_cursor
+
+from conftest import seed_documents
+
+
+def _walk(client, url, limit, key=lambda item: item["id"]):
+    items, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        items.extend(key(item) for item in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items, pages
+
+
+def test_conversation_is_returned_whole_without_limit_or_cursor(client):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=130)
+
+    response = client.get(f"/ask/conversations/{session_id}")
+
+    assert len(response.json()) == 130
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_conversation_pages_cover_every_message_once(client):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=130)
+    everything = [m["id"] for m in client.get(f"/ask/conversations/{session_id}").json()]
+
+    paged, pages = _walk(client, f"/ask/conversations/{session_id}", limit=40)
+
+    assert paged == everything
+    assert pages == 4
+
+
+def test_since_returns_only_newer_messages(client):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=10)
+    messages = client.get(f"/ask/conversations/{session_id}").json()
+
+    newer = client.get(f"/ask/conversations/{session_id}", params={"since": messages[5]["id"]}).json()
+
+    assert [m["id"] for m in newer] == [m["id"] for m in messages[6:]]
+
+
+def test_user_documents_unpaged_and_paged(client):
+    seed_documents("alice", 75)
+
+    everything = client.get("/docs/user/alice").json()
+    paged, _ = _walk(client, "/docs/user/alice", limit=20)
+
+    assert len(everything) == 75
+    assert paged == [d["id"] for d in everything]
+    assert everything[0]["upload_time"] > everything[-1]["upload_time"]
+
+
+def test_login_returns_all_sessions_unless_paged(client):
+    seed_documents("alice", 60)
+    user = {"sub": "alice", "email": "alice@example.com"}
+
+    body = client.post("/users/auth/google", json=user).json()
+    assert len(body["sessions"]) == 60
+    assert body["next_cursor"] is None
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 25, **({"cursor": cursor} if cursor else {})}
+        page = client.post("/users/auth/google", json=user, params=params).json()
+        seen.extend(s["session_id"] for s in page["sessions"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [s["session_id"] for s in body["sessions"]]
+
+
+def test_cursor_alone_uses_the_default_page_size(client, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "page_size_default", 7)
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=30)
+    first = client.get(f"/ask/conversations/{session_id}", params={"limit": 3})
+
+    second = client.get(f"/ask/conversations/{session_id}", params={"cursor": first.headers["X-Next-Cursor"]})
+
+    assert len(second.json()) == 7
+
+
+def test_invalid_cursor_is_rejected(client):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=3)
+
+    assert client.get(f"/ask/conversations/{session_id}", params={"cursor": "not-a-cursor"}).status_code == 400
+    with pytest.raises(ValueError):
+        decode_cursor("bm90LWpzb24")
+
+
+def test_cursor_round_trip():
+    from datetime import datetime
+
+    position = (datetime(2024, 5, 1, 12, 30, 15, 123456), 42)
+    assert decode_cursor(encode_cursor(position)) == position
@@ -0,0 +1,122 @@
+"""Conversation exports are cached under their ETag until the conversation or its document changes."""
+from datetime import datetime
+
+import pytest  # type: ignore
+
+from app.api import routes_pdf
+from app.db.models import ChatMessage, Document
+from app.db.session import SessionLocal
+from app.services.pdf_export import etag_matches
+
+from conftest import seed_documents
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Arguments of each render; the PDF bytes name the render."""
+    calls = []
+
+    async def render(session_data, messages, document_info):
+        calls.append((session_data, messages, document_info))
+        return f"%PDF render {len(calls)}".encode()
+
+    monkeypatch.setattr(routes_pdf, "render_conversation_pdf", render)
+    return calls
+
+
+def _export(client, session_id, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(f"/pdf/conversation/{session_id}", headers=headers)
+
+
+def _add_message(session_id, content):
+    db = SessionLocal()
+    try:
+        db.add(ChatMessage(session_id=session_id, role="user", content=content, timestamp=datetime(2024, 3, 1)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _update_document(doc_id, **fields):
+    db = SessionLocal()
+    try:
+        db.query(Document).filter(Document.id == doc_id).update(fields)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_matching_if_none_match_gets_304(client, renders):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=4)
+    first = _export(client, session_id)
+    etag = first.headers["ETag"]
+
+    response = _export(client, session_id, etag)
+
+    assert first.status_code == 200 and first.headers["Content-Type"] == "application/pdf"
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    assert _export(client, session_id, f'W/{etag}, "other"').status_code == 304
+    assert _export(client, session_id, '"other"').status_code == 200
+    assert len(renders) == 1
+
+
+def test_repeat_export_is_served_from_the_cache(client, renders):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=4)
+
+    first = _export(client, session_id)
+    second = _export(client, session_id)
+
+    assert second.status_code == 200
+    assert second.content == first.content == b"%PDF render 1"
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert len(renders) == 1
+    assert len(renders[0][1]) == 4
+
+
+def test_new_message_changes_the_etag(client, renders):
+    [(_, session_id)] = seed_documents("alice", 1, messages_per_session=4)
+    etag = _export(client, session_id).headers["ETag"]
+
+    _add_message(session_id, "One more question")
+    response = _export(client, session_id, etag)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.content == b"%PDF render 2"
+    assert renders[-1][1][-1]["content"] == "One more question"
+
+
+@pytest.mark.parametrize("fields", [
+    {"filename": "renamed.pdf"},
+    {"upload_time": datetime(2025, 1, 1)},
+    {"source": "https://test-bucket.s3.amazonaws.com/pdfs/moved.pdf"},
+])
+def test_document_changes_change_the_etag(client, renders, fields):
+    [(doc_id, session_id)] = seed_documents("alice", 1, messages_per_session=2)
+    etag = _export(client, session_id).headers["ETag"]
+
+    _update_document(doc_id, **fields)
+    response = _export(client, session_id, etag)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(renders) == 2
+
+
+def test_sessions_do_not_share_exports(client, renders):
+    (_, first), (_, second) = seed_documents("alice", 2, messages_per_session=2)
+
+    assert _export(client, first).headers["ETag"] != _export(client, second).headers["ETag"]
+    assert len(renders) == 2
+    assert _export(client, 10_000).status_code == 404
+
+
+def test_etag_matching():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert not etag_matches(None, '"b"')
+    assert not etag_matches('"a"', '"b"')
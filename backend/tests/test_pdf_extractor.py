@@ -0,0 +1,80 @@
+"""Parallel extraction yields exactly what a sequential pass over the PDF does."""
+import os
+import time
+
+import fitz  # type: ignore
+import pytest  # type: ignore
+
+from app.core.config import settings
+from app.services import pdf_extractor
+
+from conftest import write_pdf
+
+
+def _pages(count):
+    return [
+        f"Chapter {i}\n\n" + " ".join(f"word{i}-{j}" for j in range(120)) + f"\n\nEnd of page {i}."
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr(settings, "extract_workers", 2)
+    monkeypatch.setattr(settings, "extract_parallel_min_pages", 8)
+
+
+@pytest.fixture(scope="module")
+def long_pdf(tmp_path_factory):
+    return write_pdf(tmp_path_factory.mktemp("pdfs") / "long.pdf", _pages(60))
+
+
+def _sequential_text(path):
+    with fitz.open(str(path)) as doc:
+        return [(i + 1, page.get_text()) for i, page in enumerate(doc)]
+
+
+def test_small_documents_are_extracted_inline(monkeypatch, make_pdf):
+    monkeypatch.setattr(pdf_extractor, "_get_pool", lambda: pytest.fail("pool used"))
+    path = make_pdf(_pages(3))
+
+    assert list(pdf_extractor.iter_pages(path)) == _sequential_text(path)
+
+
+def test_parallel_pages_match_sequential_extraction(parallel, long_pdf):
+    assert list(pdf_extractor.iter_pages(long_pdf)) == _sequential_text(long_pdf)
+
+
+def test_parallel_blocks_match_inline_blocks(parallel, long_pdf):
+    inline = pdf_extractor._extract_blocks_range(str(long_pdf), 0, pdf_extractor.page_count(long_pdf))
+
+    streamed = list(pdf_extractor.iter_page_blocks(long_pdf))
+
+    assert streamed == inline
+    assert [number for number, _ in streamed] == list(range(1, 61))
+    assert streamed[0][1][0][0] == "Chapter 0"
+
+
+@pytest.mark.benchmark
+def test_extraction_benchmark(monkeypatch, tmp_path):
+    """Speedup depends on the cores available; only the output is checked."""
+    path = write_pdf(tmp_path / "bench.pdf", _pages(240))
+    warm = write_pdf(tmp_path / "warm.pdf", _pages(40))
+    monkeypatch.setattr(settings, "extract_parallel_min_pages", 16)
+
+    timings = {}
+    for workers in (1, 2, 4):
+        monkeypatch.setattr(settings, "extract_workers", workers)
+        # A pool of this size, with its processes already started
+        monkeypatch.setattr(pdf_extractor, "_pool", None)
+        list(pdf_extractor.iter_pages(warm))
+        started = time.perf_counter()
+        pages = list(pdf_extractor.iter_page_blocks(path))
+        timings[workers] = time.perf_counter() - started
+        if pdf_extractor._pool is not None:
+            pdf_extractor._pool.shutdown()
+        assert len(pages) == 240
+    print(
+        f"\nblock extraction, 240 pages, {os.cpu_count()} cpus: "
+        + ", ".join(f"{w} workers {t * 1000:.0f} ms" for w, t in timings.items())
+    )
@@ -0,0 +1,143 @@
+"""
+Hot queries use the composite indexes: the statements the app actually sends
+are captured and checked with EXPLAIN QUERY PLAN over seeded tables.
+"""
+import contextlib
+import re
+
+import pytest  # type: ignore
+from sqlalchemy import event, text  # type: ignore
+
+from app.core.config import settings
+from app.db.session import async_engine, engine
+
+from conftest import drain_cleanup, seed_documents
+
+HOT_TABLES = ("chat_messages", "chat_sessions", "documents")
+
+
+@pytest.fixture
+def seeded():
+    """Three users with 30 documents each, 20 messages per conversation; planner statistics gathered."""
+    created = {user: seed_documents(user, 30, messages_per_session=20) for user in ("alice", "bob", "carol")}
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    return created
+
+
+@contextlib.contextmanager
+def captured():
+    """Collect (statement, parameters) of every query on both engines."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", record)
+
+
+def query_plan(statement, parameters):
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters or ())).all()
+    return [row[-1] for row in rows]
+
+
+def hot_plans(statements):
+    """Plans of the reads and deletes touching the hot tables."""
+    plans = []
+    for statement, parameters in statements:
+        if not re.match(r"\s*(SELECT|DELETE)", statement, re.IGNORECASE):
+            continue
+        if any(re.search(rf"\b{table}\b", statement) for table in HOT_TABLES):
+            plans.append((statement, query_plan(statement, parameters)))
+    return plans
+
+
+def assert_no_table_scans(plans):
+    for statement, plan in plans:
+        for step in plan:
+            # A full scan reads "SCAN <table>" with no index named
+            assert not (step.startswith("SCAN") and "INDEX" not in step), f"{step}\n{statement}"
+
+
+def used_indexes(plans):
+    return {name for _, plan in plans for step in plan for name in re.findall(r"INDEX (\w+)", step)}
+
+
+def test_login_lists_sessions_by_user_and_start_time(client, seeded):
+    with captured() as statements:
+        client.post("/users/auth/google", json={"sub": "alice", "email": "alice@example.com"})
+        client.post("/users/auth/google?limit=10", json={"sub": "alice", "email": "alice@example.com"})
+    plans = hot_plans(statements)
+
+    assert_no_table_scans(plans)
+    assert "ix_chat_sessions_user_id_started_at" in used_indexes(plans)
+
+
+def test_document_list_and_lookup_use_user_indexes(client, seeded):
+    with captured() as statements:
+        client.get("/docs/user/alice")
+        client.get("/docs/user/alice?limit=10")
+    listing = hot_plans(statements)
+    with captured() as statements:
+        client.get("/docs/", params={"user_id": "alice", "filename": "alice-doc-3"})
+    lookup = hot_plans(statements)
+
+    assert_no_table_scans(listing + lookup)
+    assert "ix_documents_user_id_upload_time" in used_indexes(listing)
+    assert "ix_documents_user_id_filename" in used_indexes(lookup)
+
+
+def test_conversation_reads_use_session_and_timestamp(client, seeded):
+    _, session_id = seeded["bob"][5]
+    with captured() as statements:
+        client.get(f"/ask/conversations/{session_id}")
+        client.get(f"/ask/conversations/{session_id}?limit=5")
+    plans = hot_plans(statements)
+
+    assert_no_table_scans(plans)
+    assert "ix_chat_messages_session_id_timestamp" in used_indexes(plans)
+
+
+def test_history_fold_and_recent_load_use_session_and_id(client, seeded, scripted_llm):
+    # Well past the verbatim window, so the question folds a summary first
+    [(_, session_id)] = seed_documents("dave", 1, messages_per_session=2 * settings.history_max_turns + 30)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    with captured() as statements:
+        client.post("/ask/", json={"session_id": session_id, "question": "What is new?"})
+    history = [
+        (statement, plan) for statement, plan in hot_plans(statements)
+        if re.search(r"FROM chat_messages\b", statement)
+    ]
+
+    assert any("New messages:" in prompt for prompt in scripted_llm.prompts)
+    # Count, fold (oldest first) and recent load (newest first)
+    assert len(history) >= 3
+    assert any(re.search(r"ORDER BY chat_messages.id\s+LIMIT", s) for s, _ in history)
+    assert any("ORDER BY chat_messages.id DESC" in s for s, _ in history)
+    for statement, plan in history:
+        assert not any(step.startswith("SCAN") or "TEMP B-TREE" in step for step in plan), f"{plan}\n{statement}"
+        # Either session index answers the count; the id order needs (session_id, id)
+        index = "ix_chat_messages_session_id_id" if "ORDER BY" in statement else "ix_chat_messages_session_id_"
+        assert any(index in step for step in plan), f"{plan}\n{statement}"
+
+
+def test_delete_and_reference_count_use_indexes(client, seeded):
+    doc_id, _ = seeded["carol"][7]
+    with captured() as statements:
+        response = client.delete("/docs/", params={"user_id": "carol", "id": doc_id})
+        drain_cleanup()
+    plans = hot_plans(statements)
+
+    assert response.status_code == 204
+    assert_no_table_scans(plans)
+    assert {"ix_chat_sessions_document_id", "ix_documents_filename"} <= used_indexes(plans)
@@ -0,0 +1,152 @@
+"""Documents left mid-ingestion by a restart are requeued or marked failed."""
+import fcntl
+import os
+import shutil
+import socket
+import time
+import uuid
+
+from app.core.config import settings
+from app.db.models.document import Document
+from app.db.models.users import User
+from app.db.session import SessionLocal
+from app.services import ingestion
+
+from conftest import drain_cleanup, login, s3_deletes, spooled_files, upload, wait_for_job
+
+
+def _add_document(index_key, status, source=None, owner=None):
+    db = SessionLocal()
+    try:
+        doc = Document(
+            filename=index_key, user_id="alice", status=status, progress=40, source=source, ingestion_owner=owner
+        )
+        db.add(doc)
+        db.commit()
+        return doc.id
+    finally:
+        db.close()
+
+
+def _sibling(alive):
+    """Owner id of another process on this host, holding its lock file if alive."""
+    token = uuid.uuid4().hex
+    path = ingestion._owner_lock_path(token)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock_file = open(path, "a")
+    if alive:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        lock_file.close()
+    return f"{socket.gethostname()}:{token}", lock_file, path
+
+
+def _status(document_id):
+    db = SessionLocal()
+    try:
+        return db.get(Document, document_id).status
+    finally:
+        db.close()
+
+
+def _spool(make_pdf, index_key, age=0.0):
+    path = os.path.join(settings.upload_dir, f"{index_key}_report.pdf")
+    shutil.copy(make_pdf(["Recovered text about turbines."]), path)
+    if age:
+        os.utime(path, (time.time() - age, time.time() - age))
+    return path
+
+
+def test_interrupted_documents_are_requeued_or_failed(client, make_pdf):
+    login(client, "alice")
+    resumable = _add_document("resumable", "embedding")
+    _spool(make_pdf, "resumable", age=60)
+    lost = _add_document("lost", "embedding", source="https://test-bucket.s3.amazonaws.com/pdfs/lost.pdf")
+    done = _add_document("done", ingestion.STATUS_READY)
+    orphan = _spool(make_pdf, "orphan", age=60)
+
+    counts = ingestion.recover_interrupted_jobs()
+
+    assert counts == {"requeued": 1, "failed": 1, "removed_files": 1}
+    assert wait_for_job(client, resumable)["status"] == ingestion.STATUS_READY
+    failed = client.get(f"/upload/jobs/{lost}").json()
+    assert failed["status"] == ingestion.STATUS_FAILED
+    assert "upload the file again" in failed["error"]
+    drain_cleanup()
+    assert s3_deletes == ["https://test-bucket.s3.amazonaws.com/pdfs/lost.pdf"]
+    assert client.get(f"/upload/jobs/{done}").json()["status"] == ingestion.STATUS_READY
+    assert not os.path.exists(orphan)
+    assert spooled_files() == []
+
+
+def test_files_of_uploads_in_flight_are_kept(client, make_pdf):
+    login(client, "alice")
+    # Still being written by another worker process
+    in_flight = _spool(make_pdf, "in-flight", age=-5)
+
+    assert ingestion.recover_interrupted_jobs()["removed_files"] == 0
+    assert os.path.exists(in_flight)
+    os.remove(in_flight)
+
+
+def test_other_backends_keep_their_own_jobs(client, held_ingestion):
+    login(client, "alice")
+    queued = _add_document("elsewhere", "queued")
+
+    assert ingestion.recover_interrupted_jobs() == {"requeued": 0, "failed": 0, "removed_files": 0}
+    assert client.get(f"/upload/jobs/{queued}").json()["status"] == "queued"
+
+
+def test_documents_of_a_running_sibling_are_left_alone(client, make_pdf):
+    login(client, "alice")
+    owner, lock_file, _ = _sibling(alive=True)
+    busy = _add_document("busy", "embedding", owner=owner)
+    spooled = _spool(make_pdf, "busy", age=60)
+    queued = _add_document("queued-there", "queued", owner=owner)
+
+    counts = ingestion.recover_interrupted_jobs()
+    lock_file.close()
+
+    assert counts == {"requeued": 0, "failed": 0, "removed_files": 0}
+    assert (_status(busy), _status(queued)) == ("embedding", "queued")
+    assert os.path.exists(spooled)
+    os.remove(spooled)
+
+
+def test_documents_of_an_exited_sibling_are_taken_over(client, make_pdf):
+    login(client, "alice")
+    owner, _, lock_path = _sibling(alive=False)
+    resumable = _add_document("resumable", "embedding", owner=owner)
+    _spool(make_pdf, "resumable", age=60)
+
+    assert ingestion.recover_interrupted_jobs()["requeued"] == 1
+    assert wait_for_job(client, resumable)["status"] == ingestion.STATUS_READY
+    assert not lock_path.exists()
+
+
+def test_other_hosts_recover_their_own_documents(client):
+    login(client, "alice")
+    remote = _add_document("remote", "embedding", owner=f"other-host:{uuid.uuid4().hex}")
+
+    assert ingestion.recover_interrupted_jobs()["failed"] == 0
+    assert _status(remote) == "embedding"
+
+
+def test_this_process_keeps_its_own_jobs(client, make_pdf, held_ingestion, monkeypatch):
+    login(client, "alice")
+    body, _ = upload(client, "alice", make_pdf(["Queued here."]), wait=False)
+    monkeypatch.setattr(ingestion, "get_ingestion_backend", lambda: ingestion.ThreadPoolBackend(1, 1))
+
+    assert ingestion.recover_interrupted_jobs() == {"requeued": 0, "failed": 0, "removed_files": 0}
+    assert held_ingestion.pending() == 1
+    held_ingestion.run_all()
+
+
+def test_a_document_is_claimed_once():
+    owner, _, _ = _sibling(alive=False)
+    document_id = _add_document("contested", "embedding", owner=owner)
+
+    assert ingestion._claim_document(document_id, owner)
+    # A second process read the same owner before the first claim
+    assert not ingestion._claim_document(document_id, owner)
+    assert _status(document_id) == ingestion.STATUS_QUEUED
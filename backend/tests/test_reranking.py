@@ -0,0 +1,130 @@
+"""The reranker orders over-fetched chunks within its time budget and reports what it kept out of the prompt."""
+import time
+
+import pytest  # type: ignore
+
+from app.core.config import settings
+from app.services import qa_engine, reranking
+from app.services.reranking import (
+    LexicalOverlapReranker,
+    NoopReranker,
+    Reranker,
+    RerankStats,
+    rerank,
+)
+
+
+def _docs(*texts):
+    return [qa_engine.Document(page_content=text, metadata={"n": i}) for i, text in enumerate(texts)]
+
+
+class SlowReverseReranker(Reranker):
+    """Prefers later chunks and takes delay seconds per batch of one."""
+
+    batch_size = 1
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.scored = []
+
+    def score(self, query, docs):
+        time.sleep(self.delay)
+        self.scored.extend(d.metadata["n"] for d in docs)
+        return [float(d.metadata["n"]) for d in docs]
+
+
+@pytest.fixture
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(reranking, "stats", RerankStats())
+    return reranking.stats
+
+
+def test_reranker_is_abstract():
+    with pytest.raises(TypeError):
+        Reranker()
+
+
+def test_unscored_candidates_keep_retrieval_order(fresh_stats):
+    docs = _docs(*(f"chunk {i}" for i in range(6)))
+    reranker = SlowReverseReranker(delay=0.1)
+
+    kept = rerank(reranker, "query", docs, top_n=6, budget_ms=150)
+
+    # The first batch is always scored; the budget runs out after the second
+    assert reranker.scored == [0, 1]
+    assert [d.metadata["n"] for d in kept] == [1, 0, 2, 3, 4, 5]
+    assert fresh_stats.snapshot()["over_budget"] == 1
+
+
+def test_within_budget_every_candidate_is_scored(fresh_stats):
+    docs = _docs(*(f"chunk {i}" for i in range(6)))
+
+    kept = rerank(SlowReverseReranker(delay=0), "query", docs, top_n=3, budget_ms=1000)
+
+    assert [d.metadata["n"] for d in kept] == [5, 4, 3]
+    assert fresh_stats.snapshot()["over_budget"] == 0
+
+
+def test_lexical_scorer_ranks_by_term_overlap():
+    docs = _docs(
+        "Shipping takes five business days.",
+        "Press the button on the back, then reset the router.",
+        "Error E-1042 means the fan stalled; reset the controller.",
+        "Hold the reset button for ten seconds to restore defaults.",
+    )
+
+    kept = rerank(LexicalOverlapReranker(), "What does error E-1042 mean?", docs, top_n=2, budget_ms=1000)
+    assert kept[0].metadata["n"] == 2
+
+    # Both mention "reset" and "button"; only the last has them adjacent, as in the query
+    kept = rerank(LexicalOverlapReranker(), "reset button", docs, top_n=3, budget_ms=1000)
+    assert [d.metadata["n"] for d in kept] == [3, 1, 2]
+
+
+def test_lexical_scorer_weighs_identifiers_and_pairs():
+    scorer = LexicalOverlapReranker()
+    identifier, word, pair, neither = scorer.score(
+        "calibrate sensor E1042",
+        _docs(
+            "The E1042 ships assembled.",
+            "Calibrate every month.",
+            "Calibrate sensor modules monthly.",
+            "Nothing relevant here.",
+        ),
+    )
+
+    # An identifier counts twice as much as a word; an adjacent query pair adds a bonus
+    assert identifier == pytest.approx(2 * word)
+    assert (identifier, word, pair, neither) == pytest.approx((0.5, 0.25, 0.75, 0.0))
+    assert scorer.score("the of and", _docs("the of and")) == [0.0]
+
+
+def test_stats_report_prompt_token_reduction(fresh_stats):
+    chunk = "x" * (10 * reranking.CHARS_PER_TOKEN)
+    rerank(NoopReranker(), "query", _docs(*[chunk] * 4), top_n=1, budget_ms=1000)
+    rerank(NoopReranker(), "query", _docs(*[chunk] * 4), top_n=3, budget_ms=1000)
+
+    snapshot = fresh_stats.snapshot()
+
+    assert snapshot["requests"] == 2
+    assert snapshot["candidate_tokens"] == 80
+    assert snapshot["prompt_tokens"] == 40
+    assert snapshot["prompt_token_reduction"] == pytest.approx(0.5)
+    assert RerankStats().snapshot()["prompt_token_reduction"] == 0.0
+
+
+def test_set_reranker_overrides_the_configured_scorer(monkeypatch):
+    monkeypatch.setattr(reranking, "_reranker", None)
+    monkeypatch.setattr(settings, "reranker", "none")
+    docs = _docs("alpha one", "beta two", "gamma three")
+    qa_engine.persist_vectorstore(qa_engine.build_vectorstore(docs, qa_engine.embed_chunks(docs)), "rerank-doc")
+    retriever = qa_engine.load_index("rerank-doc").retriever
+    configured = [d.metadata["n"] for d in retriever.retrieve("alpha one", k=3)]
+    assert isinstance(reranking.get_reranker(), NoopReranker)
+
+    reranking.set_reranker(SlowReverseReranker(delay=0))
+    assert [d.metadata["n"] for d in retriever.retrieve("alpha one", k=3)] == [2, 1, 0]
+
+    reranking.set_reranker(None)
+    assert [d.metadata["n"] for d in retriever.retrieve("alpha one", k=3)] == configured
+    assert isinstance(reranking.get_reranker(), NoopReranker)
@@ -0,0 +1,125 @@
+"""
+Offline recall@k: follow-up questions retrieve better as standalone questions
+than as the full prompt with instructions and history.
+"""
+import pytest  # type: ignore
+
+from app.services import qa_engine
+from app.services.chat_history import needs_condensing
+
+from conftest import login, upload
+
+# One chunk per topic; words are specific to their topic
+CHUNKS = {
+    "battery": "The battery pack holds 4000 mAh and lasts ten hours; replace the battery cells every two years.",
+    "warranty": "The warranty covers manufacturing defects for twenty four months from delivery date.",
+    "shipping": "Shipping takes five business days; express courier parcels arrive overnight.",
+    "refund": "A refund is issued within ten days once the returned parcel is inspected.",
+    "firmware": "Firmware updates install over wifi; hold the reset button if flashing stalls.",
+    "calibration": "Sensor calibration uses the reference weight; recalibrate monthly for accuracy.",
+    "cleaning": "Clean the lens with a dry microfiber cloth; never use alcohol or solvents.",
+    "mounting": "Mount the bracket with four screws into a stud; the wall plate needs anchors.",
+}
+SYSTEM_PROMPT = (
+    "You are a helpful document assistant. Answer questions based strictly on the document content. "
+    "If a question is outside the document scope, politely respond: "
+    "'I can only assist with questions related to the document content.'"
+)
+# (history, follow-up question, standalone rewrite, relevant topic)
+CASES = [
+    (
+        "User: How long does shipping take and what about express courier parcels?\n"
+        "Assistant: Shipping takes five business days, express courier parcels arrive overnight.\n"
+        "User: And the battery?\nAssistant: It holds 4000 mAh.",
+        "How often should I replace them?",
+        "How often should I replace the battery cells?",
+        "battery",
+    ),
+    (
+        "User: How do I clean the lens with a microfiber cloth?\n"
+        "Assistant: Use a dry microfiber cloth, never alcohol or solvents.\n"
+        "User: What does the warranty cover?\nAssistant: Manufacturing defects.",
+        "How long does it last?",
+        "How many months does the warranty last from delivery?",
+        "warranty",
+    ),
+    (
+        "User: How do I mount the bracket into a stud with screws?\n"
+        "Assistant: Use four screws into a stud; the wall plate needs anchors.\n"
+        "User: Can I get a refund?\nAssistant: Yes, once the parcel is inspected.",
+        "How many days does that take?",
+        "How many days until the refund is issued?",
+        "refund",
+    ),
+    (
+        "User: How do firmware updates install over wifi?\n"
+        "Assistant: Over wifi; hold the reset button if flashing stalls.\n"
+        "User: What about sensor calibration?\nAssistant: It uses the reference weight.",
+        "How often should I do it again?",
+        "How often should I recalibrate the sensor calibration?",
+        "calibration",
+    ),
+    (
+        "User: Does the warranty cover manufacturing defects for twenty four months?\n"
+        "Assistant: Yes, from the delivery date.\n"
+        "User: How do I update the firmware?\nAssistant: It installs over wifi.",
+        "What if it stalls?",
+        "What if firmware flashing stalls?",
+        "firmware",
+    ),
+]
+
+
+@pytest.fixture
+def retriever():
+    docs = [qa_engine.Document(page_content=text, metadata={"topic": topic}) for topic, text in CHUNKS.items()]
+    qa_engine.persist_vectorstore(qa_engine.build_vectorstore(docs, qa_engine.embed_chunks(docs)), "recall-doc")
+    return qa_engine.load_index("recall-doc").retriever
+
+
+def _full_prompt(history, question):
+    return f"{SYSTEM_PROMPT}\n\nConversation history:\n{history}\n\nUser: {question}\nAssistant:"
+
+
+def recall_at_k(retriever, queries, k):
+    """Share of (query, relevant topic) pairs whose topic is in the top k chunks."""
+    hits = sum(
+        topic in [doc.metadata["topic"] for doc in retriever.retrieve(query, k=k)]
+        for query, topic in queries
+    )
+    return hits / len(queries)
+
+
+def test_standalone_questions_rank_the_relevant_chunk_first(retriever):
+    full = recall_at_k(retriever, [(_full_prompt(h, q), topic) for h, q, _, topic in CASES], k=1)
+    standalone = recall_at_k(retriever, [(rewrite, topic) for _, _, rewrite, topic in CASES], k=1)
+
+    # The full prompt drifts to whatever the history discussed at length
+    assert standalone == 1.0
+    assert full < standalone
+
+
+@pytest.mark.parametrize("k", [2, 4])
+def test_standalone_recall_holds_at_larger_k(retriever, k):
+    assert recall_at_k(retriever, [(rewrite, topic) for _, _, rewrite, topic in CASES], k) == 1.0
+
+
+def test_every_case_is_a_follow_up():
+    assert all(needs_condensing(history, question) for history, question, _, _ in CASES)
+
+
+def test_follow_up_is_answered_from_the_rewritten_question(client, make_pdf, scripted_llm):
+    login(client, "alice")
+    body, _ = upload(client, "alice", make_pdf(list(CHUNKS.values())))
+    session_id = body["session_id"]
+    ask = lambda question: client.post("/ask/", json={"session_id": session_id, "question": question}).json()
+    ask("How long does shipping take and what about express courier parcels?")
+
+    # The scripted model answers the condensing prompt with the rewrite too
+    scripted_llm.reply = "How often should I replace the battery cells?"
+    answer = ask("How often should I replace them?")
+
+    condense_prompt, answer_prompt = scripted_llm.prompts[-2:]
+    assert "Follow-up question: How often should I replace them?" in condense_prompt
+    assert "Conversation history:" in answer_prompt
+    assert "battery cells" in answer["citations"][0]["excerpt"]
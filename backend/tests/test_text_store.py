@@ -0,0 +1,159 @@
+"""Extracted text round-trips through the text store, and a missing blob reads as no text."""
+import gzip
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest  # type: ignore
+import sqlalchemy as sa  # type: ignore
+from alembic.migration import MigrationContext  # type: ignore
+from alembic.operations import Operations  # type: ignore
+
+from app.core.config import settings
+from app.db.models import Document
+from app.db.session import SessionLocal
+from app.services import s3_client, text_store
+
+from conftest import seed_documents
+
+TEXT = "Clause 4.2.1: the warranty covers manufacturing defects.\n" * 200
+MIGRATION = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "e8c41f0b7a26_move_document_content_to_text_store.py"
+
+
+class FakeS3:
+    """The object calls the text store makes, kept in a dict."""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        return {"Body": _Body(self.objects[Key])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+
+class _Body:
+    def __init__(self, data):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "text_store_dir", str(tmp_path / "texts"))
+    return tmp_path / "texts"
+
+
+def test_local_round_trip(store_dir):
+    ref = text_store.save_text("doc-key", TEXT)
+
+    assert ref == "local:doc-key.txt.gz"
+    blob = (store_dir / "doc-key.txt.gz").read_bytes()
+    assert gzip.decompress(blob).decode("utf-8") == TEXT
+    assert len(blob) < len(TEXT) // 10
+    assert text_store.load_text(ref) == TEXT
+
+    text_store.delete_text(ref)
+    assert os.listdir(store_dir) == []
+    assert text_store.load_text(ref) is None
+    # Deleting again is harmless
+    text_store.delete_text(ref)
+
+
+def test_s3_round_trip(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(s3_client, "s3_client", fake)
+
+    ref = text_store.save_text("doc-key", TEXT, backend="s3")
+
+    assert ref == "s3:doc-key.txt.gz"
+    assert list(fake.objects) == [f"{settings.text_store_prefix}doc-key.txt.gz"]
+    assert text_store.load_text(ref) == TEXT
+    text_store.delete_text(ref)
+    assert fake.objects == {}
+    assert text_store.load_text(ref) is None
+
+
+def test_missing_reference_reads_as_no_text(store_dir, client):
+    ref = text_store.save_text("doc-key", TEXT)
+    os.remove(store_dir / "doc-key.txt.gz")
+    [(doc_id, _)] = seed_documents("alice", 1, index_key="doc-key")
+    db = SessionLocal()
+    try:
+        db.query(Document).filter(Document.id == doc_id).update({Document.content_ref: ref})
+        db.commit()
+    finally:
+        db.close()
+
+    assert text_store.load_text(ref) is None
+    assert text_store.load_text(None) is None
+    text_store.delete_text(None)
+    response = client.get("/docs/", params={"user_id": "alice", "filename": "doc-key", "include_content": True})
+    assert response.status_code == 200
+    assert response.json()["content"] is None
+
+
+def test_bad_references_and_backends_are_rejected(store_dir):
+    with pytest.raises(ValueError):
+        text_store.load_text("ftp:doc-key.txt.gz")
+    with pytest.raises(ValueError):
+        text_store.load_text("local:")
+    with pytest.raises(ValueError):
+        text_store.save_text("doc-key", TEXT, backend="ftp")
+
+
+def _migration():
+    spec = importlib.util.spec_from_file_location("move_document_content", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run(engine, step):
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            step()
+
+
+def test_migration_moves_content_out_and_back(store_dir, tmp_path):
+    migration = _migration()
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'migration.db'}")
+    with engine.begin() as connection:
+        connection.execute(sa.text("CREATE TABLE documents (id INTEGER PRIMARY KEY, filename VARCHAR, content TEXT)"))
+        connection.execute(sa.text(
+            "INSERT INTO documents (id, filename, content) VALUES "
+            "(1, 'shared', 'first text'), (2, 'shared', 'first text'), (3, 'other', 'second text'), (4, 'empty', NULL)"
+        ))
+
+    _run(engine, migration.upgrade)
+
+    with engine.connect() as connection:
+        refs = dict(connection.execute(sa.text("SELECT id, content_ref FROM documents")).all())
+        columns = {column["name"] for column in sa.inspect(connection).get_columns("documents")}
+    assert "content" not in columns
+    # Deduplicated rows share one blob
+    assert refs == {1: "local:shared.txt.gz", 2: "local:shared.txt.gz", 3: "local:other.txt.gz", 4: None}
+    assert sorted(os.listdir(store_dir)) == ["other.txt.gz", "shared.txt.gz"]
+
+    # A blob lost since the upgrade comes back as no content
+    text_store.delete_text("local:other.txt.gz")
+    _run(engine, migration.downgrade)
+
+    with engine.connect() as connection:
+        contents = dict(connection.execute(sa.text("SELECT id, content FROM documents")).all())
+        columns = {column["name"] for column in sa.inspect(connection).get_columns("documents")}
+    assert "content_ref" not in columns
+    assert contents == {1: "first text", 2: "first text", 3: None, 4: None}
+    engine.dispose()
@@ -0,0 +1,124 @@
+"""Identical uploads share one index; deletes and dedup never leave a ready document without one."""
+import hashlib
+import threading
+
+from app.db.models.document import Document
+from app.db.session import SessionLocal
+from app.services import document_crud, index_store
+from app.services.cleanup import cleanup_document_artifacts
+
+from conftest import drain_cleanup, login, s3_uploads, upload
+
+PAGES = ["Turbine maintenance schedule.", "Blades are inspected every 500 hours."]
+
+
+def _documents():
+    db = SessionLocal()
+    try:
+        return db.query(Document.id, Document.user_id, Document.filename).order_by(Document.id).all()
+    finally:
+        db.close()
+
+
+def test_same_user_reupload_reuses_the_document(client, make_pdf):
+    login(client, "alice")
+    pdf = make_pdf(PAGES)
+    first, _ = upload(client, "alice", pdf)
+
+    second, job = upload(client, "alice", pdf)
+
+    assert second["job_id"] == first["job_id"]
+    assert second["session_id"] != first["session_id"]
+    assert job["status"] == "ready"
+    assert len(_documents()) == 1
+    assert len(s3_uploads) == 1
+    found = client.get("/docs/", params={"user_id": "alice", "filename": first["document"]["filename"]})
+    assert found.json()["id"] == first["job_id"]
+
+
+def test_other_user_shares_the_index(client, make_pdf):
+    login(client, "alice")
+    login(client, "bob")
+    pdf = make_pdf(PAGES)
+    alice, _ = upload(client, "alice", pdf)
+
+    bob, job = upload(client, "bob", pdf)
+
+    assert bob["job_id"] != alice["job_id"]
+    assert bob["document"]["filename"] == alice["document"]["filename"]
+    assert job["status"] == "ready"
+    assert len(s3_uploads) == 1
+
+    client.delete("/docs/", params={"user_id": "alice", "id": alice["job_id"]})
+    drain_cleanup()
+    assert index_store.has_vectorstore(bob["document"]["filename"])
+
+
+def test_dedup_rechecks_the_source_after_a_concurrent_delete(client, make_pdf, monkeypatch):
+    login(client, "alice")
+    login(client, "bob")
+    pdf = make_pdf(PAGES)
+    alice, _ = upload(client, "alice", pdf)
+    key = alice["document"]["filename"]
+    digest = hashlib.sha256(pdf.read_bytes()).hexdigest()
+    lookup = document_crud.find_indexed_document_by_digest
+    calls = []
+
+    def lookup_then_delete(db, wanted):
+        found = lookup(db, wanted)
+        if not calls:
+            # Alice deletes between the dedup lookup and the new row's commit
+            client.delete("/docs/", params={"user_id": "alice", "id": alice["job_id"]})
+            drain_cleanup()
+        calls.append(found)
+        return found
+
+    monkeypatch.setattr(document_crud, "find_indexed_document_by_digest", lookup_then_delete)
+    db = SessionLocal()
+    try:
+        assert document_crud.add_deduplicated_document(db, "bob", digest) is None
+    finally:
+        db.close()
+    assert not index_store.has_vectorstore(key)
+    assert _documents() == []
+
+
+def test_cleanup_holds_the_index_key_while_deleting(client, make_pdf, monkeypatch):
+    login(client, "alice")
+    login(client, "bob")
+    pdf = make_pdf(PAGES)
+    alice, _ = upload(client, "alice", pdf)
+    key = alice["document"]["filename"]
+    db = SessionLocal()
+    db.query(Document).filter(Document.id == alice["job_id"]).delete()
+    db.commit()
+    db.close()
+
+    deleting, release = threading.Event(), threading.Event()
+    delete_vectorstore = index_store.delete_vectorstore
+
+    def slow_delete(index_key):
+        deleting.set()
+        release.wait(5)
+        delete_vectorstore(index_key)
+
+    monkeypatch.setattr("app.services.cleanup.delete_vectorstore", slow_delete)
+    worker = threading.Thread(target=cleanup_document_artifacts, args=(key, None, None))
+    worker.start()
+    assert deleting.wait(5)
+
+    acquired = threading.Event()
+
+    def lock_key():
+        lock_db = SessionLocal()
+        with document_crud.lock_index_key(lock_db, key):
+            acquired.set()
+        lock_db.close()
+
+    waiter = threading.Thread(target=lock_key)
+    waiter.start()
+    assert not acquired.wait(0.2)
+    release.set()
+    worker.join(5)
+    waiter.join(5)
+    assert acquired.is_set()
@@ -74,6 +74,7 @@ export default function ChatWindow({
   
   const [input, setInput] = useState('');
   const [isUploading, setIsUploading] = useState(false);
+  const [uploadJob, setUploadJob] = useState(null);
   const [isSending, setIsSending] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
   const [messages, setMessages] = useState([]);
@@ -134,8 +135,10 @@ export default function ChatWindow({
     }
     
     setIsUploading(true);
+    setUploadJob(null);
     try {
-      const response = await chatApi.uploadFile(user.sub, file);
+      // Resolves once the document has been processed and can be queried
+      const response = await chatApi.uploadFile(user.sub, file, setUploadJob);
       
       // Update current file in context
       const fileInfo = {
@@ -183,6 +186,7 @@ export default function ChatWindow({
       showSnackbar(errorMessage, 'error');
     } finally {
       setIsUploading(false);
+      setUploadJob(null);
     }
   }, [user, showSnackbar, setCurrentActiveFile, addSession]);
 
@@ -285,7 +289,11 @@ export default function ChatWindow({
         <Box sx={{ display: 'flex', flexDirection: 'column', alignItems: 'center', justifyContent: 'center', height: '100%' }}>
           <CircularProgress />
           <Typography variant="body1" sx={{ mt: 2 }}>
-            {isUploading ? 'Uploading your document...' : 'Loading conversation...'}
+            {isUploading
+              ? uploadJob
+                ? `Processing your document... ${uploadJob.progress}%`
+                : 'Uploading your document...'
+              : 'Loading conversation...'}
           </Typography>
         </Box>
       );
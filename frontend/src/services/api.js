@@ -78,8 +78,9 @@ export const chatApi = {
     }
   },
 
-  // Upload file
-  uploadFile: async (userId, file) => {
+  // Upload file. The backend queues the PDF for processing (202), so this
+  // polls the ingestion job and resolves once the document can be queried.
+  uploadFile: async (userId, file, onProgress) => {
     const formData = new FormData();
     formData.append('file', file);
     formData.append('user_id', userId);
@@ -91,13 +92,39 @@ export const chatApi = {
         },
       });
       console.log(response.data);
-      return response.data;
+      const job = await chatApi.waitForJob(response.data.job_id, onProgress);
+      return {
+        ...response.data,
+        document: {
+          ...response.data.document,
+          status: job.status,
+          progress: job.progress,
+          file_url: job.file_url,
+        },
+      };
     } catch (error) {
       console.error('File upload error:', error);
       throw error;
     }
   },
 
+  // Poll an ingestion job until the document is ready; rejects if it failed
+  waitForJob: async (jobId, onProgress, intervalMs = 1000) => {
+    for (;;) {
+      const { data: job } = await api.get(`/upload/jobs/${jobId}`);
+      onProgress?.(job);
+      if (job.status === 'ready') {
+        return job;
+      }
+      if (job.status === 'failed') {
+        const error = new Error(job.error || 'Failed to process document');
+        error.response = { data: { detail: job.error || 'Failed to process document' } };
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  },
+
   // Ask question
   askQuestion: async (sessionId, question) => {
     try {